@@ -0,0 +1,56 @@
+"""
+import 비용 회귀 확인 스크립트
+
+짧게 실행되는 CLI 경로(config.models, vector_store_search.py 등)가 import만으로
+langchain_community(Ollama 클라이언트, Chroma 래퍼)를 불러오지 않는지 확인합니다.
+모듈마다 새 프로세스에서 python -X importtime -c "import <모듈>"을 실행해 import된 모듈 목록을 검사합니다.
+
+사용법: python python/config/check_import_time.py   (실패 시 종료 코드 1)
+"""
+import os
+import sys
+import subprocess
+
+PYTHON_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# (import할 모듈, import되면 안 되는 최상위 패키지 목록)
+CHECKS = [
+    ("config.models", ["langchain", "langchain_core", "langchain_community", "langchain_ollama"]),
+    ("config.embedding_cache", ["langchain", "langchain_core", "langchain_community", "langchain_ollama"]),
+    ("vector_store.snapshot", ["langchain_community"]),
+    ("vector_store.retrieval", ["langchain_community"]),
+    ("vector_store.vector_store_search", ["langchain_community"]),
+]
+
+
+def imported_modules(module):
+    """새 프로세스에서 module을 import할 때 함께 import된 모듈 이름 목록 (-X importtime 출력 기준)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PYTHON_ROOT, capture_output=True, text=True, encoding="utf-8",
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{module} import 실패:\n{result.stderr}")
+    names = []
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative |   패키지.모듈"
+        if line.startswith("import time:") and "|" in line:
+            names.append(line.rsplit("|", 1)[1].strip())
+    return names
+
+
+def check(module, forbidden):
+    """금지 패키지가 import되면 해당 모듈 이름 목록 반환 (없으면 빈 목록)"""
+    return [name for name in imported_modules(module) if name.split(".")[0] in forbidden]
+
+
+if __name__ == "__main__":
+    failed = False
+    for module, forbidden in CHECKS:
+        found = check(module, forbidden)
+        if found:
+            failed = True
+            print(f"❌ {module}: {', '.join(found[:5])}{' ...' if len(found) > 5 else ''} 가 import됩니다.")
+        else:
+            print(f"✅ {module}: {', '.join(forbidden)} import 없음")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,232 @@
+"""
+MySQL 접속 정보 및 커넥션 풀 중앙화 파일
+
+모든 Python 스크립트는 이 파일의 get_connection() / 헬퍼 함수로 DB에 접근합니다.
+- 스레드 안전한 고정 크기 커넥션 풀 (최대 POOL_MAX_SIZE개)
+- 일정 시간 쉬었던 연결은 재사용 전에 ping으로 상태 확인 (끊겼으면 재연결)
+- WHERE ... IN 조회 헬퍼
+- 서버 측 커서(SSCursor)로 큰 결과를 페이지 단위로 읽는 스트리밍 헬퍼
+- fork된 자식 프로세스(프리포크 워커)는 부모 연결을 공유하지 않고 자기 풀을 새로 만듦
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pymysql
+
+# ================================================================
+# DB 접속 정보 (여기서만 변경하면 모든 파일에 적용됨)
+# ================================================================
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'admin',
+    'password': '1qazZAQ!',
+    'db': 'final',
+    'charset': 'utf8mb4'
+}
+
+POOL_MAX_SIZE = 5             # 프로세스당 최대 연결 수
+POOL_WAIT_TIMEOUT = 30        # 풀이 가득 찼을 때 연결을 기다리는 최대 시간 (초)
+HEALTH_CHECK_IDLE_SEC = 30    # 이 시간 이상 쉬었던 연결은 재사용 전에 ping
+BULK_CHUNK_SIZE = 500         # IN 조회 1회당 최대 값 수
+STREAM_PAGE_SIZE = 500        # 스트리밍 조회 시 한 번에 가져오는 행 수
+STREAM_NET_WRITE_TIMEOUT = 3600  # 스트리밍 중 클라이언트가 오래 읽지 않아도 서버가 끊지 않도록 (초)
+
+
+# ================================================================
+# 커넥션 풀
+# ================================================================
+class ConnectionPool:
+    """스레드 안전한 MySQL 커넥션 풀"""
+
+    def __init__(self, config, max_size=POOL_MAX_SIZE, wait_timeout=POOL_WAIT_TIMEOUT,
+                 health_check_idle_sec=HEALTH_CHECK_IDLE_SEC):
+        # 풀에서 재사용하는 연결은 autocommit으로 두어 이전 트랜잭션의 스냅샷을 읽지 않도록 함
+        self.config = {**config, "autocommit": True}
+        self.max_size = max_size
+        self.wait_timeout = wait_timeout
+        self.health_check_idle_sec = health_check_idle_sec
+        self._idle = []        # (연결, 마지막 사용 시각) - 최근 사용 연결부터 재사용
+        self._size = 0         # 생성되어 있는 연결 수 (사용 중 + 대기 중)
+        self._cond = threading.Condition()
+        self.stats = {"created": 0, "reused": 0, "queries": 0}
+        self.pid = os.getpid()   # 풀을 만든 프로세스 (fork 후 자식에서 같은 소켓을 쓰지 않도록 확인)
+
+    def acquire(self):
+        """풀에서 연결 가져오기 (없으면 새로 생성, 가득 찼으면 대기)"""
+        deadline = time.monotonic() + self.wait_timeout
+        with self._cond:
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"DB 커넥션 풀 대기 시간 초과 ({self.max_size}개 모두 사용 중)")
+                self._cond.wait(remaining)
+            if self._idle:
+                conn, last_used = self._idle.pop()
+            else:
+                self._size += 1
+                conn, last_used = None, None
+
+        if conn is None:
+            try:
+                conn = pymysql.connect(**self.config)
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            self.stats["created"] += 1
+            return conn
+
+        # 오래 쉬었던 연결은 상태 확인 (끊긴 경우 재연결)
+        if time.monotonic() - last_used > self.health_check_idle_sec:
+            try:
+                conn.ping(reconnect=True)
+            except Exception:
+                self.release(conn, discard=True)
+                return self.acquire()
+        self.stats["reused"] += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        """연결 반납 (discard=True거나 닫힌 연결이면 폐기)"""
+        with self._cond:
+            if discard or not conn.open:
+                self._size -= 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as conn: 형태로 사용 (종료 시 자동 반납)"""
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except pymysql.err.OperationalError:
+            # 연결 자체의 문제일 수 있으므로 재사용하지 않음
+            discard = True
+            raise
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def close_all(self):
+        """대기 중인 연결 모두 닫기"""
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool():
+    """프로세스 공용 커넥션 풀 (최초 호출 시 생성)
+
+    fork로 복사된 부모의 풀이면 새로 만듦 (부모 연결은 닫으면 부모 쪽 세션도 끊기므로 닫지 않고 버림)
+    """
+    global _POOL
+    if _POOL is None or _POOL.pid != os.getpid():
+        with _POOL_LOCK:
+            if _POOL is None or _POOL.pid != os.getpid():
+                _POOL = ConnectionPool(DB_CONFIG)
+    return _POOL
+
+
+@contextmanager
+def get_connection():
+    """풀에서 연결을 빌려 사용 후 자동 반납"""
+    with get_pool().connection() as conn:
+        yield conn
+
+
+# ================================================================
+# 헬퍼 함수
+# ================================================================
+def fetch_all(sql, params=None, dict_cursor=True):
+    """SELECT 실행 후 전체 행 반환"""
+    cursor_class = pymysql.cursors.DictCursor if dict_cursor else pymysql.cursors.Cursor
+    with get_connection() as conn:
+        with conn.cursor(cursor_class) as cursor:
+            cursor.execute(sql, params)
+            get_pool().stats["queries"] += 1
+            return cursor.fetchall()
+
+
+def stream_pages(sql, params=None, page_size=STREAM_PAGE_SIZE, dict_cursor=True):
+    """SELECT 결과를 서버 측 커서로 page_size행씩 반환하는 제너레이터 (전체 결과를 메모리에 올리지 않음)
+
+    모두 읽거나 제너레이터를 닫을 때까지 풀의 연결 1개를 사용합니다.
+    페이지 사이에 오래 걸리는 작업(임베딩 등)을 해도 되도록 net_write_timeout을 늘려 두고,
+    끝나면 원래 값으로 되돌려 풀에 반납합니다.
+    """
+    cursor_class = pymysql.cursors.SSDictCursor if dict_cursor else pymysql.cursors.SSCursor
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT @@SESSION.net_write_timeout")
+            previous = cursor.fetchone()[0]
+            cursor.execute("SET SESSION net_write_timeout = %s", (STREAM_NET_WRITE_TIMEOUT,))
+        try:
+            with conn.cursor(cursor_class) as cursor:
+                cursor.execute(sql, params)
+                get_pool().stats["queries"] += 1
+                while True:
+                    rows = cursor.fetchmany(page_size)
+                    if not rows:
+                        return
+                    yield rows
+        finally:
+            # 서버 측 커서를 닫은 뒤 복원 (다른 작업이 이 연결을 재사용할 때 늘린 값이 남지 않도록)
+            with conn.cursor() as cursor:
+                cursor.execute("SET SESSION net_write_timeout = %s", (previous,))
+
+
+def execute(sql, params=None):
+    """INSERT/UPDATE/DELETE 1건 실행 후 (영향받은 행 수, lastrowid) 반환"""
+    with get_connection() as conn:
+        with conn.cursor() as cursor:
+            affected = cursor.execute(sql, params)
+            get_pool().stats["queries"] += 1
+            return affected, cursor.lastrowid
+
+
+def select_in(sql, values, params_before=(), dict_cursor=True, chunk_size=BULK_CHUNK_SIZE):
+    """WHERE ... IN ({in_clause}) 조회를 값 목록 크기에 맞춰 실행
+
+    sql에는 {in_clause} 자리표시자를 넣습니다.
+    예) select_in("SELECT id, file_name FROM documents WHERE id IN ({in_clause})", ids)
+    """
+    values = list(dict.fromkeys(values))  # 중복 제거 (순서 유지)
+    if not values:
+        return []
+
+    cursor_class = pymysql.cursors.DictCursor if dict_cursor else pymysql.cursors.Cursor
+    rows = []
+    with get_connection() as conn:
+        with conn.cursor(cursor_class) as cursor:
+            for start in range(0, len(values), chunk_size):
+                chunk = values[start:start + chunk_size]
+                in_clause = ", ".join(["%s"] * len(chunk))
+                cursor.execute(sql.format(in_clause=in_clause), [*params_before, *chunk])
+                get_pool().stats["queries"] += 1
+                rows.extend(cursor.fetchall())
+    return rows
+
@@ -0,0 +1,72 @@
+"""
+쿼리 임베딩 영속 캐시
+
+같은 검색어(또는 추출 키워드)를 다시 검색할 때 Ollama 임베딩 호출을 생략합니다.
+키: sha256(임베딩 모델명 + 정규화된 텍스트), 값: float32 벡터
+vector_store_search.py와 3d_file_search.py 모두 vector_store/snapshot.py를 통해 사용합니다.
+"""
+import hashlib
+import os
+import re
+import unicodedata
+from array import array
+from functools import lru_cache
+
+from config.models import EMBEDDING_MODEL_NAME, get_embeddings
+from config.persistent_cache import CACHE_DIR, PersistentLRUCache
+
+QUERY_EMBEDDING_CACHE_PATH = os.path.join(CACHE_DIR, "query_embeddings.sqlite")
+QUERY_EMBEDDING_CACHE_MAX_ENTRIES = 5000
+
+
+def normalize_text(text):
+    """캐시 키용 텍스트 정규화 (유니코드 NFC, 앞뒤 공백 제거, 연속 공백 1칸)"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class CachedQueryEmbeddings:
+    """embed_query 결과를 영속 캐시에 저장하는 임베딩 래퍼 (문서 임베딩은 그대로 위임)
+
+    langchain Embeddings와 같은 메서드만 제공 (import 시 langchain을 불러오지 않도록 상속하지 않음)
+    """
+
+    def __init__(self, base, model_name, cache):
+        self.base = base
+        self.model_name = model_name
+        self.cache = cache
+
+    def embed_query(self, text):
+        # 캐시 값이 키와 정확히 대응하도록 정규화된 텍스트를 임베딩
+        text = normalize_text(text)
+        key = hashlib.sha256(f"{self.model_name}\n{text}".encode("utf-8")).hexdigest()
+        cached = self.cache.get(key)
+        if cached is not None:
+            return array("f", cached).tolist()
+
+        vector = self.base.embed_query(text)
+        self.cache.put(key, array("f", vector).tobytes())
+        return vector
+
+    def embed_documents(self, texts):
+        return self.base.embed_documents(texts)
+
+
+@lru_cache(maxsize=None)
+def _query_embedding_cache():
+    return PersistentLRUCache(QUERY_EMBEDDING_CACHE_PATH, "query_embeddings", QUERY_EMBEDDING_CACHE_MAX_ENTRIES)
+
+
+def get_query_embeddings(model_name=None):
+    """쿼리 임베딩 캐시가 적용된 임베딩 모델 반환"""
+    model_name = model_name or EMBEDDING_MODEL_NAME
+    return _cached_embeddings(model_name)
+
+
+@lru_cache(maxsize=None)
+def _cached_embeddings(model_name):
+    return CachedQueryEmbeddings(get_embeddings(model_name), model_name, _query_embedding_cache())
+
+
+def query_embedding_cache_stats():
+    """쿼리 임베딩 캐시 누적 통계"""
+    return _query_embedding_cache().stats()
@@ -0,0 +1,118 @@
+"""
+documents 테이블 메타데이터 LRU/TTL 캐시
+
+검색 결과 하이드레이션(파일명, 위치, 요약, 유형, 키워드 조회)에서 자주 나오는 문서를
+프로세스 메모리에 보관합니다. 상주 검색 서버에서는 인기 문서 조회가 DB 없이 처리됩니다.
+
+- 최대 METADATA_CACHE_MAX_ENTRIES개, 초과 시 가장 오래 사용하지 않은 문서부터 제거
+- 항목별 TTL(METADATA_CACHE_TTL_SEC) 경과 시 다시 조회
+- 테이블 버전(행 수, MAX(id), MAX(created_at))이 바뀌면 캐시 전체 무효화
+  (버전 확인 쿼리는 VERSION_CHECK_INTERVAL_SEC마다 최대 1회)
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from config.db import fetch_all, select_in, BULK_CHUNK_SIZE
+
+METADATA_CACHE_MAX_ENTRIES = 2000
+METADATA_CACHE_TTL_SEC = 600
+VERSION_CHECK_INTERVAL_SEC = 5
+
+METADATA_COLUMNS = "id, file_name, file_location, title, summary, keywords, doc_type"
+
+
+class DocumentMetadataCache:
+    """documents.id → 메타데이터 행 캐시"""
+
+    def __init__(self, max_entries=METADATA_CACHE_MAX_ENTRIES, ttl_sec=METADATA_CACHE_TTL_SEC,
+                 version_check_interval_sec=VERSION_CHECK_INTERVAL_SEC):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.version_check_interval_sec = version_check_interval_sec
+        self._entries = OrderedDict()   # id → (행, 저장 시각)
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = 0.0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def _count_round_trips(self, stats, n):
+        if stats is not None:
+            stats["db_round_trips"] = stats.get("db_round_trips", 0) + n
+
+    def _check_version(self, stats=None):
+        """테이블 버전이 바뀌었으면 캐시 비우기 (확인 주기 내에는 생략)"""
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_interval_sec:
+            return
+        if not self._entries:
+            # 비어 있으면 무효화할 것이 없으므로 조회 생략 (단발성 CLI 실행은 DB 왕복 1회 유지)
+            self._version_checked_at = now
+            return
+        row = fetch_all("SELECT COUNT(*) AS cnt, MAX(id) AS max_id, MAX(created_at) AS max_created FROM documents")[0]
+        self._count_round_trips(stats, 1)
+        version = (row["cnt"], row["max_id"], str(row["max_created"]))
+        with self._lock:
+            if self._version is not None and version != self._version and self._entries:
+                self._entries.clear()
+                self.stats["invalidations"] += 1
+            self._version = version
+            self._version_checked_at = now
+
+    def get_many(self, doc_ids, stats=None):
+        """여러 문서 메타데이터 반환 ({id: row}), 캐시에 없는 문서만 한 번에 DB 조회
+
+        stats dict를 넘기면 DB 왕복 횟수(db_round_trips)를 누적 기록
+        """
+        doc_ids = list(dict.fromkeys(doc_ids))  # 중복 제거 (순서 유지)
+        if not doc_ids:
+            return {}
+
+        self._check_version(stats)
+
+        found, missing = {}, []
+        now = time.monotonic()
+        with self._lock:
+            for doc_id in doc_ids:
+                entry = self._entries.get(doc_id)
+                if entry and now - entry[1] < self.ttl_sec:
+                    self._entries.move_to_end(doc_id)
+                    found[doc_id] = entry[0]
+                    self.stats["hits"] += 1
+                else:
+                    missing.append(doc_id)
+                    self.stats["misses"] += 1
+
+        if missing:
+            rows = select_in(f"SELECT {METADATA_COLUMNS} FROM documents WHERE id IN ({{in_clause}})", missing)
+            self._count_round_trips(stats, -(-len(missing) // BULK_CHUNK_SIZE))
+            with self._lock:
+                for row in rows:
+                    found[row["id"]] = row
+                    self._entries[row["id"]] = (row, now)
+                    self._entries.move_to_end(row["id"])
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.stats["evictions"] += 1
+
+        return found
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self._version_checked_at = 0.0
+
+    def snapshot_stats(self):
+        """캐시 통계 (적중률 포함)"""
+        with self._lock:
+            total = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "size": len(self._entries),
+                "hit_rate": round(self.stats["hits"] / total, 3) if total else 0.0,
+            }
+
+
+# 프로세스 공용 캐시
+DOCUMENT_CACHE = DocumentMetadataCache()
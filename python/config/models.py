@@ -2,10 +2,12 @@
 Ollama 모델 설정 중앙화 파일
 
 이 파일에서 모델명을 한 번만 변경하면 모든 Python 파일에 적용됩니다.
+
+모델 클라이언트는 import 시점이 아니라 get_llm() / get_chat_llm() / get_embeddings()를
+처음 호출할 때 생성됩니다. (필요한 langchain_community 하위 모듈만 그때 import)
+import 비용 확인: python python/config/check_import_time.py  (langchain이 import되면 실패)
 """
-from langchain_community.llms import Ollama
-from langchain_community.chat_models import ChatOllama
-from langchain_community.embeddings import OllamaEmbeddings
+from functools import lru_cache
 
 # ================================================================
 # 모델 설정 (여기서만 변경하면 모든 파일에 적용됨)
@@ -14,6 +16,17 @@ from langchain_community.embeddings import OllamaEmbeddings
 MODEL_NAME = "exaone3.5:7.8b"
 TEMPERATURE = 0.1
 
+# 임베딩 전용 모델 (생성 모델과 분리 가능, 작은 임베딩 모델을 쓰면 색인/검색이 빨라짐)
+# ⚠️ 변경 후에는 벡터스토어를 새로 생성해야 검색할 수 있습니다.
+# EMBEDDING_MODEL_NAME = "bge-m3"
+# EMBEDDING_MODEL_NAME = "nomic-embed-text"
+EMBEDDING_MODEL_NAME = MODEL_NAME
+
+# 벡터스토어를 만든 임베딩 모델과 현재 설정된 모델이 다를 때 처리 방식
+#   "refuse"   : 검색하지 않음 (기본값, 잘못된 결과 방지)
+#   "snapshot" : 벡터스토어를 만든 모델로 쿼리를 임베딩해서 검색
+EMBEDDING_MISMATCH_POLICY = "refuse"
+
 # 실행방법
 # ollama serve
 # ollama run exaone3.5:2.4b
@@ -22,9 +35,42 @@ TEMPERATURE = 0.1
 
 
 # ================================================================
-# 모델 인스턴스 (전역 변수로 생성하여 재사용)
+# 모델 인스턴스 (최초 사용 시 1회 생성하여 재사용)
 # ================================================================
-EMBEDDINGS = OllamaEmbeddings(model=MODEL_NAME)
-LLM = Ollama(model=MODEL_NAME)
-CHAT_LLM = ChatOllama(model=MODEL_NAME, temperature=TEMPERATURE)
+def get_embeddings(model_name=None):
+    """임베딩 모델 (OllamaEmbeddings, 기본값은 EMBEDDING_MODEL_NAME)"""
+    return _build_embeddings(model_name or EMBEDDING_MODEL_NAME)
+
+
+@lru_cache(maxsize=None)
+def _build_embeddings(model_name):
+    from langchain_community.embeddings.ollama import OllamaEmbeddings
+    return OllamaEmbeddings(model=model_name)
+
+
+@lru_cache(maxsize=None)
+def get_llm():
+    """텍스트 생성 모델 (Ollama)"""
+    from langchain_community.llms.ollama import Ollama
+    return Ollama(model=MODEL_NAME)
+
+
+@lru_cache(maxsize=None)
+def get_chat_llm():
+    """채팅 모델 (ChatOllama)"""
+    from langchain_community.chat_models.ollama import ChatOllama
+    return ChatOllama(model=MODEL_NAME, temperature=TEMPERATURE)
+
+
+# 기존 이름 호환: from config.models import LLM 형태도 해당 모델만 생성
+_LAZY_MODELS = {
+    "EMBEDDINGS": get_embeddings,
+    "LLM": get_llm,
+    "CHAT_LLM": get_chat_llm,
+}
+
 
+def __getattr__(name):
+    if name in _LAZY_MODELS:
+        return _LAZY_MODELS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
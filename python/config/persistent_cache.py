@@ -0,0 +1,98 @@
+"""
+SQLite 기반 영속 LRU 캐시
+
+프로세스가 끝나도 유지되어야 하는 캐시(쿼리 임베딩, 키워드 추출 결과 등)에 사용합니다.
+- 키(str) → 값(bytes) 저장, 조회 시 마지막 사용 시각 갱신
+- max_entries 초과 시 가장 오래 사용하지 않은 항목부터 삭제
+- 적중/미스/삭제 횟수를 캐시 파일에 누적 기록 (단발성 CLI 실행도 적중률 집계 가능)
+"""
+import os
+import sqlite3
+import threading
+import time
+
+# 캐시 파일 저장 폴더 (python/.cache)
+CACHE_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache"))
+
+
+class PersistentLRUCache:
+    """SQLite 파일 하나에 테이블 하나를 쓰는 LRU 캐시"""
+
+    def __init__(self, path, table, max_entries):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        """SQLite 연결 (최초 사용 시 생성, fork된 자식 프로세스에서는 새로 연결)"""
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_last_used ON {self.table} (last_used)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_stats ("
+                " name TEXT PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0,"
+                " misses INTEGER NOT NULL DEFAULT 0, evictions INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("INSERT OR IGNORE INTO cache_stats (name) VALUES (?)", (self.table,))
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key):
+        """값(bytes) 반환, 없으면 None"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute(f"UPDATE {self.table} SET last_used = ? WHERE key = ?", (time.time(), key))
+                conn.execute("UPDATE cache_stats SET hits = hits + 1 WHERE name = ?", (self.table,))
+            else:
+                conn.execute("UPDATE cache_stats SET misses = misses + 1 WHERE name = ?", (self.table,))
+            conn.commit()
+            return row[0] if row else None
+
+    def put(self, key, value):
+        """값 저장 후 최대 개수를 넘으면 오래된 항목 삭제"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, last_used) VALUES (?, ?, ?)",
+                (key, sqlite3.Binary(value), time.time()),
+            )
+            overflow = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY last_used LIMIT ?)",
+                    (overflow,),
+                )
+                conn.execute("UPDATE cache_stats SET evictions = evictions + ? WHERE name = ?", (overflow, self.table))
+            conn.commit()
+
+    def stats(self):
+        """누적 통계 (적중률 포함)"""
+        with self._lock:
+            conn = self._connection()
+            hits, misses, evictions = conn.execute(
+                "SELECT hits, misses, evictions FROM cache_stats WHERE name = ?", (self.table,)
+            ).fetchone()
+            entries = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "entries": entries,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+        }
@@ -1,13 +1,103 @@
-from typing import TypedDict, List, Dict, Any
-from langchain_core.prompts import PromptTemplate, ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_community.vectorstores import Chroma
 import sys
 import os
+import json
+import signal
+import argparse
+import threading
+import urllib.request
+import urllib.error
+from http.server import HTTPServer, ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# ================================================================
+# 0. 상주 검색 서버 설정 및 경량 클라이언트
+# - 서버가 떠 있으면 CLI는 무거운 라이브러리를 import하지 않고 쿼리만 전달
+# ================================================================
+SEARCH_SERVER_HOST = os.environ.get("SEARCH_SERVER_HOST", "127.0.0.1")
+SEARCH_SERVER_PORT = int(os.environ.get("SEARCH_SERVER_PORT", "5600"))
+SEARCH_SERVER_TIMEOUT = 600  # 초 (LLM 생성 2회를 포함하므로 넉넉하게)
+# 상주 검색 서버 워커 프로세스 수 (1이면 단일 프로세스, 2 이상이면 프리포크 워커 풀)
+SEARCH_SERVER_WORKERS = int(os.environ.get("SEARCH_SERVER_WORKERS", "1"))
+
+
+def request_search_server(path, payload=None, timeout=SEARCH_SERVER_TIMEOUT):
+    """상주 검색 서버에 JSON 요청 (서버가 실행 중이 아니면 None 반환)"""
+    url = f"http://{SEARCH_SERVER_HOST}:{SEARCH_SERVER_PORT}{path}"
+    data = json.dumps(payload or {}, ensure_ascii=False).encode("utf-8")
+    req = urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json; charset=utf-8"}
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        # 서버는 떠 있지만 처리 중 오류가 난 경우 (본문에 오류 JSON 포함)
+        try:
+            return json.loads(e.read().decode("utf-8"))
+        except ValueError:
+            return {"success": False, "error": f"HTTP {e.code}"}
+    except (urllib.error.URLError, ConnectionError):
+        # 서버 미실행 → 호출 측에서 프로세스 내 실행으로 대체
+        return None
+
+
+def print_search_output(response):
+    """검색 결과를 기존 CLI와 동일한 형식으로 stdout에 출력 (routes/api.js가 파싱)"""
+    print("\n" + "="*50)
+    print("📊 RAG 처리 완료! 최종 결과:")
+    print("="*50)
+    print(response["result"])
+
+    print(f"\n[HTML_FILE_PATH]{response['html_file_path']}[/HTML_FILE_PATH]")
+    print(f"[BAR_CHART_PATH]{response['bar_chart_path']}[/BAR_CHART_PATH]")
+
+
+def build_arg_parser():
+    """CLI 인자 정의 (경량 클라이언트와 실행부 공용)"""
+    parser = argparse.ArgumentParser(description="AI 파일 검색 (RAG + 3D 시각화)")
+    parser.add_argument("query", nargs="?", help="검색 쿼리")
+    parser.add_argument("--serve", action="store_true", help="상주 검색 서버 모드로 실행")
+    parser.add_argument("--host", default=SEARCH_SERVER_HOST, help="서버 바인드 주소")
+    parser.add_argument("--port", type=int, default=SEARCH_SERVER_PORT, help="서버 포트")
+    parser.add_argument("--workers", type=int, default=SEARCH_SERVER_WORKERS,
+                        help="상주 서버 워커 프로세스 수 (2 이상이면 검색 인덱스를 공유하는 프리포크 워커 풀, Unix 전용)")
+    parser.add_argument("--no-cache", action="store_true", help="최근 동일 검색 기록을 사용하지 않고 새로 검색")
+    parser.add_argument("--doc-type", action="append", default=[], help="파일 형식 필터 (예: .pdf, 여러 번 지정 가능)")
+    parser.add_argument("--date-from", help="생성일 시작 필터 (YYYY-MM-DD)")
+    parser.add_argument("--date-to", help="생성일 끝 필터 (YYYY-MM-DD, 그날 포함)")
+    return parser
+
+
+# 서버 모드가 아닌 CLI 실행이면 먼저 상주 서버에 위임 시도 (옵션 순서와 관계없이 인자를 먼저 해석)
+_args = build_arg_parser().parse_args() if __name__ == "__main__" else None
+if _args is not None and not _args.serve and _args.query:
+    _response = request_search_server("/search", {
+        "query": _args.query,
+        "no_cache": _args.no_cache,
+        "filters": {"doc_types": _args.doc_type, "date_from": _args.date_from, "date_to": _args.date_to},
+    })
+    if _response is not None:
+        if not _response.get("success"):
+            print(f"❌ 검색 서버 오류: {_response.get('error')}")
+            sys.exit(1)
+        print("⚡ 상주 검색 서버에서 처리되었습니다.")
+        print_search_output(_response)
+        sys.exit(0)
+
+from typing import TypedDict, List, Dict, Any, Optional
+from langchain_core.prompts import PromptTemplate, ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
 
 # 공통 모델 설정 import
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from config.models import EMBEDDINGS, LLM, CHAT_LLM
+from config.models import MODEL_NAME, get_embeddings, get_llm, get_chat_llm
+from config.db import execute, fetch_all
+from config.metadata_cache import DOCUMENT_CACHE
+from config.embedding_cache import normalize_text, query_embedding_cache_stats
+from config.persistent_cache import CACHE_DIR, PersistentLRUCache
+from vector_store.snapshot import SNAPSHOT_ROOT, active_snapshot_path
+from vector_store.retrieval import (
+    SEARCH_BACKEND, HYBRID_SEARCH, open_search_backend, search_documents, make_filters,
+)
 from langgraph.graph import StateGraph, END # LangGraph 컴포넌트는 여전히 로직 제어
 
 import plotly.graph_objects as go
@@ -15,12 +105,10 @@ import plotly.offline as pyo  # 추가: HTML 파일 저장 및 브라우저 열
 import numpy as np
 import ipywidgets as widgets  # .py 스크립트에서는 사용 안 함 (클래스 내부 유지, 하지만 show_visualization에서 무시)
 from IPython.display import display  # .py 스크립트에서는 사용 안 함
-import pymysql  # MySQL 연결용
-import os  # 추가: 디렉토리 생성용
 import re  # 추가: 파일명 안전 처리용
-import sys  # 추가: 커맨드라인 인자 처리
+import time
+import hashlib
 from datetime import datetime  # 추가: 날짜시간 처리용
-import json  # 추가: JSON 처리용
 
 # ================================================================
 # 1. 상태 정의 (AgentState)
@@ -31,53 +119,29 @@ class AgentState(TypedDict):
     search_results: List[Dict[str, Any]]
     context: str
     result: str
+    filters: Optional[Dict[str, Any]]   # retrieval.make_filters() 결과 (파일 형식 / 생성 기간)
 
 # ================================================================
-# 2. 데이터베이스 접속 정보
+# 2. 데이터베이스 접속 정보 (config/db.py 공용 커넥션 풀 사용)
 # ================================================================
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'admin',
-    'password': '1qazZAQ!',
-    'db': 'final',
-    'charset': 'utf8mb4'
-}
 
 # ================================================================
 # 3. ChromaDB 및 LLM 설정
 # ================================================================
 
-def get_latest_chroma_path():
-    """python/vector_store/rag_chroma/documents 아래에서 가장 최신 폴더 찾기"""
-    base_dir = os.path.dirname(os.path.abspath(__file__))  # python/rag/
-    documents_dir = os.path.join(base_dir, "..", "vector_store", "rag_chroma", "documents")
-    documents_dir = os.path.normpath(documents_dir)  # 경로 정규화
-    
-    if not os.path.exists(documents_dir):
-        print(f"⚠️ 문서 디렉토리가 존재하지 않습니다: {documents_dir}")
-        return None
-    
-    # 하위 폴더 목록 가져오기
+def get_active_chroma_path():
+    """활성 스냅샷 매니페스트(rag_chroma/active_snapshot.json)에서 사용할 ChromaDB 폴더 찾기"""
     try:
-        subdirs = [d for d in os.listdir(documents_dir) 
-                   if os.path.isdir(os.path.join(documents_dir, d))]
-        
-        if not subdirs:
-            print(f"⚠️ 문서 디렉토리에 하위 폴더가 없습니다: {documents_dir}")
-            return None
-        
-        # 날짜 형식으로 정렬 (YYYYMMDD_HHMMSS)
-        # 파일명이 날짜 형식인 경우 자동으로 정렬됨
-        sorted_dirs = sorted(subdirs, reverse=True)
-        latest_dir = sorted_dirs[0]
-        
-        chroma_path = os.path.join(documents_dir, latest_dir)
-        print(f"📁 사용 중인 ChromaDB 경로: {chroma_path}")
-        return chroma_path
-        
+        chroma_path = active_snapshot_path()
     except Exception as e:
-        print(f"⚠️ 최신 폴더를 찾는 중 오류 발생: {e}")
+        print(f"⚠️ 활성 벡터스토어를 찾는 중 오류 발생: {e}")
+        return None
+
+    if not chroma_path:
+        print(f"⚠️ 게시된 벡터스토어가 없습니다: {SNAPSHOT_ROOT}")
         return None
+    print(f"📁 사용 중인 ChromaDB 경로: {chroma_path}")
+    return chroma_path
 
 def extract_ai_answer(result_text):
     """검색 결과에서 AI 답변 부분만 추출"""
@@ -128,27 +192,96 @@ def save_search_history(query, search_result, html_file_path, bar_chart_path, se
                 })
             ranking_json = json.dumps(ranking_data, ensure_ascii=False)
         
-        conn = pymysql.connect(**DB_CONFIG)
-        with conn.cursor() as cursor:
-            sql = """
-            INSERT INTO search_history (query, search_result, ai_answer, ranking_result, html_file_path, bar_chart_path, chroma_path)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """
-            cursor.execute(sql, (query, search_result, ai_answer, ranking_json, html_file_path, bar_chart_path, chroma_path))
-        conn.commit()
+        insert_search_history(query, search_result, ai_answer, ranking_json, html_file_path, bar_chart_path, chroma_path)
         print(f"✅ 검색 기록 저장 완료!")
-        conn.close()
     except Exception as e:
         print(f"⚠️ 검색 기록 저장 실패: {e}")
 
+def query_hash(query):
+    """정규화된 검색어의 sha256 (search_history.query_hash 인덱스 조회용)"""
+    return hashlib.sha256(normalize_text(query).encode("utf-8")).hexdigest()
+
+def insert_search_history(query, search_result, ai_answer, ranking_json, html_file_path, bar_chart_path, chroma_path):
+    """search_history에 1행 저장"""
+    sql = """
+    INSERT INTO search_history (query, query_hash, search_result, ai_answer, ranking_result, html_file_path, bar_chart_path, chroma_path)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    execute(sql, (query, query_hash(query), search_result, ai_answer, ranking_json, html_file_path, bar_chart_path, chroma_path))
+
+def find_cached_search(query, chroma_path, max_age_sec=None):
+    """같은 검색어 + 같은 ChromaDB 폴더로 max_age_sec 이내에 저장된 검색 기록 반환 (없으면 None)
+
+    시각화 HTML 파일이 삭제된 기록은 사용하지 않음
+    """
+    max_age_sec = ANSWER_CACHE_MAX_AGE_SEC if max_age_sec is None else max_age_sec
+    if max_age_sec <= 0:
+        return None
+    rows = fetch_all(
+        """
+        SELECT search_result, ai_answer, ranking_result, html_file_path, bar_chart_path, chroma_path
+        FROM search_history
+        WHERE query_hash = %s AND chroma_path = %s AND created_at >= NOW() - INTERVAL %s SECOND
+        ORDER BY created_at DESC
+        LIMIT 1
+        """,
+        (query_hash(query), chroma_path, max_age_sec),
+    )
+    if not rows:
+        return None
+    row = rows[0]
+    output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "search")
+    for web_path in (row["html_file_path"], row["bar_chart_path"]):
+        if not web_path or not os.path.exists(os.path.join(output_dir, os.path.basename(web_path))):
+            return None
+    return row
+
+def fetch_document_metadata(doc_ids):
+    """documents 테이블에서 여러 문서의 메타데이터 조회 ({id: row})
+
+    프로세스 내 LRU 캐시에 없는 문서만 한 번의 쿼리로 조회 (config/metadata_cache.py)
+    """
+    return DOCUMENT_CACHE.get_many(doc_ids)
+
+# 검색 기록 캐시: 같은 검색어 + 같은 벡터스토어 기록이 이 시간(초) 이내면 재사용 (0이면 사용 안 함)
+ANSWER_CACHE_MAX_AGE_SEC = int(os.environ.get("ANSWER_CACHE_MAX_AGE_SEC", "86400"))
+
 # ChromaDB 경로 자동 설정
-CHROMA_PATH = get_latest_chroma_path()
+CHROMA_PATH = get_active_chroma_path()
 
 # ChromaDB 경로를 찾지 못한 경우 기본값 사용 (또는 오류 처리)
 if not CHROMA_PATH:
     print("❌ ChromaDB 경로를 찾을 수 없습니다. 기본값을 사용합니다.")
     CHROMA_PATH = "./python/vector_store/rag_chroma/documents/20251024_174234/"
 
+# ChromaDB 핸들 캐시 (상주 서버에서 요청마다 다시 열지 않도록 경로별로 재사용)
+_VECTORSTORES = {}
+# sharded 백엔드 워커 프로세스 수 (1: 현재 프로세스에서 검색, None: SHARD_WORKERS)
+# 워커 풀은 여러 요청에 재사용하는 단일 프로세스 상주 서버에서만 사용 (1회 실행 CLI / 프리포크 워커는 1)
+_SHARD_SEARCH = {"workers": 1}
+
+def get_vectorstore(chroma_path=None):
+    """경로별 검색 백엔드 핸들 반환 (최초 1회만 생성, 백엔드는 SEARCH_BACKEND: chroma / numpy / sharded / ivf)"""
+    path = chroma_path or CHROMA_PATH
+    if path not in _VECTORSTORES:
+        # 스냅샷을 만든 임베딩 모델과 다르면 EmbeddingModelMismatchError 발생
+        _VECTORSTORES[path] = open_search_backend(path, shard_workers=_SHARD_SEARCH["workers"])
+    return _VECTORSTORES[path]
+
+def reload_chroma_path():
+    """활성 벡터스토어 경로를 다시 읽고 Chroma 핸들 캐시 비우기 (새 벡터스토어 게시 후 호출)"""
+    global CHROMA_PATH
+    latest_path = get_active_chroma_path()
+    if latest_path:
+        CHROMA_PATH = latest_path
+    # 이전 핸들 정리 (sharded 백엔드는 워커 프로세스 풀을 종료하지 않으면 새로 열 때마다 쌓임)
+    for vectorstore in _VECTORSTORES.values():
+        close = getattr(vectorstore, "close", None)
+        if close is not None:
+            close()
+    _VECTORSTORES.clear()
+    return CHROMA_PATH
+
 # 모델 설정은 config/models.py에서 import함
 
 # ================================================================
@@ -176,6 +309,22 @@ class RAGNotebookVisualizer:
 
         # Jupyter용 컨테이너 제거 (스크립트에서는 사용 안 함)
 
+    def reset(self):
+        """이전 검색 결과 초기화 (상주 서버에서 객체를 재사용할 때 호출)"""
+        self.current_query = None
+        self.timestamp = None
+        self.fig3d.data[self.query_trace_idx].text = ['❓ Query']
+        for idx in (self.search_trace_idx, self.query_edge_trace_idx):
+            self.fig3d.data[idx].x = []
+            self.fig3d.data[idx].y = []
+            self.fig3d.data[idx].z = []
+        self.fig3d.data[self.search_trace_idx].text = []
+        self.fig3d.data[self.search_trace_idx].marker.size = []
+        self.fig3d.data[self.search_trace_idx].marker.color = []
+        self.bar_fig.data[0].x = []
+        self.bar_fig.data[0].y = []
+        self.bar_fig.data[0].text = []
+
     def _init_scene(self):
         """3D 장면 초기화: 질문 중심 배치"""
         # 1. 쿼리 노드 (중앙, 빨간색 다이아몬드)
@@ -399,34 +548,65 @@ visualizer = RAGNotebookVisualizer()
 # ================================================================
 # 6. RAG 에이전트 함수 (시각화 로직에서 에이전트 프로세스 제거)
 # ================================================================
+KEYWORD_PROMPT = PromptTemplate.from_template(
+    """사용자의 질문에서 띄어쓰기 확인하고 찾고자 하는 키워드를 쉼표로 구분하여 출력하세요.
+        벡터스토어 검색을 위한 최적의 키워드를 추출해주세요.
+        \n질문: {query}"""
+)
+KEYWORD_PROMPT_VERSION = 1  # KEYWORD_PROMPT를 수정하면 올려서 이전 캐시를 사용하지 않도록 함
+
+# 키워드 추출 결과 영속 캐시 (모델명 + 프롬프트 버전 + 정규화된 질문 → 키워드)
+KEYWORD_CACHE = PersistentLRUCache(os.path.join(CACHE_DIR, "keywords.sqlite"), "keyword_extractions", 10000)
+_KEYWORD_TIMING = {"hits": 0, "misses": 0, "llm_seconds": 0.0}  # 이 프로세스에서의 LLM 생성 시간 집계
+
+def keyword_cache_stats():
+    """키워드 캐시 누적 적중률 + 적중으로 절약한 생성 시간(추정)"""
+    avg_llm_sec = _KEYWORD_TIMING["llm_seconds"] / _KEYWORD_TIMING["misses"] if _KEYWORD_TIMING["misses"] else 0.0
+    return {
+        **KEYWORD_CACHE.stats(),
+        "avg_llm_seconds": round(avg_llm_sec, 2),
+        "saved_seconds_estimate": round(_KEYWORD_TIMING["hits"] * avg_llm_sec, 1),
+    }
+
 def extractor_agent(state: AgentState):
-    """사용자 쿼리에서 키워드 추출"""
+    """사용자 쿼리에서 키워드 추출 (같은 질문은 캐시에서 바로 반환)"""
     # 쿼리가 입력되면 3D 시각화 중앙의 텍스트를 업데이트
     visualizer._update_query_text(state["query"])
     
-    keyword_prompt = PromptTemplate.from_template(
-        """사용자의 질문에서 띄어쓰기 확인하고 찾고자 하는 키워드를 쉼표로 구분하여 출력하세요.
-        벡터스토어 검색을 위한 최적의 키워드를 추출해주세요.
-        \n질문: {query}"""
-    )
-    formatted_prompt = keyword_prompt.format(query=state["query"])
-    keywords = LLM.invoke(formatted_prompt)
+    cache_key = hashlib.sha256(
+        f"{MODEL_NAME}\n{KEYWORD_PROMPT_VERSION}\n{normalize_text(state['query'])}".encode("utf-8")
+    ).hexdigest()
+    cached = KEYWORD_CACHE.get(cache_key)
+    if cached is not None:
+        _KEYWORD_TIMING["hits"] += 1
+        print(f"🗝️ 키워드 캐시 적중 (LLM 호출 생략, 누적 적중률 {KEYWORD_CACHE.stats()['hit_rate']:.0%})")
+        return {**state, "keywords": cached.decode("utf-8")}
+    
+    started = time.perf_counter()
+    formatted_prompt = KEYWORD_PROMPT.format(query=state["query"])
+    keywords = get_llm().invoke(formatted_prompt).strip()
+    _KEYWORD_TIMING["misses"] += 1
+    _KEYWORD_TIMING["llm_seconds"] += time.perf_counter() - started
     
-    return {**state, "keywords": keywords.strip()}
+    KEYWORD_CACHE.put(cache_key, keywords.encode("utf-8"))
+    return {**state, "keywords": keywords}
 
 def rag_search_agent(state: AgentState):
     """검색 및 관련성 계산, 3D 시각화 업데이트"""
     try:
-        # 1. ChromaDB 로드 및 검색
-        vectorstore = Chroma(persist_directory=CHROMA_PATH, embedding_function=EMBEDDINGS)
-        results = vectorstore.similarity_search_with_score(state["keywords"], k=10)
+        # 1. ChromaDB 로드 및 검색 (필터는 Chroma where 절 / numpy 행 선택으로 인덱스 단계에서 적용)
+        vectorstore = get_vectorstore()
+        #    문서 단위 top-10: 몇몇 문서의 청크가 상위를 차지해도 항상 서로 다른 문서 최대 10개
+        #    벡터 검색은 추출 키워드, BM25/파일명 정확 일치는 사용자 원문 검색어 (키워드 추출로 파일명이 바뀌지 않도록)
+        results = search_documents(vectorstore, state["keywords"], 10, filters=state.get("filters"),
+                                   lexical_query=state["query"])
 
         if not results: 
             # 검색 결과가 없으면 3D 시각화에서 문서 노드를 비움
             visualizer.update_search_results([], state["query"])
             return {**state, "search_results": [], "context": ""}
         
-        # 2. 문서 중복 제거 (가장 높은 유사도 유지)
+        # 2. 문서별 청크 정리 (search_documents가 문서당 가장 가까운 청크 1개만 반환)
         best_doc_info = {}
         for doc, score in results:
             doc_id = doc.metadata.get("id")
@@ -444,14 +624,14 @@ def rag_search_agent(state: AgentState):
         scores = [score for score, _ in best_doc_info.values()]
         min_score, max_score = min(scores), max(scores)
         
-        # 4. MySQL에서 파일 메타데이터 조회
-        conn = pymysql.connect(**DB_CONFIG)
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        # 4. MySQL에서 파일 메타데이터 일괄 조회 (WHERE id IN 한 번으로 처리)
+        ranked_ids = sorted(best_doc_info, key=lambda d: best_doc_info[d][0])
+        rows_by_id = fetch_document_metadata(ranked_ids)
         search_results_with_metadata = []
         
-        for doc_id, (score, content) in best_doc_info.items():
-            cursor.execute("SELECT * FROM documents WHERE id = %s", (doc_id,))
-            row = cursor.fetchone()
+        for doc_id in ranked_ids:
+            score, content = best_doc_info[doc_id]
+            row = rows_by_id.get(doc_id)
             if row:
                 if max_score != min_score:
                     relevance = (1 - (score - min_score) / (max_score - min_score)) * 98
@@ -466,7 +646,6 @@ def rag_search_agent(state: AgentState):
                     "keywords": row["keywords"],
                     "content": content
                 })
-        conn.close()
         
         # 5. 관련성 순으로 정렬 및 컨텍스트 생성
         search_results_with_metadata.sort(key=lambda x: x["relevance"], reverse=True)
@@ -516,7 +695,7 @@ def answer_generator_agent(state: AgentState):
         # 결론적으로 어떤파일을 추천하는지 1개만 알려줘(파일명-요약)
         """
         )
-    chain = prompt | CHAT_LLM | StrOutputParser()
+    chain = prompt | get_chat_llm() | StrOutputParser()
     result = chain.invoke({
         "search_summary": search_summary,
         "context": state["context"],
@@ -562,57 +741,435 @@ graph.add_edge("result_formatter", END)
 app = graph.compile()
 
 # ================================================================
-# 8. 실행 예시 (.py 스크립트용)
+# 8. 검색 실행 함수 (CLI / 상주 서버 공용)
 # ================================================================
-if __name__ == "__main__":
-    # 커맨드라인 인자에서 쿼리 가져오기
-    if len(sys.argv) < 2:
-        print("❌ 오류: 검색 쿼리가 제공되지 않았습니다.")
-        print("사용법: python 3d_file_search.py '<검색 쿼리>'")
-        sys.exit(1)
-    
-    query = sys.argv[1]
-    
+def run_search(query, use_cache=True, filters=None):
+    """RAG 파이프라인 실행 → 시각화 파일 생성 → 검색 기록 저장 후 결과 dict 반환
+
+    use_cache=True면 같은 검색어/같은 벡터스토어의 최근 검색 기록을 그대로 반환
+    filters(파일 형식 / 생성 기간)가 있으면 검색 기록 캐시를 사용하지 않음 (기록에 필터가 저장되지 않으므로)
+    """
+    # ChromaDB 경로에서 마지막 폴더명만 추출 (예: 20251027_144152)
+    chroma_folder_name = os.path.basename(os.path.normpath(CHROMA_PATH))
+
+    # 0) 검색 기록 캐시 확인 (추출/검색/LLM 생성 모두 생략)
+    if use_cache and not filters:
+        try:
+            cached = find_cached_search(query, chroma_folder_name)
+        except Exception as e:
+            print(f"⚠️ 검색 기록 캐시 조회 실패: {e}")
+            cached = None
+        if cached:
+            print("⚡ 최근 동일 검색 기록을 사용합니다. (캐시 무시: --no-cache)")
+            ranking = cached["ranking_result"]
+            if isinstance(ranking, str):
+                ranking = json.loads(ranking)
+            try:
+                # 검색 기록 목록에는 이번 검색도 남김
+                insert_search_history(query, cached["search_result"], cached["ai_answer"],
+                                      json.dumps(ranking, ensure_ascii=False) if ranking else None,
+                                      cached["html_file_path"], cached["bar_chart_path"], chroma_folder_name)
+            except Exception as e:
+                print(f"⚠️ 검색 기록 저장 실패: {e}")
+            return {
+                "success": True,
+                "cached": True,
+                "query": query,
+                "result": cached["search_result"],
+                "ai_answer": cached["ai_answer"],
+                "search_results": ranking or [],
+                "html_file_path": cached["html_file_path"],
+                "bar_chart_path": cached["bar_chart_path"],
+                "chroma_path": chroma_folder_name,
+            }
+
+    visualizer.reset()
+
     # 1) RAG 파이프라인 실행
-    state = {"query": query, "keywords": "", "search_results": [], "context": "", "result": ""}
+    state = {"query": query, "keywords": "", "search_results": [], "context": "", "result": "", "filters": filters}
     result = app.invoke(state)
 
-    # 2) 최종 결과 출력
-    print("\n" + "="*50)
-    print("📊 RAG 처리 완료! 최종 결과:")
-    print("="*50)
-    print(result["result"])
-
-    # 3) 파일명 생성용 타임스탬프 설정
+    # 2) 파일명 생성용 타임스탬프 설정
     safe_query = re.sub(r'[\\/*?:"<>|]', "", query)
     safe_query = safe_query.strip().replace(" ", "_")
     if len(safe_query) > 50:
         safe_query = safe_query[:50]
-    
+
     # 날짜시간 추가 (YYYYMMDD_HHMMSS 형식)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
+
     # visualizer에 타임스탬프 설정
     visualizer.timestamp = timestamp
 
-    # 4) 시각화 생성 (파일만 생성, 자동 열기 비활성화)
+    # 3) 시각화 생성 (파일만 생성, 자동 열기 비활성화)
     visualizer.show_visualization_no_open()
-    
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    output_dir = os.path.join(script_dir, "search")
+
     html_filename = f"{safe_query}_3d_visualization_{timestamp}.html"
     bar_chart_filename = f"{safe_query}_bar_chart_{timestamp}.html"
-    
-    # 생성된 HTML 파일 경로를 출력 (웹 서버 URL 형식)
+
+    # 생성된 HTML 파일 경로 (웹 서버 URL 형식)
     # os.path.join은 백슬래시를 사용하므로 웹 URL 형식으로 변환
     relative_path = os.path.join("search-results", html_filename).replace(os.sep, "/")
     bar_chart_path = os.path.join("search-results", bar_chart_filename).replace(os.sep, "/")
-    
-    print(f"\n[HTML_FILE_PATH]{relative_path}[/HTML_FILE_PATH]")
-    print(f"[BAR_CHART_PATH]{bar_chart_path}[/BAR_CHART_PATH]")
-    
-    # ChromaDB 경로에서 마지막 폴더명만 추출 (예: 20251027_144152)
-    chroma_folder_name = os.path.basename(os.path.normpath(CHROMA_PATH))
-    
-    # 5) 검색 기록을 DB에 저장 (순위 리스트 및 ChromaDB 경로 포함)
+
+    # 4) 검색 기록을 DB에 저장 (순위 리스트 및 ChromaDB 경로 포함)
     save_search_history(query, result["result"], relative_path, bar_chart_path, result.get("search_results"), chroma_folder_name)
+
+    return {
+        "success": True,
+        "cached": False,
+        "query": query,
+        "result": result["result"],
+        "ai_answer": extract_ai_answer(result["result"]),
+        "search_results": result.get("search_results", []),
+        "html_file_path": relative_path,
+        "bar_chart_path": bar_chart_path,
+        "chroma_path": chroma_folder_name,
+    }
+
+# ================================================================
+# 9. 상주 검색 서버 (localhost HTTP, JSON 입출력)
+# - 컴파일된 그래프, Chroma 핸들, 모델을 메모리에 유지한 채 여러 쿼리 처리
+# - --workers 2 이상이면 10. 프리포크 워커 풀로 실행
+# ================================================================
+_SEARCH_LOCK = threading.Lock()  # visualizer 등 전역 상태 보호 (한 번에 1개 쿼리)
+_SERVER_STATS = {"requests": 0, "errors": 0}
+# 워커 풀 모드에서만 설정: 이 프로세스의 카운터 슬롯과 세대, 워커 간 공유 카운터, 현재 워커 세대 번호
+_WORKER_POOL = {"slot": None, "worker_generation": None, "counters": None, "generation": None, "workers": 0}
+WORKER_COUNTER_FIELDS = 3   # 슬롯별 [pid, 요청 수, 오류 수]
+
+
+def record_request(error=False):
+    """요청/오류 수 집계 (워커 풀이면 공유 카운터의 이 워커 슬롯에도 기록)
+
+    종료 중인 이전 세대 워커는 공유 카운터에 기록하지 않음
+    (슬롯 묶음은 세대마다 번갈아 쓰므로 짧은 간격으로 두 번 갱신되면 새 워커와 같은 슬롯을 가리킬 수 있음)
+    """
+    _SERVER_STATS["errors" if error else "requests"] += 1
+    counters = _WORKER_POOL["counters"]
+    if counters is not None:
+        with counters.get_lock():
+            if _WORKER_POOL["worker_generation"] == _WORKER_POOL["generation"].value:
+                counters[_WORKER_POOL["slot"] * WORKER_COUNTER_FIELDS + (2 if error else 1)] += 1
+
+
+def process_memory(pid):
+    """/proc/<pid>/smaps_rollup 기준 메모리 MB {rss, pss, private} (Linux 외에는 None)
+
+    pss는 공유 페이지를 공유 프로세스 수로 나눈 값, private은 이 프로세스만 가진 페이지 (fork 후 복사된 페이지 포함)
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:
+        return None
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {"rss_mb": round(fields.get("Rss", 0) / 1024, 1), "pss_mb": round(fields.get("Pss", 0) / 1024, 1),
+            "private_mb": round(private / 1024, 1)}
+
+
+def worker_pool_stats():
+    """현재 세대 워커별 {pid, requests, errors, memory} (단일 프로세스 서버면 None)"""
+    counters = _WORKER_POOL["counters"]
+    if counters is None:
+        return None
+    generation = _WORKER_POOL["generation"].value
+    with counters.get_lock():
+        values = counters[:]
+    workers = _WORKER_POOL["workers"]
+    first = (generation % 2) * workers
+    slots = [values[slot * WORKER_COUNTER_FIELDS:(slot + 1) * WORKER_COUNTER_FIELDS]
+             for slot in range(first, first + workers)]
+    return {
+        "generation": generation,
+        "worker_pid": os.getpid(),
+        "workers": [{"pid": pid, "requests": requests, "errors": errors, "memory": process_memory(pid)}
+                    for pid, requests, errors in slots],
+        "requests": sum(requests for _, requests, _ in slots),
+        "errors": sum(errors for _, _, errors in slots),
+    }
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    """POST /search, POST /reload, GET /health"""
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {
+                "success": True,
+                "chroma_path": CHROMA_PATH,
+                "search_backend": SEARCH_BACKEND,
+                "hybrid_search": HYBRID_SEARCH,
+                **_SERVER_STATS,
+                "metadata_cache": DOCUMENT_CACHE.snapshot_stats(),
+                "query_embedding_cache": query_embedding_cache_stats(),
+                "keyword_cache": keyword_cache_stats(),
+                "worker_pool": worker_pool_stats(),
+            })
+        else:
+            self._send_json(404, {"success": False, "error": "not found"})
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+        except ValueError:
+            self._send_json(400, {"success": False, "error": "잘못된 JSON 요청입니다."})
+            return
+
+        if self.path == "/search":
+            query = (payload.get("query") or "").strip()
+            if not query:
+                self._send_json(400, {"success": False, "error": "검색 쿼리가 제공되지 않았습니다."})
+                return
+            filter_args = payload.get("filters") or {}
+            try:
+                filters = make_filters(filter_args.get("doc_types"), filter_args.get("date_from"),
+                                       filter_args.get("date_to"))
+            except ValueError:
+                self._send_json(400, {"success": False, "error": "날짜 필터 형식은 YYYY-MM-DD 입니다."})
+                return
+            with _SEARCH_LOCK:
+                record_request()
+                try:
+                    response = run_search(query, use_cache=not payload.get("no_cache"), filters=filters)
+                except Exception as e:
+                    record_request(error=True)
+                    print(f"❌ 검색 처리 오류: {e}")
+                    self._send_json(500, {"success": False, "error": str(e)})
+                    return
+            self._send_json(200, response)
+        elif self.path == "/reload":
+            if _WORKER_POOL["counters"] is not None:
+                # 워커 풀: 부모 프로세스가 새 스냅샷을 열고 워커를 교체 (진행 중인 요청은 이전 워커가 마무리)
+                os.kill(os.getppid(), signal.SIGHUP)
+                self._send_json(200, {"success": True, "reloading": True, "chroma_path": get_active_chroma_path()})
+                return
+            with _SEARCH_LOCK:
+                chroma_path = reload_chroma_path()
+            print(f"🔄 벡터스토어 경로 갱신: {chroma_path}")
+            self._send_json(200, {"success": True, "chroma_path": chroma_path})
+        else:
+            self._send_json(404, {"success": False, "error": "not found"})
+
+    def log_message(self, format, *args):
+        print(f"[SERVER] {self.address_string()} - {format % args}")
+
+
+def serve(host=SEARCH_SERVER_HOST, port=SEARCH_SERVER_PORT):
+    """상주 검색 서버 실행 (Ctrl+C로 종료)"""
+    _SHARD_SEARCH["workers"] = None
+    # 모델 클라이언트를 미리 생성해 첫 요청부터 바로 처리
+    get_embeddings(); get_llm(); get_chat_llm()
+    try:
+        get_vectorstore()
+    except Exception as e:
+        print(f"⚠️ ChromaDB 로드 실패 (검색 요청 시 다시 시도): {e}")
+
+    server = ThreadingHTTPServer((host, port), SearchRequestHandler)
+    print(f"🚀 상주 검색 서버 시작: http://{host}:{port} (ChromaDB: {CHROMA_PATH})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 상주 검색 서버 종료")
+    finally:
+        server.server_close()
+
+# ================================================================
+# 10. 프리포크 워커 풀 (--workers N, Unix 전용)
+# - 부모 프로세스가 활성 스냅샷 검색 인덱스를 연 뒤 fork
+#   → 메모리 매핑 파일(vectors/texts 등)과 NumPy 배열(노름, 문서 id, BM25 포스팅)은 워커들이 같은 페이지를 공유
+#   → 문서 메타데이터 dict(NumpyIndex.documents, LexicalIndex.documents/file_names/term_ids)는 Python 객체라
+#     워커가 읽을 때마다 참조 카운트가 바뀌어 접근한 페이지가 워커별로 복사됨 (문서 수에 비례하는 워커별 비용)
+#   → 실제 워커별 비용은 /health의 worker_pool.workers[].memory (private_mb, pss_mb)로 확인
+#   (Chroma 백엔드와 양자화 인덱스의 재채점용 Chroma 핸들은 워커마다 따로 열기)
+# - 워커들은 같은 리스닝 소켓에서 연결을 받아 각자 요청을 1개씩 처리 (CPU 계산이 여러 코어에 분산)
+# - 워커별 요청/오류 수는 공유 메모리 카운터에 기록해 /health에서 조회
+# - 새 스냅샷 게시(POST /reload 또는 kill -HUP <부모 pid>): 부모가 새 인덱스를 열고 새 세대 워커를 띄운 뒤
+#   이전 세대 워커에 SIGTERM → 이전 워커는 처리 중인 요청을 마치고 종료
+# ================================================================
+WORKER_POLL_SEC = 0.5   # 부모 프로세스가 워커 상태/신호를 확인하는 주기
+
+
+class PreforkHTTPServer(HTTPServer):
+    """여러 워커 프로세스가 리스닝 소켓을 공유하는 HTTP 서버 (워커 1개는 요청을 순서대로 처리)
+
+    리스닝 소켓은 논블로킹이라 다른 워커가 먼저 가져간 연결을 기다리며 멈추지 않음
+    """
+
+    def get_request(self):
+        conn, addr = self.socket.accept()
+        conn.setblocking(True)
+        return conn, addr
+
+
+def preload_search_index():
+    """fork 전에 부모 프로세스에서 검색 인덱스 열기 (Chroma 핸들은 fork 후 공유하지 않으므로 제외)
+
+    메모리 매핑 파일과 NumPy 배열은 워커들이 공유하지만, 메타데이터 dict는 워커가 접근하는 만큼 복사됨
+    """
+    if SEARCH_BACKEND == "chroma":
+        return
+    try:
+        get_vectorstore()
+    except Exception as e:
+        print(f"⚠️ 검색 인덱스 로드 실패 (워커에서 검색 요청 시 다시 시도): {e}")
+
+
+def _run_worker(server, slot, generation):
+    """fork된 워커 프로세스 본체 (반환하지 않음)"""
+    _WORKER_POOL.update(slot=slot, worker_generation=generation)
+    _SERVER_STATS.update(requests=0, errors=0)
+    counters = _WORKER_POOL["counters"]
+    with counters.get_lock():
+        counters[slot * WORKER_COUNTER_FIELDS:(slot + 1) * WORKER_COUNTER_FIELDS] = [os.getpid(), 0, 0]
+
+    # SIGTERM: 처리 중인 요청을 마친 뒤 종료 (shutdown은 serve_forever와 다른 스레드에서 호출해야 함)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # Ctrl+C / 재시작 신호는 부모가 처리
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    exit_code = 0
+    try:
+        server.serve_forever(poll_interval=WORKER_POLL_SEC)
+    except Exception as e:
+        print(f"❌ 워커 {os.getpid()} 오류: {e}")
+        exit_code = 1
+    finally:
+        sys.stdout.flush()
+        os._exit(exit_code)
+
+
+def serve_prefork(host=SEARCH_SERVER_HOST, port=SEARCH_SERVER_PORT, workers=SEARCH_SERVER_WORKERS):
+    """프리포크 워커 풀로 상주 검색 서버 실행 (Ctrl+C로 종료, SIGHUP으로 새 스냅샷 적용)"""
+    if not hasattr(os, "fork"):
+        print("⚠️ fork를 지원하지 않는 운영체제라 단일 프로세스 서버로 실행합니다.")
+        serve(host, port)
+        return
+    import multiprocessing
+
+    # 세대마다 슬롯 묶음을 번갈아 씀 (종료 중인 이전 세대 워커는 record_request에서 기록하지 않음)
+    _WORKER_POOL.update(counters=multiprocessing.Array("q", 2 * workers * WORKER_COUNTER_FIELDS),
+                        generation=multiprocessing.Value("q", 0), workers=workers)
+    get_embeddings(); get_llm(); get_chat_llm()
+    preload_search_index()
+
+    server = PreforkHTTPServer((host, port), SearchRequestHandler)
+    server.socket.setblocking(False)
+    events = {"reload": False, "stop": False}
+    signal.signal(signal.SIGHUP, lambda *_: events.update(reload=True))
+    signal.signal(signal.SIGTERM, lambda *_: events.update(stop=True))
+    signal.signal(signal.SIGINT, lambda *_: events.update(stop=True))
+
+    children = {}   # 현재 세대 {pid: 슬롯}
+    retiring = {}   # 이전 세대 {pid: 종료 신호를 보낸 시각}
+    killed = set()  # 제한 시간을 넘겨 SIGKILL을 보낸 이전 세대 워커 (신호는 한 번만)
+
+    def spawn(slot):
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(server, slot, _WORKER_POOL["generation"].value)
+        children[pid] = slot
+
+    def slots():
+        first = (_WORKER_POOL["generation"].value % 2) * workers
+        return range(first, first + workers)
+
+    for slot in slots():
+        spawn(slot)
+    print(f"🚀 상주 검색 서버 시작: http://{host}:{port} (워커 {workers}개, 부모 pid {os.getpid()}, ChromaDB: {CHROMA_PATH})")
+
+    try:
+        while not events["stop"]:
+            time.sleep(WORKER_POLL_SEC)
+
+            # 종료된 워커 정리 (현재 세대 워커가 비정상 종료되면 같은 슬롯으로 다시 띄움)
+            while children or retiring:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+                if not pid:
+                    break
+                killed.discard(pid)
+                if retiring.pop(pid, None) is None and pid in children:
+                    slot = children.pop(pid)
+                    print(f"⚠️ 워커 {pid} 종료 (상태 {status}), 다시 시작합니다.")
+                    if not events["stop"]:
+                        spawn(slot)
+
+            if events["reload"]:
+                events["reload"] = False
+                chroma_path = reload_chroma_path()
+                preload_search_index()
+                _WORKER_POOL["generation"].value += 1
+                previous, children = children, {}
+                for slot in slots():
+                    spawn(slot)
+                for pid in previous:
+                    os.kill(pid, signal.SIGTERM)
+                    retiring[pid] = time.time()
+                print(f"🔄 벡터스토어 갱신: {chroma_path} (워커 {workers}개 교체, 세대 {_WORKER_POOL['generation'].value})")
+
+            # 제한 시간 안에 끝나지 않은 이전 세대 워커는 강제 종료
+            for pid, stopped_at in retiring.items():
+                if pid not in killed and time.time() - stopped_at > SEARCH_SERVER_TIMEOUT:
+                    print(f"⚠️ 이전 세대 워커 {pid}가 {SEARCH_SERVER_TIMEOUT}초 안에 끝나지 않아 강제 종료합니다.")
+                    os.kill(pid, signal.SIGKILL)
+                    killed.add(pid)
+    finally:
+        print("\n🛑 상주 검색 서버 종료 (처리 중인 요청을 마치는 중...)")
+        for pid in list(children) + list(retiring):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(children) + list(retiring):
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        server.server_close()
+
+# ================================================================
+# 11. 실행부 (.py 스크립트용)
+# ================================================================
+if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+
+    if args.serve:
+        if args.workers > 1:
+            serve_prefork(args.host, args.port, args.workers)
+        else:
+            serve(args.host, args.port)
+        sys.exit(0)
+
+    # 커맨드라인 인자에서 쿼리 가져오기
+    if not args.query:
+        print("❌ 오류: 검색 쿼리가 제공되지 않았습니다.")
+        print("사용법: python 3d_file_search.py '<검색 쿼리>'")
+        print("        python 3d_file_search.py --serve [--port 5600] [--workers 4]")
+        sys.exit(1)
+
+    try:
+        filters = make_filters(args.doc_type, args.date_from, args.date_to)
+    except ValueError:
+        print(f"❌ 오류: 날짜 필터는 실제 날짜(YYYY-MM-DD)여야 합니다: {args.date_from} ~ {args.date_to}")
+        sys.exit(1)
+
+    # 상주 서버가 없을 때는 프로세스 내에서 직접 실행
+    print_search_output(run_search(args.query, use_cache=not args.no_cache, filters=filters))
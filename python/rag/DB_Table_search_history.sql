@@ -1,6 +1,7 @@
 CREATE TABLE IF NOT EXISTS `search_history` (
   `id` INT UNSIGNED NOT NULL AUTO_INCREMENT COMMENT '검색 ID',
   `query` TEXT COLLATE utf8mb4_unicode_ci NOT NULL COMMENT '검색 내용',
+  `query_hash` CHAR(64) COLLATE utf8mb4_unicode_ci COMMENT '정규화된 검색 내용의 SHA-256 (검색 기록 캐시 조회용)',
   `search_result` TEXT COLLATE utf8mb4_unicode_ci COMMENT '검색 결과 내용',
   `ai_answer` TEXT COLLATE utf8mb4_unicode_ci COMMENT 'AI 답변',
   `ranking_result` JSON COMMENT '검색 결과 순위 리스트 (JSON)',
@@ -9,6 +10,12 @@ CREATE TABLE IF NOT EXISTS `search_history` (
   `chroma_path` VARCHAR(512) COLLATE utf8mb4_unicode_ci COMMENT '사용된 ChromaDB 경로',
   `created_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '검색 날짜',
   PRIMARY KEY (`id`),
-  KEY `idx_created_at` (`created_at`)
+  KEY `idx_created_at` (`created_at`),
+  KEY `idx_query_hash` (`query_hash`, `chroma_path`(191), `created_at`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='AI 검색 기록 테이블';
 
+
+-- 기존 테이블 마이그레이션
+-- ALTER TABLE search_history
+--     ADD COLUMN `query_hash` CHAR(64) COLLATE utf8mb4_unicode_ci NULL COMMENT '정규화된 검색 내용의 SHA-256 (검색 기록 캐시 조회용)' AFTER `query`,
+--     ADD KEY `idx_query_hash` (`query_hash`, `chroma_path`(191), `created_at`);
@@ -1,22 +1,15 @@
 import os
 import sys
-import pymysql
 import re
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnableSequence
 
 # 공통 모델 설정 import
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from config.models import LLM
+from config.models import get_llm
+from config.db import execute
 
-# DB 접속 정보
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'admin',
-    'password': '1qazZAQ!',
-    'db': 'final',
-    'charset': 'utf8mb4'
-}
+# DB 접속 정보 및 커넥션 풀은 config/db.py에서 import함
 
 # 프롬프트 템플릿
 PROMPT_TEMPLATE = """
@@ -88,7 +81,7 @@ def load_document(file_path: str):
 def summarize_with_llm(docs):
     """문서 요약 처리"""
     try:
-        llm = LLM  # config/models.py에서 import한 모델 사용
+        llm = get_llm()  # config/models.py에서 최초 사용 시 생성
         
         # 문서가 많으면 맨 앞 5개만 사용
         if len(docs) > 5:
@@ -140,27 +133,18 @@ def parse_llm_output(output_text):
 # DB에 INSERT 함수 (중복 체크 추가)
 def insert_into_db(title, summary, keywords, file_location, file_name, doc_type):
     """DB 저장, 중복 체크"""
-    conn = None
     try:
-        conn = pymysql.connect(**DB_CONFIG)
-        with conn.cursor() as cursor:
-            # 중복 체크: 같은 파일명이 이미 존재하는지 확인
-            check_sql = "SELECT COUNT(*) FROM documents WHERE file_name = %s"
-            cursor.execute(check_sql, (file_name,))
-            count = cursor.fetchone()[0]
-            
-            if count > 0:
-                print(f"⚠️ {file_name} 이미 DB에 존재합니다. 스킵합니다.")
-                return False
-            
-            # 중복이 아니면 INSERT
-            sql = """
-            INSERT INTO documents
-            (title, summary, keywords, file_location, file_name, doc_type, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, NOW())
-            """
-            cursor.execute(sql, (title, summary, keywords, file_location, file_name, doc_type))
-        conn.commit()
+        # 중복 체크와 INSERT를 한 문장으로 실행 (같은 파일명이 있으면 0행 삽입, DB 왕복 1회)
+        sql = """
+        INSERT INTO documents
+        (title, summary, keywords, file_location, file_name, doc_type, created_at)
+        SELECT %s, %s, %s, %s, %s, %s, NOW() FROM DUAL
+        WHERE NOT EXISTS (SELECT 1 FROM documents WHERE file_name = %s)
+        """
+        inserted, _ = execute(sql, (title, summary, keywords, file_location, file_name, doc_type, file_name))
+        if not inserted:
+            print(f"⚠️ {file_name} 이미 DB에 존재합니다. 스킵합니다.")
+            return False
         print(f"✅ {file_name} DB 저장 완료!")
         print(f"   파일타입: {doc_type}")
         print(f"   제목: {title[:30]}...")
@@ -171,10 +155,6 @@ def insert_into_db(title, summary, keywords, file_location, file_name, doc_type)
     except Exception as e:
         print(f"❌ {file_name} DB 저장 실패: {e}")
         return False
-        
-    finally:
-        if conn:
-            conn.close()
 
 # 단일 파일 처리 함수
 def process_single_file(file_path, file_name):
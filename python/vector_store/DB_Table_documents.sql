@@ -8,5 +8,14 @@ CREATE TABLE `documents` (
   `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '만든날짜',
   `doc_type` varchar(100) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
   PRIMARY KEY (`id`),
-  KEY `idx_created_at` (`created_at`)
-) ENGINE=InnoDB AUTO_INCREMENT=301 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='요약문서 테이블';
\ No newline at end of file
+  KEY `idx_created_at` (`created_at`),
+  KEY `idx_file_name` (`file_name`),
+  FULLTEXT KEY `ft_documents` (`title`, `summary`, `keywords`, `file_name`) WITH PARSER ngram
+) ENGINE=InnoDB AUTO_INCREMENT=301 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='요약문서 테이블';
+
+-- 기존 테이블 마이그레이션
+-- (ngram 토큰 크기는 서버 설정 ngram_token_size, 기본값 2 → 한글 2글자 단위로 색인)
+-- (vector_store_search.py의 FULLTEXT_COLUMNS와 컬럼 순서가 같아야 MATCH에서 인덱스를 사용)
+-- ALTER TABLE documents
+--     ADD KEY idx_file_name (file_name),
+--     ADD FULLTEXT KEY ft_documents (title, summary, keywords, file_name) WITH PARSER ngram;
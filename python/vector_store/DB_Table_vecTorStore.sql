@@ -2,5 +2,29 @@ CREATE TABLE vectorStore (
     id INT AUTO_INCREMENT PRIMARY KEY,     -- 순서대로 자동 증가
     folder VARCHAR(255) NOT NULL,          -- 폴더명 (예: rag_chroma/documents/20251024_153000)
     count INT NOT NULL,                    -- 문서 수량
+    embedding_model VARCHAR(255) NULL,     -- 임베딩 모델명 (예: exaone3.5:7.8b)
+    embedding_dim INT NULL,                -- 임베딩 벡터 차원
+    build_mode VARCHAR(20) NULL,           -- 생성 방식 (full / incremental)
+    base_folder VARCHAR(255) NULL,         -- 증분 생성 기준 폴더명
+    added_count INT NULL,                  -- 증분 생성 시 추가된 문서 수
+    updated_count INT NULL,                -- 증분 생성 시 변경된 문서 수
+    deleted_count INT NULL,                -- 증분 생성 시 삭제된 문서 수
+    shard_count INT NOT NULL DEFAULT 0,    -- NumPy 인덱스 샤드 수 (0이면 분할하지 않음)
+    is_active TINYINT(1) NOT NULL DEFAULT 0, -- 현재 검색에 사용하는(게시된) 스냅샷 여부
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP -- 문서 생성 날짜 (자동 입력)
-);
\ No newline at end of file
+);
+
+-- 기존 테이블 마이그레이션
+-- ALTER TABLE vectorStore
+--     ADD COLUMN embedding_model VARCHAR(255) NULL AFTER count,
+--     ADD COLUMN embedding_dim INT NULL AFTER embedding_model;
+-- ALTER TABLE vectorStore
+--     ADD COLUMN build_mode VARCHAR(20) NULL AFTER embedding_dim,
+--     ADD COLUMN base_folder VARCHAR(255) NULL AFTER build_mode,
+--     ADD COLUMN added_count INT NULL AFTER base_folder,
+--     ADD COLUMN updated_count INT NULL AFTER added_count,
+--     ADD COLUMN deleted_count INT NULL AFTER updated_count;
+-- ALTER TABLE vectorStore
+--     ADD COLUMN is_active TINYINT(1) NOT NULL DEFAULT 0 AFTER deleted_count;
+-- ALTER TABLE vectorStore
+--     ADD COLUMN shard_count INT NOT NULL DEFAULT 0 AFTER deleted_count;
@@ -0,0 +1,79 @@
+# ================================================================
+# 📄 conftest.py
+# ================================================================
+# vector_store 테스트 공용 fixture
+# - 합성 Chroma 컬렉션으로 스냅샷(numpy_index/, 문서 대표 벡터, lexical_index/)을 만듦
+# - MySQL, Ollama 없이 실행 (쿼리 임베딩은 FixedEmbeddings로 대신함)
+# ================================================================
+
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from vector_store.numpy_index import export_numpy_index, build_document_centroids, CHROMA_COLLECTION
+from vector_store.lexical_index import LexicalIndexBuilder
+
+CHUNKS_PER_DOC = 3
+DOC_TYPES = (".pdf", ".hwp", ".docx")
+
+
+def document_row(doc_id):
+    """documents 테이블 행과 같은 형태의 합성 문서"""
+    doc_type = DOC_TYPES[doc_id % len(DOC_TYPES)]
+    return {
+        "id": doc_id,
+        "file_name": f"report_{doc_id:03d}{doc_type}",
+        "file_location": f"/data/report_{doc_id:03d}{doc_type}",
+        "title": f"제목 {doc_id}",
+        "summary": f"요약 {doc_id}",
+        "keywords": f"키워드{doc_id % 7}",
+        "doc_type": doc_type,
+        "created_at": datetime(2025, 9, 1 + doc_id % 28),
+    }
+
+
+class FixedEmbeddings:
+    """embed_query가 항상 정해 둔 벡터를 돌려주는 임베딩 (Ollama 대신)"""
+
+    def __init__(self, vector):
+        self.vector = [float(value) for value in vector]
+
+    def embed_query(self, query):
+        return list(self.vector)
+
+
+@pytest.fixture
+def make_snapshot(tmp_path):
+    """make_snapshot(documents, dim, seed, lexical) → 합성 스냅샷 폴더 경로 (문서마다 청크 CHUNKS_PER_DOC개)"""
+    import chromadb
+
+    def make(documents=40, dim=16, seed=0, lexical=True):
+        path = str(tmp_path / f"snapshot_{documents}_{dim}_{seed}")
+        rows = [document_row(doc_id) for doc_id in range(1, documents + 1)]
+        vectors = np.random.default_rng(seed).normal(size=(documents * CHUNKS_PER_DOC, dim)).astype(np.float32)
+
+        ids, texts, metadatas = [], [], []
+        for i in range(len(vectors)):
+            row = rows[i // CHUNKS_PER_DOC]
+            ids.append(f"chunk-{i}")
+            texts.append(f"{row['title']}. {row['summary']} ({i % CHUNKS_PER_DOC})")
+            metadatas.append({"source": "mysql", "table": "documents", "id": row["id"],
+                              "file_name": row["file_name"], "title": row["title"], "summary": row["summary"],
+                              "doc_type": row["doc_type"], "created_at": int(row["created_at"].timestamp())})
+        collection = chromadb.PersistentClient(path=path).get_or_create_collection(CHROMA_COLLECTION)
+        collection.add(ids=ids, embeddings=vectors.tolist(), documents=texts, metadatas=metadatas)
+
+        export_numpy_index(collection, path, "test-embedding")
+        build_document_centroids(path)
+        if lexical:
+            builder = LexicalIndexBuilder()
+            for row in rows:
+                builder.add(row)
+            builder.save(path)
+        return path
+
+    return make
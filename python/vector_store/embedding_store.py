@@ -0,0 +1,206 @@
+# ================================================================
+# 📄 embedding_store.py
+# ================================================================
+# 청크 임베딩 저장소 (내용 주소 방식)
+# - 키: sha256(임베딩 모델명 + 청크 텍스트), 값: float32 벡터
+# - vector_store_create.py가 Ollama 호출 전에 조회하고, 새로 만든 임베딩을 저장
+#   → 내용이 같은 청크는 스냅샷이 바뀌어도 다시 임베딩하지 않음
+# - 어떤 스냅샷에서도 쓰지 않는 벡터는 gc 명령으로 삭제
+#
+# 사용법:
+#   python python/vector_store/embedding_store.py stats
+#   python python/vector_store/embedding_store.py gc [--dry-run]
+# ================================================================
+
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from config.models import EMBEDDING_MODEL_NAME
+from config.persistent_cache import CACHE_DIR
+
+EMBEDDING_STORE_PATH = os.path.join(CACHE_DIR, "chunk_embeddings.sqlite")
+GC_PAGE_SIZE = 1000   # gc 시 스냅샷에서 한 번에 읽는 청크 수
+
+
+def chunk_key(model_name, text):
+    """청크 임베딩 키 (모델명 + 청크 텍스트)"""
+    return hashlib.sha256(f"{model_name}\n{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """SQLite 파일 하나에 청크 임베딩을 보관하는 저장소"""
+
+    def __init__(self, path=EMBEDDING_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        """SQLite 연결 (최초 사용 시 생성, fork된 자식 프로세스에서는 새로 연결)"""
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunk_embeddings ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get_many(self, keys):
+        """{키: 벡터(list)} 반환 (저장되지 않은 키는 제외)"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            # SQLite 변수 개수 제한(기본 999)보다 작게 나눠 조회
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM chunk_embeddings WHERE key IN ({', '.join(['?'] * len(chunk))})", chunk
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = array("f", vector).tolist()
+        return found
+
+    def put_many(self, model_name, items):
+        """(키, 벡터) 목록 저장"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunk_embeddings (key, model, vector, created_at) VALUES (?, ?, ?, ?)",
+                [(key, model_name, sqlite3.Binary(array("f", vector).tobytes()), now) for key, vector in items],
+            )
+            conn.commit()
+
+    def delete_unreferenced(self, live_keys, dry_run=False):
+        """live_keys에 없는 벡터 삭제, 삭제(대상) 개수 반환"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS live_keys (key TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM live_keys")
+            conn.executemany("INSERT OR IGNORE INTO live_keys (key) VALUES (?)", ((key,) for key in live_keys))
+            where = "key NOT IN (SELECT key FROM live_keys)"
+            if dry_run:
+                removed = conn.execute(f"SELECT COUNT(*) FROM chunk_embeddings WHERE {where}").fetchone()[0]
+            else:
+                removed = conn.execute(f"DELETE FROM chunk_embeddings WHERE {where}").rowcount
+            conn.execute("DELETE FROM live_keys")
+            conn.commit()
+            if removed and not dry_run:
+                conn.execute("VACUUM")
+        return removed
+
+    def stats(self):
+        """모델별 저장 개수와 파일 크기"""
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute("SELECT model, COUNT(*) FROM chunk_embeddings GROUP BY model").fetchall()
+        return {
+            "entries": sum(count for _, count in rows),
+            "by_model": dict(rows),
+            "file_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+
+class StoredEmbeddings(Embeddings):
+    """embed_documents 결과를 EmbeddingStore에서 먼저 찾는 임베딩 래퍼 (쿼리 임베딩은 그대로 위임)"""
+
+    def __init__(self, base, model_name, store):
+        self.base = base
+        self.model_name = model_name
+        self.store = store
+        self.reused = 0
+        self.embedded = 0
+        self._count_lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        keys = [chunk_key(self.model_name, text) for text in texts]
+        found = self.store.get_many(keys)
+        # 저장소에 없는 청크만 임베딩 (같은 배치 안의 중복 텍스트는 1번만)
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+
+        if missing:
+            new_vectors = self.base.embed_documents(list(missing.values()))
+            self.store.put_many(self.model_name, zip(missing, new_vectors))
+            found.update(zip(missing, new_vectors))
+
+        with self._count_lock:
+            self.reused += len(texts) - len(missing)
+            self.embedded += len(missing)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text):
+        return self.base.embed_query(text)
+
+
+# ================================================================
+# GC: 현재 남아 있는 스냅샷이 참조하는 청크 키 수집
+# ================================================================
+def collect_live_keys():
+    """SNAPSHOT_ROOT 아래 모든 스냅샷의 청크 키 집합 (읽을 수 없는 스냅샷이 있으면 None)"""
+    import chromadb
+    from vector_store.snapshot import SNAPSHOT_ROOT, read_snapshot_info
+
+    live_keys = set()
+    if not os.path.isdir(SNAPSHOT_ROOT):
+        return live_keys
+
+    for folder in sorted(os.listdir(SNAPSHOT_ROOT)):
+        snapshot_path = os.path.join(SNAPSHOT_ROOT, folder)
+        if not os.path.isdir(snapshot_path):
+            continue
+        model_name = (read_snapshot_info(snapshot_path) or {}).get("embedding_model") or EMBEDDING_MODEL_NAME
+        try:
+            collection = chromadb.PersistentClient(path=snapshot_path).get_collection("langchain")
+        except Exception as e:
+            # 참조 여부를 알 수 없으므로 잘못 삭제하지 않도록 gc 중단
+            print(f"❌ 스냅샷을 읽을 수 없습니다: {folder} ({e})")
+            return None
+
+        count = collection.count()
+        for offset in range(0, count, GC_PAGE_SIZE):
+            page = collection.get(include=["documents"], limit=GC_PAGE_SIZE, offset=offset)
+            live_keys.update(chunk_key(model_name, text) for text in page["documents"] if text is not None)
+        print(f"   📁 {folder}: {count}개 청크 ({model_name})")
+    return live_keys
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="청크 임베딩 저장소 관리")
+    parser.add_argument("command", choices=["stats", "gc"], help="stats: 저장 현황, gc: 사용하지 않는 벡터 삭제")
+    parser.add_argument("--dry-run", action="store_true", help="gc 시 삭제하지 않고 대상 개수만 출력")
+    args = parser.parse_args()
+
+    store = EmbeddingStore()
+    if args.command == "stats":
+        stats = store.stats()
+        print(f"📦 청크 임베딩 저장소: {stats['entries']}개, {stats['file_bytes'] / 1024 / 1024:.1f}MB ({store.path})")
+        for model, count in stats["by_model"].items():
+            print(f"   - {model}: {count}개")
+    else:
+        print("🔍 스냅샷이 참조하는 청크 수집 중...")
+        live_keys = collect_live_keys()
+        if live_keys is None:
+            print("⚠️ 읽을 수 없는 스냅샷이 있어 gc를 중단합니다.")
+            sys.exit(1)
+        removed = store.delete_unreferenced(live_keys, dry_run=args.dry_run)
+        action = "삭제 대상" if args.dry_run else "삭제 완료"
+        print(f"🧹 {action}: {removed}개 (참조 중인 청크 {len(live_keys)}개 유지)")
@@ -0,0 +1,303 @@
+# ================================================================
+# 📄 ivf_index.py
+# ================================================================
+# 스냅샷 NumPy 인덱스 위에 만드는 IVF(역파일, 클러스터) 근사 검색 인덱스 (NumPy만 사용, CPU 전용)
+# - 생성: 청크 임베딩 표본으로 k-means → 모든 청크를 가장 가까운 클러스터에 배정
+#         → 클러스터 순서로 벡터를 다시 써서 클러스터마다 연속된 블록으로 저장
+# - 검색: 쿼리와 가까운 클러스터 nprobe개의 블록만 읽어 거리 계산
+#   nprobe를 늘리면 재현율↑ 지연↑, 메모리는 메모리 매핑이라 인덱스 크기와 관계없이 일정
+# - 스냅샷 폴더 안 ivf_index/ 에 저장
+#     centroids.npy    : float32 (클러스터 수 x 차원)
+#     list_offsets.npy : 클러스터별 블록 시작 위치 (클러스터 수 + 1)
+#     vectors.npy      : float32, 클러스터 순서로 재배열한 청크 벡터 (메모리 매핑)
+#     rows.npy         : 재배열 위치 → numpy_index/ 청크 행 번호
+#     ivf_info.json    : 클러스터 수, k-means 반복 횟수, 청크 수, 거리 방식
+# - 거리 방식(l2 / cosine)은 생성 시 정함: cosine이면 단위 벡터로 구면 k-means를 돌려 중심도 단위 벡터로 저장
+#   (단위 중심에서는 제곱 L2 순위 = 코사인 순위이므로 배정/탐색 코드가 두 방식에 공통)
+# - IVFIndex는 NumpyIndex를 상속하므로 텍스트/메타데이터/검색 필터는 numpy_index/ 를 그대로 사용
+#
+# 사용법:
+#   python python/vector_store/ivf_index.py build [--lists 0] [--metric l2|cosine] [--snapshot <경로>]
+#   python python/vector_store/ivf_index.py benchmark --nprobes 1,2,4,8,16,32 [--queries 100]
+# ================================================================
+
+import os
+import sys
+import json
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from vector_store.numpy_index import (
+    NumpyIndex, top_k_indices, _segment_minimums, benchmark_queries, held_out_depth, drop_held_out,
+    latency_summary, DEFAULT_METRIC, QUANTIZE_BLOCK_ROWS, BENCHMARK_QUERY_SOURCES,
+)
+
+IVF_INDEX_DIR = "ivf_index"
+# 클러스터 수 (0이면 √청크 수)
+IVF_LISTS = int(os.environ.get("IVF_LISTS", "0"))
+# 검색 시 읽는 클러스터 수
+IVF_NPROBE = int(os.environ.get("IVF_NPROBE", "16"))
+# 벡터스토어 생성 시 IVF 인덱스를 함께 만들지 여부
+VECTOR_IVF = os.environ.get("VECTOR_IVF", "0") == "1"
+IVF_METRICS = ("l2", "cosine")
+IVF_TRAIN_SAMPLE = 65536   # k-means 학습에 쓰는 최대 청크 수
+IVF_ITERATIONS = 20        # k-means 최대 반복 횟수
+
+
+def ivf_index_path(snapshot_path):
+    return os.path.join(snapshot_path, IVF_INDEX_DIR)
+
+
+def has_ivf_index(snapshot_path):
+    return os.path.exists(os.path.join(ivf_index_path(snapshot_path), "ivf_info.json"))
+
+
+# ================================================================
+# 1. k-means / 인덱스 생성 (vector_store_create.py에서 NumPy 인덱스 내보내기 후 호출)
+# ================================================================
+def assign_lists(vectors, centroids, block_rows=QUANTIZE_BLOCK_ROWS):
+    """각 벡터와 가장 가까운(제곱 L2) 클러스터 번호 (블록 단위로 float32 변환)
+
+    중심이 단위 벡터(cosine 인덱스)이면 벡터 크기와 관계없이 코사인 유사도가 가장 큰 클러스터와 같음
+    """
+    centroid_sq = (centroids ** 2).sum(axis=1)
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block_rows):
+        block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+        labels[start:start + len(block)] = np.argmin(centroid_sq - 2.0 * (block @ centroids.T), axis=1)
+    return labels
+
+
+def kmeans(sample, lists, iterations=IVF_ITERATIONS, seed=0, spherical=False):
+    """Lloyd k-means → float32 (lists x 차원) 중심 (빈 클러스터는 임의 표본으로 다시 시작)
+
+    spherical이면 매 반복 중심을 단위 벡터로 정규화 (sample도 단위 벡터여야 함, cosine 인덱스용)
+    """
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), size=lists, replace=False)].copy()
+    labels = None
+    for _ in range(iterations):
+        new_labels = assign_lists(sample, centroids)
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+        # 클러스터 번호순으로 정렬해 클러스터별 합을 reduceat 한 번으로 계산
+        order = np.argsort(labels, kind="stable")
+        sorted_labels = labels[order]
+        starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+        counts = np.diff(np.r_[starts, len(order)])
+        centroids[sorted_labels[starts]] = np.add.reduceat(sample[order], starts, axis=0) / counts[:, None]
+        empty = np.setdiff1d(np.arange(lists), sorted_labels[starts])
+        if len(empty):
+            centroids[empty] = sample[rng.choice(len(sample), size=len(empty), replace=False)]
+        if spherical:
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+def build_ivf_index(snapshot_path, lists=IVF_LISTS, iterations=IVF_ITERATIONS, seed=0, metric=DEFAULT_METRIC):
+    """numpy_index/ 벡터로 ivf_index/ 생성, ivf_info 반환 (metric: 검색 시 사용할 거리 방식)"""
+    if metric not in IVF_METRICS:
+        raise ValueError(f"지원하지 않는 거리 방식입니다: {metric} (선택: {', '.join(IVF_METRICS)})")
+    source = NumpyIndex(snapshot_path, use_quantized=False, use_doc_centroids=False)
+    count = len(source)
+    if not count:
+        raise ValueError("청크가 없는 스냅샷에는 IVF 인덱스를 만들 수 없습니다.")
+    rng = np.random.default_rng(seed)
+    sample_rows = np.sort(rng.choice(count, size=min(count, IVF_TRAIN_SAMPLE), replace=False))
+    sample = np.asarray(source.vectors[sample_rows], dtype=np.float32)
+    lists = min(lists or max(1, int(round(np.sqrt(count)))), len(sample))
+
+    if metric == "cosine":
+        sample /= np.maximum(np.linalg.norm(sample, axis=1, keepdims=True), 1e-12)
+    centroids = kmeans(sample, lists, iterations, seed, spherical=metric == "cosine")
+    labels = assign_lists(source.vectors, centroids)
+    # 같은 클러스터 안에서는 원래 행 순서(문서 id 순) 유지
+    rows = np.argsort(labels, kind="stable")
+    offsets = np.searchsorted(labels[rows], np.arange(lists + 1), side="left").astype(np.int64)
+
+    index_dir = ivf_index_path(snapshot_path)
+    os.makedirs(index_dir, exist_ok=True)
+    vectors = np.lib.format.open_memmap(os.path.join(index_dir, "vectors.npy"), mode="w+",
+                                        dtype=np.float32, shape=(count, source.vectors.shape[1]))
+    for start in range(0, count, QUANTIZE_BLOCK_ROWS):
+        block = rows[start:start + QUANTIZE_BLOCK_ROWS]
+        vectors[start:start + len(block)] = source.vectors[block]
+    vectors.flush()
+    np.save(os.path.join(index_dir, "centroids.npy"), centroids.astype(np.float32))
+    np.save(os.path.join(index_dir, "list_offsets.npy"), offsets)
+    np.save(os.path.join(index_dir, "rows.npy"), rows)
+
+    sizes = np.diff(offsets)
+    info = {"lists": lists, "iterations": iterations, "count": count, "train_sample": len(sample), "metric": metric,
+            "largest_list": int(sizes.max()), "empty_lists": int((sizes == 0).sum())}
+    with open(os.path.join(index_dir, "ivf_info.json"), "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+    return info
+
+
+# ================================================================
+# 2. 검색
+# ================================================================
+class IVFIndex(NumpyIndex):
+    """ivf_index/ 에서 가까운 클러스터 nprobe개만 계산하는 근사 검색 벡터스토어
+
+    검색 필터로 남은 행이 nprobe개 클러스터의 예상 크기 이하이면 해당 행만 정확히 계산
+    metric을 생략하면 인덱스를 만든 거리 방식 사용 (다른 방식으로 열면 클러스터가 맞지 않으므로 ValueError)
+    """
+
+    def __init__(self, snapshot_path, embedding_function=None, metric=None, nprobe=IVF_NPROBE):
+        index_dir = ivf_index_path(snapshot_path)
+        with open(os.path.join(index_dir, "ivf_info.json"), encoding="utf-8") as f:
+            ivf_info = json.load(f)
+        built = ivf_info.get("metric", "l2")
+        if metric and metric != built:
+            raise ValueError(f"IVF 인덱스는 {built} 거리로 만들어졌습니다 ({metric}로 검색하려면 --metric {metric}로 다시 생성)")
+        super().__init__(snapshot_path, embedding_function, built, use_quantized=False, use_doc_centroids=False)
+        self.ivf_info = ivf_info
+        self.list_centroids = np.load(os.path.join(index_dir, "centroids.npy"))
+        self.list_centroid_sq = (self.list_centroids ** 2).sum(axis=1)
+        self.list_offsets = np.load(os.path.join(index_dir, "list_offsets.npy"))
+        self.list_vectors = np.load(os.path.join(index_dir, "vectors.npy"), mmap_mode="r")
+        self.list_rows = np.load(os.path.join(index_dir, "rows.npy"))
+        self.nprobe = max(1, min(nprobe, len(self.list_centroids)))
+
+    def probe(self, query_vector, rows=None):
+        """가까운 클러스터 nprobe개의 (청크 행 번호, 거리) 배열 (rows 지정 시 해당 행만, 전부 계산이 낫다면 None)"""
+        query = np.asarray(query_vector, dtype=np.float32)
+        expected = len(self) * self.nprobe / len(self.list_centroids)
+        if rows is not None and len(rows) <= expected:
+            return None
+
+        # 제곱 L2 순위 (cosine 인덱스는 중심이 단위 벡터라 코사인 순위와 같음)
+        lists = top_k_indices(self.list_centroid_sq - 2.0 * (self.list_centroids @ query), self.nprobe)
+        row_parts, dot_parts = [], []
+        for i in np.sort(lists):   # 클러스터 블록을 파일 순서대로 읽음
+            start, end = self.list_offsets[i], self.list_offsets[i + 1]
+            if start < end:
+                row_parts.append(self.list_rows[start:end])
+                dot_parts.append(np.asarray(self.list_vectors[start:end], dtype=np.float32) @ query)
+        if not row_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        candidate_rows, dots = np.concatenate(row_parts), np.concatenate(dot_parts)
+
+        if rows is not None:
+            allowed = np.zeros(len(self), dtype=bool)
+            allowed[rows] = True
+            keep = allowed[candidate_rows]
+            candidate_rows, dots = candidate_rows[keep], dots[keep]
+        if self.metric == "cosine":
+            distances = 1.0 - dots / (self.norms[candidate_rows] * np.linalg.norm(query) + 1e-12)
+        else:
+            distances = np.maximum(self.sq_norms[candidate_rows] - 2.0 * dots + float(query @ query), 0.0)
+        return candidate_rows, distances
+
+    def search_vector(self, query_vector, k=10, rows=None):
+        """[(청크 행 번호, 거리)] 근사 상위 k개"""
+        probed = self.probe(query_vector, rows)
+        if probed is None:
+            return super().search_vector(query_vector, k, rows)
+        candidate_rows, distances = probed
+        return [(int(candidate_rows[i]), float(distances[i])) for i in top_k_indices(distances, k)]
+
+    def search_documents(self, query_vector, k=10, rows=None):
+        """[(문서별 최적 청크 행 번호, 거리)] 서로 다른 문서 근사 상위 k개"""
+        if rows is not None:
+            rows = np.asarray(rows)
+        if not len(self) or (rows is not None and not len(rows)):
+            return []
+        probed = self.probe(query_vector, rows)
+        if probed is None:
+            return super().search_documents(query_vector, k, rows)
+        candidate_rows, distances = probed
+        if not len(candidate_rows):
+            return []
+        # 행 번호순(= 문서 id 순)으로 정렬하면 문서 구간별 최솟값으로 묶을 수 있음
+        order = np.argsort(candidate_rows, kind="stable")
+        candidate_rows, distances = candidate_rows[order], distances[order]
+        starts, ends, best = _segment_minimums(self.doc_ids[candidate_rows], distances)
+        results = []
+        for i in top_k_indices(best, k):
+            position = starts[i] + int(np.argmin(distances[starts[i]:ends[i]]))
+            results.append((int(candidate_rows[position]), float(distances[position])))
+        return results
+
+
+# ================================================================
+# 3. 벤치마크 (nprobe별 재현율 / 지연 시간)
+# ================================================================
+def benchmark_ivf(snapshot_path, nprobes=(1, 2, 4, 8, 16, 32), queries=100, k=10, seed=0, source="held-out"):
+    """nprobe별 IVF 문서 top-k vs NumPy 전수 검색: 문서 recall@k, 지연 시간, 계산한 청크 비율"""
+    ivf = IVFIndex(snapshot_path)
+    exact_index = NumpyIndex(snapshot_path, metric=ivf.metric, use_quantized=False, use_doc_centroids=False)
+    query_vectors = benchmark_queries(exact_index, queries, seed, source)
+
+    exact_times, expected = [], []
+    for query, exclude in query_vectors:
+        started = time.perf_counter()
+        found = exact_index.search_documents(query, held_out_depth(exact_index, k, exclude))
+        exact_times.append(time.perf_counter() - started)
+        expected.append({int(exact_index.doc_ids[row]) for row, _ in drop_held_out(found, exact_index.doc_ids, exclude, k)})
+
+    results = []
+    for nprobe in nprobes:
+        ivf.nprobe = max(1, min(nprobe, len(ivf.list_centroids)))
+        times, recalls, scanned = [], [], []
+        for (query, exclude), expected_docs in zip(query_vectors, expected):
+            started = time.perf_counter()
+            found = drop_held_out(ivf.search_documents(query, held_out_depth(ivf, k, exclude)), ivf.doc_ids, exclude, k)
+            times.append(time.perf_counter() - started)
+            scanned.append(len(ivf.probe(query)[0]))
+            recalls.append(len(expected_docs & {int(ivf.doc_ids[row]) for row, _ in found}) / max(1, len(expected_docs)))
+        results.append({"nprobe": ivf.nprobe, **latency_summary(times),
+                        "scanned_chunk_ratio": round(float(np.mean(scanned)) / max(1, len(ivf)), 4),
+                        "doc_recall_at_k": round(float(np.mean(recalls)), 4)})
+
+    return {
+        "snapshot": os.path.basename(os.path.normpath(snapshot_path)),
+        "chunks": len(exact_index),
+        "lists": ivf.ivf_info["lists"],
+        "metric": ivf.metric,
+        "query_source": source,
+        "queries": len(query_vectors),
+        "k": k,
+        "full_scan": latency_summary(exact_times),
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from vector_store.snapshot import active_snapshot_path
+
+    parser = argparse.ArgumentParser(description="IVF(클러스터) 근사 검색 인덱스 생성 / nprobe별 벤치마크")
+    parser.add_argument("command", choices=["build", "benchmark"],
+                        help="build: 스냅샷에 ivf_index/ 생성, benchmark: nprobe별 recall@k와 지연 시간 비교")
+    parser.add_argument("--snapshot", help="스냅샷 폴더 경로 (기본: 활성 스냅샷)")
+    parser.add_argument("--lists", type=int, default=IVF_LISTS, help="클러스터 수 (0이면 √청크 수)")
+    parser.add_argument("--iterations", type=int, default=IVF_ITERATIONS, help="k-means 최대 반복 횟수")
+    parser.add_argument("--metric", choices=IVF_METRICS, default=DEFAULT_METRIC, help="build 시 검색 거리 방식")
+    parser.add_argument("--nprobes", default="1,2,4,8,16,32", help="benchmark 시 비교할 nprobe 목록")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--query-source", choices=BENCHMARK_QUERY_SOURCES, default="held-out",
+                        help="벤치마크 쿼리 (held-out: 청크 벡터, 자기 문서 제외 / history: search_history 검색어 임베딩)")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    snapshot = args.snapshot or active_snapshot_path()
+    if not snapshot:
+        print("❌ 스냅샷을 찾을 수 없습니다.")
+        sys.exit(1)
+
+    if args.command == "build":
+        started = time.perf_counter()
+        info = build_ivf_index(snapshot, args.lists, args.iterations, metric=args.metric)
+        print(f"✅ IVF 인덱스 생성 완료 ({info['metric']}): 클러스터 {info['lists']}개, {info['count']}개 청크 "
+              f"(최대 클러스터 {info['largest_list']}개, {time.perf_counter() - started:.1f}초)")
+    else:
+        nprobes = [int(n) for n in args.nprobes.split(",") if n.strip()]
+        print(json.dumps(benchmark_ivf(snapshot, nprobes, queries=args.queries, k=args.k, source=args.query_source),
+                         ensure_ascii=False, indent=2))
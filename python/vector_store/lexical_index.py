@@ -0,0 +1,294 @@
+# ================================================================
+# 📄 lexical_index.py
+# ================================================================
+# documents 테이블의 파일명/제목/요약/키워드로 만드는 BM25 역색인
+# - 스냅샷 폴더 안 lexical_index/ 에 저장 (vector_store_create.py가 생성 시 함께 기록)
+#     terms.json          : 색인어 목록 (정렬, 위치 = 색인어 번호)
+#     postings_offsets.npy: 색인어별 posting 시작 위치 (색인어 수 + 1)
+#     postings_rows.npy   : posting 문서 행 번호 (int32)
+#     postings_tf.npy     : 필드 가중치를 반영한 출현 빈도 (uint16)
+#     doc_ids.npy         : 행 번호 → documents.id
+#     doc_lengths.npy     : 문서 길이 (색인어 수)
+#     documents.json      : 문서별 file_name, title, summary, doc_type, created_at
+#                           (벡터 검색에 없는 문서의 결과 구성 / 검색 필터용)
+#     lexical_info.json   : 문서 수, 평균 길이, BM25 파라미터
+# - 한국어 토큰화: 공백/기호/문자 종류로 분리 → 조사 제거 → 한글 3글자 이상은 2글자 n-gram 추가
+#   (형태소 분석기 없이 "회의록을" → "회의록", "회의", "의록" 으로 복합명사 부분 검색 가능)
+# - 파일명(확장자 포함/제외)과 정확히 같은 검색어는 exact_matches()로 바로 찾음
+#
+# 사용법:
+#   python python/vector_store/lexical_index.py build [--snapshot <스냅샷 경로>]
+#   python python/vector_store/lexical_index.py search "<검색어>" [--snapshot <스냅샷 경로>]
+# ================================================================
+
+import os
+import re
+import sys
+import json
+import math
+import unicodedata
+from collections import Counter, defaultdict
+
+import numpy as np
+from langchain_core.documents import Document
+
+LEXICAL_INDEX_DIR = "lexical_index"
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 필드별 가중치 (출현 빈도에 곱함)
+FIELD_WEIGHTS = {"file_name": 3, "title": 2, "keywords": 2, "summary": 1}
+
+# 길이가 긴 것부터 비교해 하나만 제거
+JOSA_SUFFIXES = sorted([
+    "은", "는", "이", "가", "을", "를", "의", "에", "와", "과", "도", "만", "로", "으로",
+    "에서", "에게", "한테", "께서", "까지", "부터", "보다", "처럼", "이나", "이랑", "랑",
+    "에는", "에서는", "으로는", "로는", "에도", "과는", "와는", "이며", "이고",
+], key=len, reverse=True)
+
+_TOKEN_PATTERN = re.compile(r"[0-9a-z]+|[가-힣]+")   # 영문/숫자와 한글은 따로 분리 ("pdf와" → "pdf", "와")
+_HANGUL_PATTERN = re.compile(r"^[가-힣]+$")
+
+
+def lexical_index_path(snapshot_path):
+    return os.path.join(snapshot_path, LEXICAL_INDEX_DIR)
+
+
+def has_lexical_index(snapshot_path):
+    return os.path.exists(os.path.join(lexical_index_path(snapshot_path), "lexical_info.json"))
+
+
+def normalize_file_name(name):
+    """파일명 비교용 정규화 (NFC, 소문자, 앞뒤 공백 제거)"""
+    return unicodedata.normalize("NFC", name or "").strip().lower()
+
+
+def strip_josa(word):
+    """한글 단어 끝의 조사 하나 제거 (남는 부분이 2글자 이상일 때만)"""
+    if not _HANGUL_PATTERN.match(word):
+        return word
+    for suffix in JOSA_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """색인/검색 공용 토큰화 → 토큰 목록 (중복 포함)"""
+    tokens = []
+    for word in _TOKEN_PATTERN.findall(unicodedata.normalize("NFC", text or "").lower()):
+        if word in JOSA_SUFFIXES:
+            continue
+        word = strip_josa(word)
+        tokens.append(word)
+        if len(word) >= 3 and _HANGUL_PATTERN.match(word):
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+# ================================================================
+# 1. 색인 생성
+# ================================================================
+class LexicalIndexBuilder:
+    """문서 행을 하나씩 받아 BM25 역색인을 만들고 lexical_index/ 로 저장"""
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []
+        self.doc_lengths = []
+        self.documents = {}
+        self.postings = defaultdict(list)   # 색인어 → [(행 번호, 빈도)]
+
+    def add(self, row):
+        """documents 행(id, file_name, title, summary, keywords, doc_type, created_at) 추가"""
+        term_counts = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(row.get(field)):
+                term_counts[token] += weight
+        if not term_counts:
+            return
+
+        doc_row = len(self.doc_ids)
+        self.doc_ids.append(int(row["id"]))
+        self.doc_lengths.append(sum(term_counts.values()))
+        self.documents[int(row["id"])] = {
+            "file_name": (row.get("file_name") or "").strip(),
+            "title": (row.get("title") or "").strip(),
+            "summary": (row.get("summary") or "").strip(),
+            "doc_type": (row.get("doc_type") or "").lower(),
+            "created_at": int(row["created_at"].timestamp()) if row.get("created_at") else None,
+        }
+        for term, count in term_counts.items():
+            self.postings[term].append((doc_row, min(count, np.iinfo(np.uint16).max)))
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def save(self, snapshot_path):
+        """lexical_index/ 에 저장, lexical_info 반환"""
+        index_dir = lexical_index_path(snapshot_path)
+        os.makedirs(index_dir, exist_ok=True)
+
+        terms = sorted(self.postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(self.postings[term])
+        rows = np.empty(offsets[-1], dtype=np.int32)
+        tfs = np.empty(offsets[-1], dtype=np.uint16)
+        for i, term in enumerate(terms):
+            entries = self.postings[term]
+            rows[offsets[i]:offsets[i + 1]] = [doc_row for doc_row, _ in entries]
+            tfs[offsets[i]:offsets[i + 1]] = [count for _, count in entries]
+
+        with open(os.path.join(index_dir, "terms.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False)
+        np.save(os.path.join(index_dir, "postings_offsets.npy"), offsets)
+        np.save(os.path.join(index_dir, "postings_rows.npy"), rows)
+        np.save(os.path.join(index_dir, "postings_tf.npy"), tfs)
+        np.save(os.path.join(index_dir, "doc_ids.npy"), np.asarray(self.doc_ids, dtype=np.int64))
+        np.save(os.path.join(index_dir, "doc_lengths.npy"), np.asarray(self.doc_lengths, dtype=np.float32))
+        with open(os.path.join(index_dir, "documents.json"), "w", encoding="utf-8") as f:
+            json.dump({str(doc_id): meta for doc_id, meta in self.documents.items()}, f, ensure_ascii=False)
+
+        info = {
+            "count": len(self.doc_ids),
+            "terms": len(terms),
+            "avg_length": float(np.mean(self.doc_lengths)) if self.doc_lengths else 0.0,
+            "k1": self.k1,
+            "b": self.b,
+            "field_weights": FIELD_WEIGHTS,
+        }
+        with open(os.path.join(index_dir, "lexical_info.json"), "w", encoding="utf-8") as f:
+            json.dump(info, f, ensure_ascii=False, indent=2)
+        return info
+
+
+# ================================================================
+# 2. 검색
+# ================================================================
+class LexicalIndex:
+    """lexical_index/ 를 열어 BM25 점수로 문서를 찾는 검색기 (결과 단위: 문서)"""
+
+    def __init__(self, snapshot_path):
+        index_dir = lexical_index_path(snapshot_path)
+        with open(os.path.join(index_dir, "lexical_info.json"), encoding="utf-8") as f:
+            self.info = json.load(f)
+        with open(os.path.join(index_dir, "terms.json"), encoding="utf-8") as f:
+            self.term_ids = {term: i for i, term in enumerate(json.load(f))}
+        self.offsets = np.load(os.path.join(index_dir, "postings_offsets.npy"))
+        self.rows = np.load(os.path.join(index_dir, "postings_rows.npy"), mmap_mode="r")
+        self.tfs = np.load(os.path.join(index_dir, "postings_tf.npy"), mmap_mode="r")
+        self.doc_ids = np.load(os.path.join(index_dir, "doc_ids.npy"))
+        self.doc_lengths = np.load(os.path.join(index_dir, "doc_lengths.npy"))
+        with open(os.path.join(index_dir, "documents.json"), encoding="utf-8") as f:
+            self.documents = {int(doc_id): meta for doc_id, meta in json.load(f).items()}
+        # 검색 필터용 행별 파일 형식 / 생성 시각 (없으면 -1)
+        self.row_doc_types = np.asarray([self.documents[int(d)].get("doc_type") or "" for d in self.doc_ids])
+        self.row_created_at = np.asarray([self.documents[int(d)].get("created_at") or -1 for d in self.doc_ids],
+                                         dtype=np.int64)
+
+        # BM25 문서 길이 보정항은 검색마다 같으므로 미리 계산
+        k1, b = self.info["k1"], self.info["b"]
+        avg_length = self.info["avg_length"] or 1.0
+        self.k1 = k1
+        self.length_norm = (k1 * (1 - b + b * self.doc_lengths / avg_length)).astype(np.float32)
+
+        # 파일명 → 문서 id (확장자 포함/제외 모두 등록)
+        self.file_names = defaultdict(list)
+        for doc_id, meta in self.documents.items():
+            name = normalize_file_name(meta.get("file_name"))
+            if name:
+                self.file_names[name].append(doc_id)
+                stem = os.path.splitext(name)[0]
+                if stem and stem != name:
+                    self.file_names[stem].append(doc_id)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def exact_matches(self, query):
+        """검색어가 파일명과 정확히 같은 문서 id 목록"""
+        return list(dict.fromkeys(self.file_names.get(normalize_file_name(query), [])))
+
+    def search(self, query, k=10, mask=None):
+        """[(문서 id, BM25 점수)] 상위 k개 (mask: 검색 대상 행 bool 배열)"""
+        term_ids = {self.term_ids[token] for token in tokenize(query) if token in self.term_ids}
+        if not term_ids or not len(self):
+            return []
+
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            rows = np.asarray(self.rows[start:end])
+            tfs = np.asarray(self.tfs[start:end], dtype=np.float32)
+            idf = math.log(1 + (len(self) - len(rows) + 0.5) / (len(rows) + 0.5))
+            # 한 색인어의 posting 안에서 행 번호는 중복되지 않음
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + self.length_norm[rows])
+
+        if mask is not None:
+            scores[~mask] = 0
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(self.doc_ids[row]), float(scores[row])) for row in matched]
+
+    def document(self, doc_id):
+        """문서 id → langchain Document (벡터 검색 결과와 같은 메타데이터 형태, 내용은 제목 + 요약)"""
+        meta = self.documents.get(doc_id, {})
+        content = ". ".join(text for text in (meta.get("title"), meta.get("summary")) if text)
+        metadata = {"source": "mysql", "table": "documents", "id": doc_id, **meta}
+        return Document(page_content=content, metadata=metadata)
+
+
+def build_lexical_index(snapshot_path, doc_ids=None, page_size=None):
+    """documents 테이블을 읽어 스냅샷에 BM25 색인 생성 (doc_ids를 주면 해당 문서만), lexical_info 반환"""
+    from config.db import stream_pages, STREAM_PAGE_SIZE
+
+    builder = LexicalIndexBuilder()
+    pages = stream_pages("SELECT id, file_name, title, summary, keywords, doc_type, created_at FROM documents ORDER BY id",
+                         page_size=page_size or STREAM_PAGE_SIZE)
+    for rows in pages:
+        for row in rows:
+            if doc_ids is None or row["id"] in doc_ids:
+                builder.add(row)
+    return builder.save(snapshot_path)
+
+
+if __name__ == "__main__":
+    import time
+    import argparse
+
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+    from vector_store.snapshot import active_snapshot_path, read_doc_hashes
+
+    parser = argparse.ArgumentParser(description="BM25 역색인 생성 / 검색")
+    parser.add_argument("command", choices=["build", "search"],
+                        help="build: 기존 스냅샷에 lexical_index 생성, search: BM25 검색 결과 출력")
+    parser.add_argument("query", nargs="?", default="", help="search 검색어")
+    parser.add_argument("--snapshot", help="스냅샷 폴더 경로 (기본: 활성 스냅샷)")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    snapshot = args.snapshot or active_snapshot_path()
+    if not snapshot:
+        print("❌ 스냅샷을 찾을 수 없습니다.")
+        sys.exit(1)
+
+    if args.command == "build":
+        started = time.perf_counter()
+        doc_hashes = read_doc_hashes(snapshot)
+        info = build_lexical_index(snapshot, set(doc_hashes) if doc_hashes is not None else None)
+        print(f"✅ BM25 색인 생성 완료: {info['count']}개 문서, {info['terms']}개 색인어 "
+              f"({time.perf_counter() - started:.1f}초)")
+    else:
+        index = LexicalIndex(snapshot)
+        started = time.perf_counter()
+        exact = index.exact_matches(args.query)
+        results = index.search(args.query, args.k)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for doc_id in exact:
+            print(f"🎯 파일명 일치: {index.documents[doc_id]['file_name']} (id={doc_id})")
+        for rank, (doc_id, score) in enumerate(results, 1):
+            print(f"{rank:>2}. {score:.3f}  {index.documents[doc_id]['file_name']} (id={doc_id})")
+        print(f"⏱️ {elapsed_ms:.2f}ms")
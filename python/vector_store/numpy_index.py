@@ -0,0 +1,702 @@
+# ================================================================
+# 📄 numpy_index.py
+# ================================================================
+# 스냅샷의 청크 임베딩을 NumPy 행렬로 내보내고 전수(exact) 검색하는 백엔드
+# - 스냅샷 폴더 안 numpy_index/ 에 저장
+#     vectors.npy       : float32 (청크 수 x 차원), 메모리 매핑으로 열기
+#     norms.npy         : 각 벡터의 L2 노름
+#     doc_ids.npy       : 각 청크의 documents.id (문서 id 순으로 정렬 → 같은 문서 청크가 연속)
+#     chunk_ids.npy     : 각 청크의 Chroma id
+#     texts.bin         : 청크 텍스트(UTF-8) 연결, text_offsets.npy로 위치 조회
+#     documents.json    : 문서별 메타데이터 (file_name, title, summary)
+#     index_info.json   : 청크 수, 차원, 임베딩 모델
+#   (선택) 양자화 인덱스 - 압축 행렬로 먼저 훑고 후보만 float32로 재채점
+#     vectors_int8.npy + scales.npy : 차원별 스케일 int8 (vectors.npy의 1/4)
+#     vectors_float16.npy           : float16 (vectors.npy의 1/2)
+#     quantization.json             : 양자화 방식, 재채점용 Chroma 폴더(상대 경로)
+#     양자화하면 vectors.npy는 지움 → 재채점 후보의 float32 벡터는 같은 임베딩을 이미 저장한 Chroma 컬렉션에서 읽음
+#   문서 대표 벡터 인덱스 - 문서별 청크 임베딩 평균으로 후보 문서를 먼저 고르고 그 문서 청크만 계산
+#     doc_centroids.npy : float32 (문서 수 x 차원)
+#     doc_offsets.npy   : 문서별 청크 행 시작 위치 (문서 수 + 1)
+# - Chroma와 같은 similarity_search_with_score(query, k) 인터페이스 제공
+#   (거리: l2 = 제곱 L2 거리로 Chroma 기본값과 동일, cosine = 1 - 코사인 유사도)
+# ================================================================
+
+import os
+import sys
+import json
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+NUMPY_INDEX_DIR = "numpy_index"
+CHROMA_COLLECTION = "langchain"   # langchain Chroma 래퍼의 기본 컬렉션 이름
+EXPORT_PAGE_SIZE = 1000   # Chroma에서 한 번에 읽는 청크 수
+DEFAULT_METRIC = "l2"
+
+QUANTIZATION_MODES = ("none", "int8", "float16")
+QUANTIZE_BLOCK_ROWS = 16384   # 양자화/근사 거리 계산 시 한 번에 float32로 변환하는 행 수
+# 양자화 인덱스 검색 시 k * RESCORE_FACTOR개 후보를 float32 벡터로 재채점
+RESCORE_FACTOR = int(os.environ.get("NUMPY_RESCORE_FACTOR", "10"))
+# 0이면 양자화 인덱스가 있어도 float32 행렬로 전수 검색
+USE_QUANTIZED = os.environ.get("NUMPY_USE_QUANTIZED", "1") != "0"
+# 벡터스토어 생성 시 기본 양자화 방식 (none / int8 / float16)
+VECTOR_QUANTIZATION = os.environ.get("VECTOR_QUANTIZATION", "none")
+
+# 벤치마크 쿼리: held-out(청크 벡터, 자기 문서 제외) / history(search_history 검색어 임베딩)
+BENCHMARK_QUERY_SOURCES = ("held-out", "history")
+
+CENTROID_BLOCK_DOCS = 4096   # 문서 대표 벡터 계산 시 한 번에 읽는 문서 수
+# 2단계 검색: 문서 대표 벡터로 max(k * 배수, 최소값)개 후보 문서를 고른 뒤 그 문서들의 청크만 계산
+# (근사 검색: 대표 벡터 순위 밖의 문서는 놓칠 수 있음, benchmark-documents로 재현율 확인)
+DOC_CANDIDATE_FACTOR = int(os.environ.get("NUMPY_DOC_CANDIDATE_FACTOR", "5"))
+DOC_CANDIDATE_MIN = int(os.environ.get("NUMPY_DOC_CANDIDATE_MIN", "50"))
+# 0이면 문서 대표 벡터가 있어도 전체 청크를 계산 (정확한 문서 top-k)
+USE_DOC_CENTROIDS = os.environ.get("NUMPY_USE_DOC_CENTROIDS", "1") != "0"
+
+
+def numpy_index_path(snapshot_path):
+    return os.path.join(snapshot_path, NUMPY_INDEX_DIR)
+
+
+def doc_candidate_count(k):
+    """2단계 검색에서 대표 벡터로 고르는 후보 문서 수"""
+    return max(k * DOC_CANDIDATE_FACTOR, DOC_CANDIDATE_MIN)
+
+
+def has_numpy_index(snapshot_path):
+    return os.path.exists(os.path.join(numpy_index_path(snapshot_path), "index_info.json"))
+
+
+def read_quantization(snapshot_path):
+    """quantization.json 읽기 (양자화 인덱스가 없으면 None)"""
+    path = os.path.join(numpy_index_path(snapshot_path), "quantization.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def open_chroma_collection(chroma_path):
+    """스냅샷의 Chroma 컬렉션 (langchain 래퍼 없이 chromadb로 직접 열기)"""
+    import chromadb
+
+    return chromadb.PersistentClient(path=chroma_path).get_collection(CHROMA_COLLECTION)
+
+
+def fetch_chroma_vectors(collection, chunk_ids, dim, page_size=EXPORT_PAGE_SIZE):
+    """chunk_ids 순서대로 Chroma에 저장된 float32 임베딩 행렬 (양자화로 vectors.npy를 지운 인덱스용)"""
+    ids = [str(chunk_id) for chunk_id in chunk_ids]
+    vectors = np.zeros((len(ids), dim), dtype=np.float32)
+    for start in range(0, len(ids), page_size):
+        batch_ids = ids[start:start + page_size]
+        page = collection.get(ids=batch_ids, include=["embeddings"])
+        by_id = dict(zip(page["ids"], page["embeddings"]))
+        vectors[start:start + len(batch_ids)] = np.asarray([by_id[chunk_id] for chunk_id in batch_ids],
+                                                           dtype=np.float32)
+    return vectors
+
+
+# ================================================================
+# 1. 내보내기 (vector_store_create.py에서 스냅샷 게시 전에 호출)
+# ================================================================
+def export_numpy_index(collection, snapshot_path, embedding_model=None, page_size=EXPORT_PAGE_SIZE):
+    """Chroma 컬렉션의 청크 임베딩/텍스트/메타데이터를 numpy_index/ 로 내보내기, index_info 반환"""
+    index_dir = numpy_index_path(snapshot_path)
+    os.makedirs(index_dir, exist_ok=True)
+
+    # 1차: 청크 id와 문서 id만 읽어 문서 id 순서 결정 (+ 문서별 메타데이터 수집)
+    total = collection.count()
+    chunk_ids, chunk_doc_ids, documents = [], [], {}
+    for offset in range(0, total, page_size):
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        for chunk_id, metadata in zip(page["ids"], page["metadatas"]):
+            metadata = metadata or {}
+            doc_id = int(metadata.get("id") or 0)
+            chunk_ids.append(chunk_id)
+            chunk_doc_ids.append(doc_id)
+            if doc_id not in documents:
+                documents[doc_id] = {key: value for key, value in metadata.items()
+                                     if key not in ("source", "table", "id")}
+
+    order = np.argsort(np.asarray(chunk_doc_ids, dtype=np.int64), kind="stable")
+    doc_ids = np.asarray(chunk_doc_ids, dtype=np.int64)[order]
+    sorted_chunk_ids = [chunk_ids[i] for i in order]
+
+    # 2차: 정렬된 순서대로 임베딩/텍스트를 읽어 메모리 매핑 파일에 기록
+    vectors = None
+    offsets = np.zeros(len(sorted_chunk_ids) + 1, dtype=np.int64)
+    # 노름도 페이지마다 계산 (다 쓴 memmap 전체를 다시 읽지 않음)
+    norms = np.zeros(len(sorted_chunk_ids), dtype=np.float32)
+    with open(os.path.join(index_dir, "texts.bin"), "wb") as texts_file:
+        for start in range(0, len(sorted_chunk_ids), page_size):
+            batch_ids = sorted_chunk_ids[start:start + page_size]
+            page = collection.get(ids=batch_ids, include=["embeddings", "documents"])
+            by_id = {chunk_id: (embedding, text)
+                     for chunk_id, embedding, text in zip(page["ids"], page["embeddings"], page["documents"])}
+            batch_vectors = np.asarray([by_id[chunk_id][0] for chunk_id in batch_ids], dtype=np.float32)
+            if vectors is None:
+                vectors = np.lib.format.open_memmap(
+                    os.path.join(index_dir, "vectors.npy"), mode="w+", dtype=np.float32,
+                    shape=(len(sorted_chunk_ids), batch_vectors.shape[1]),
+                )
+            vectors[start:start + len(batch_ids)] = batch_vectors
+            norms[start:start + len(batch_ids)] = np.linalg.norm(batch_vectors, axis=1)
+            for i, chunk_id in enumerate(batch_ids, start):
+                encoded = (by_id[chunk_id][1] or "").encode("utf-8")
+                texts_file.write(encoded)
+                offsets[i + 1] = offsets[i] + len(encoded)
+
+    dim = int(vectors.shape[1]) if vectors is not None else 0
+    if vectors is None:
+        vectors = np.zeros((0, 0), dtype=np.float32)
+        np.save(os.path.join(index_dir, "vectors.npy"), vectors)
+    else:
+        vectors.flush()
+
+    np.save(os.path.join(index_dir, "norms.npy"), norms)
+    np.save(os.path.join(index_dir, "doc_ids.npy"), doc_ids)
+    np.save(os.path.join(index_dir, "chunk_ids.npy"), np.asarray(sorted_chunk_ids, dtype=str))
+    np.save(os.path.join(index_dir, "text_offsets.npy"), offsets)
+    with open(os.path.join(index_dir, "documents.json"), "w", encoding="utf-8") as f:
+        json.dump({str(doc_id): meta for doc_id, meta in documents.items()}, f, ensure_ascii=False)
+
+    info = {"count": len(sorted_chunk_ids), "dim": dim, "embedding_model": embedding_model}
+    with open(os.path.join(index_dir, "index_info.json"), "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+    return info
+
+
+def quantize_numpy_index(snapshot_path, mode="int8", chroma_path=None):
+    """float32 벡터로 양자화 행렬 생성 후 vectors.npy 삭제 (블록 단위 처리로 메모리 사용량 일정), 압축 행렬 파일 크기 반환
+
+    재채점용 float32 벡터는 chroma_path(기본: 스냅샷 폴더)의 Chroma 컬렉션에 이미 있으므로 numpy_index에 중복 보관하지 않음
+    """
+    if mode not in QUANTIZATION_MODES or mode == "none":
+        raise ValueError(f"지원하지 않는 양자화 방식입니다: {mode}")
+    index_dir = numpy_index_path(snapshot_path)
+    source = NumpyIndex(snapshot_path, use_quantized=False, use_doc_centroids=False)
+    chroma_path = chroma_path or source.chroma_path
+    rows, dim = len(source), int(source.info.get("dim") or 0)
+    # vectors.npy를 지우기 전에 재채점에 쓸 Chroma 임베딩이 모두 있는지 확인
+    if rows and open_chroma_collection(chroma_path).count() < rows:
+        raise ValueError(f"Chroma 컬렉션에 재채점용 임베딩이 부족합니다: {chroma_path}")
+    vectors = source.vectors   # vectors.npy 메모리 매핑 (이미 양자화된 인덱스면 Chroma에서 읽은 행렬)
+
+    if mode == "int8":
+        # 차원별 최대 절댓값을 127에 맞추는 대칭 스케일
+        max_abs = np.zeros(dim, dtype=np.float32)
+        for start in range(0, rows, QUANTIZE_BLOCK_ROWS):
+            np.maximum(max_abs, np.abs(vectors[start:start + QUANTIZE_BLOCK_ROWS]).max(axis=0), out=max_abs)
+        scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+
+    dtype = np.int8 if mode == "int8" else np.float16
+    tmp_path = os.path.join(index_dir, f"vectors_{mode}.tmp.npy")
+    compact = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=(rows, dim))
+    for start in range(0, rows, QUANTIZE_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + QUANTIZE_BLOCK_ROWS], dtype=np.float32)
+        if mode == "int8":
+            block = np.clip(np.rint(block / scales), -127, 127)
+        compact[start:start + len(block)] = block.astype(dtype)
+    compact.flush()
+    del compact, vectors, source
+
+    # 이전 양자화 파일 정리 후 새 행렬로 교체
+    for name in ("vectors_int8.npy", "scales.npy", "vectors_float16.npy"):
+        if os.path.exists(os.path.join(index_dir, name)):
+            os.remove(os.path.join(index_dir, name))
+    path = os.path.join(index_dir, f"vectors_{mode}.npy")
+    os.replace(tmp_path, path)
+    if mode == "int8":
+        np.save(os.path.join(index_dir, "scales.npy"), scales)
+    with open(os.path.join(index_dir, "quantization.json"), "w", encoding="utf-8") as f:
+        json.dump({"mode": mode, "chroma_path": os.path.relpath(chroma_path, snapshot_path)}, f)
+    if os.path.exists(os.path.join(index_dir, "vectors.npy")):
+        os.remove(os.path.join(index_dir, "vectors.npy"))
+    return os.path.getsize(path)
+
+
+# ================================================================
+# 2. 검색
+# ================================================================
+def build_document_centroids(snapshot_path, block_docs=CENTROID_BLOCK_DOCS):
+    """numpy_index/ 에 문서별 청크 임베딩 평균(doc_centroids.npy)과 문서 구간(doc_offsets.npy) 저장, 문서 수 반환
+
+    청크 행이 문서 id 순으로 연속되어 있어 문서 블록마다 np.add.reduceat 한 번으로 계산
+    """
+    index_dir = numpy_index_path(snapshot_path)
+    source = NumpyIndex(snapshot_path, use_quantized=False, use_doc_centroids=False)
+    vectors, doc_ids = source.vectors, source.doc_ids
+    dim = vectors.shape[1] if vectors.ndim == 2 else 0
+
+    starts = np.flatnonzero(np.r_[True, doc_ids[1:] != doc_ids[:-1]]) if len(doc_ids) else np.zeros(0, dtype=np.int64)
+    offsets = np.r_[starts, len(doc_ids)].astype(np.int64)
+    centroids = np.lib.format.open_memmap(os.path.join(index_dir, "doc_centroids.npy"), mode="w+",
+                                          dtype=np.float32, shape=(len(starts), dim))
+    for first in range(0, len(starts), block_docs):
+        last = min(first + block_docs, len(starts))
+        low, high = offsets[first], offsets[last]
+        block = np.asarray(vectors[low:high], dtype=np.float32)
+        sums = np.add.reduceat(block, offsets[first:last] - low, axis=0)
+        centroids[first:last] = sums / np.diff(offsets[first:last + 1])[:, None]
+    centroids.flush()
+    np.save(os.path.join(index_dir, "doc_offsets.npy"), offsets)
+    return len(starts)
+
+
+def top_k_indices(distances, k):
+    """거리가 작은 순서로 상위 k개 위치 (argpartition으로 전체 정렬 없이 선택)"""
+    k = min(k, len(distances))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(distances):
+        candidates = np.argpartition(distances, k - 1)[:k]
+    else:
+        candidates = np.arange(len(distances))
+    return candidates[np.argsort(distances[candidates], kind="stable")]
+
+
+def _segment_minimums(doc_seq, distances):
+    """문서 id 순으로 정렬된 행들의 문서별 구간 (시작, 끝) 과 구간 최소 거리"""
+    starts = np.flatnonzero(np.r_[True, doc_seq[1:] != doc_seq[:-1]])
+    ends = np.r_[starts[1:], len(doc_seq)]
+    return starts, ends, np.minimum.reduceat(distances, starts)
+
+
+class NumpyIndex:
+    """numpy_index/ 를 메모리 매핑으로 열어 전수 검색하는 벡터스토어
+
+    양자화로 vectors.npy를 지운 인덱스는 float32 벡터가 필요할 때 Chroma 컬렉션에서 읽음
+    (재채점 후보는 해당 행만, float32 전수 검색/벤치마크는 전체를 한 번 읽어 메모리에 둠)
+    """
+
+    def __init__(self, snapshot_path, embedding_function=None, metric=DEFAULT_METRIC, use_quantized=USE_QUANTIZED,
+                 rescore_factor=RESCORE_FACTOR, use_doc_centroids=USE_DOC_CENTROIDS):
+        index_dir = numpy_index_path(snapshot_path)
+        with open(os.path.join(index_dir, "index_info.json"), encoding="utf-8") as f:
+            self.info = json.load(f)
+        self.snapshot_path = snapshot_path
+        self.embedding_function = embedding_function
+        self.metric = metric
+        vectors_path = os.path.join(index_dir, "vectors.npy")
+        self._vectors = np.load(vectors_path, mmap_mode="r") if os.path.exists(vectors_path) else None
+        quantization = read_quantization(snapshot_path)
+        self.chroma_path = os.path.normpath(os.path.join(snapshot_path, (quantization or {}).get("chroma_path", ".")))
+        self._collection = None
+        self.norms = np.load(os.path.join(index_dir, "norms.npy"))
+        self.sq_norms = self.norms.astype(np.float32) ** 2
+        self.doc_ids = np.load(os.path.join(index_dir, "doc_ids.npy"))
+        self.chunk_ids = np.load(os.path.join(index_dir, "chunk_ids.npy"))
+        self.text_offsets = np.load(os.path.join(index_dir, "text_offsets.npy"))
+        self.texts = np.memmap(os.path.join(index_dir, "texts.bin"), dtype=np.uint8, mode="r") \
+            if self.text_offsets[-1] > 0 else np.zeros(0, dtype=np.uint8)
+        with open(os.path.join(index_dir, "documents.json"), encoding="utf-8") as f:
+            self.documents = {int(doc_id): meta for doc_id, meta in json.load(f).items()}
+        # 검색 필터용 청크 행별 파일 형식 / 생성 시각 (메타데이터가 없던 스냅샷은 "" / -1)
+        unique_ids, inverse = np.unique(self.doc_ids, return_inverse=True)
+        doc_types = np.asarray([self.documents.get(int(d), {}).get("doc_type") or "" for d in unique_ids])
+        created_at = np.asarray([self.documents.get(int(d), {}).get("created_at") or -1 for d in unique_ids],
+                                dtype=np.int64)
+        self.row_doc_types = doc_types[inverse] if len(unique_ids) else np.zeros(0, dtype=str)
+        self.row_created_at = created_at[inverse] if len(unique_ids) else np.zeros(0, dtype=np.int64)
+
+        # 양자화 인덱스 (있고 사용 설정된 경우에만)
+        self.quantization = "none"
+        self.compact = None
+        self.rescore_factor = max(1, rescore_factor)
+        if use_quantized and quantization:
+            self.quantization = quantization["mode"]
+            self.compact = np.load(os.path.join(index_dir, f"vectors_{self.quantization}.npy"), mmap_mode="r")
+            self.scales = np.load(os.path.join(index_dir, "scales.npy")) if self.quantization == "int8" else None
+
+        # 문서 대표 벡터 인덱스 (있고 사용 설정된 경우에만, 문서 수 x 차원이라 청크 행렬보다 작음)
+        self.centroids = None
+        centroid_path = os.path.join(index_dir, "doc_centroids.npy")
+        if use_doc_centroids and os.path.exists(centroid_path):
+            self.centroids = np.load(centroid_path, mmap_mode="r")
+            self.doc_offsets = np.load(os.path.join(index_dir, "doc_offsets.npy"))
+            self.centroid_norms = np.linalg.norm(self.centroids, axis=1).astype(np.float32)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    @property
+    def vectors(self):
+        """float32 청크 행렬 (vectors.npy 메모리 매핑, 양자화로 지웠으면 Chroma 임베딩 전체를 최초 사용 시 읽음)"""
+        if self._vectors is None:
+            self._vectors = fetch_chroma_vectors(self.collection(), self.chunk_ids, int(self.info.get("dim") or 0))
+        return self._vectors
+
+    def collection(self):
+        """재채점용 Chroma 컬렉션 (최초 사용 시 열기)"""
+        if self._collection is None:
+            self._collection = open_chroma_collection(self.chroma_path)
+        return self._collection
+
+    def row_vectors(self, rows):
+        """rows 행의 float32 벡터 (vectors.npy가 없으면 해당 청크만 Chroma에서 읽음)"""
+        if self._vectors is not None:
+            return self._vectors[rows]
+        return fetch_chroma_vectors(self.collection(), self.chunk_ids[rows], int(self.info.get("dim") or 0))
+
+    def distances(self, query_vector, rows=None):
+        """쿼리 벡터와 청크(rows 지정 시 해당 행만) 사이의 거리 (작을수록 유사)"""
+        query = np.asarray(query_vector, dtype=np.float32)
+        vectors = self.vectors if rows is None else self.row_vectors(rows)
+        dots = vectors @ query
+        if self.metric == "cosine":
+            norms = self.norms if rows is None else self.norms[rows]
+            return 1.0 - dots / (norms * np.linalg.norm(query) + 1e-12)
+        sq_norms = self.sq_norms if rows is None else self.sq_norms[rows]
+        return np.maximum(sq_norms - 2.0 * dots + float(query @ query), 0.0)
+
+    def approx_distances(self, query_vector, rows=None):
+        """양자화 행렬로 계산한 근사 거리 (블록 단위로 float32 변환)"""
+        query = np.asarray(query_vector, dtype=np.float32)
+        # int8은 차원별 스케일을 쿼리 쪽에 곱해 두면 정수 행렬을 한 번만 변환하면 됨
+        scaled_query = query * self.scales if self.scales is not None else query
+        compact = self.compact if rows is None else self.compact[rows]
+        dots = np.empty(len(compact), dtype=np.float32)
+        for start in range(0, len(compact), QUANTIZE_BLOCK_ROWS):
+            block = np.asarray(compact[start:start + QUANTIZE_BLOCK_ROWS], dtype=np.float32)
+            dots[start:start + len(block)] = block @ scaled_query
+        if self.metric == "cosine":
+            norms = self.norms if rows is None else self.norms[rows]
+            return 1.0 - dots / (norms * np.linalg.norm(query) + 1e-12)
+        sq_norms = self.sq_norms if rows is None else self.sq_norms[rows]
+        return np.maximum(sq_norms - 2.0 * dots + float(query @ query), 0.0)
+
+    def search_vector(self, query_vector, k=10, rows=None):
+        """[(청크 행 번호, 거리)] 상위 k개 (rows로 후보 행을 제한 가능)
+
+        양자화 인덱스가 있으면 근사 거리로 k * rescore_factor개 후보를 고른 뒤 float32 벡터로 재채점
+        """
+        if self.compact is not None and (len(self) if rows is None else len(rows)) > k:
+            approx = self.approx_distances(query_vector, rows)
+            top = top_k_indices(approx, k * self.rescore_factor)
+            # 재채점 대상 후보 (행 순서로 정렬해 메모리 매핑 파일을 순차적으로 읽음)
+            rows = np.sort(top if rows is None else np.asarray(rows)[top])
+
+        distances = self.distances(query_vector, rows)
+        top = top_k_indices(distances, k)
+        row_ids = top if rows is None else np.asarray(rows)[top]
+        return [(int(row), float(distances[i])) for row, i in zip(row_ids, top)]
+
+    def centroid_candidate_rows(self, query_vector, k):
+        """문서 대표 벡터로 고른 후보 문서들의 청크 행 번호 (후보 수가 전체 문서 수 이상이면 None)"""
+        candidates = doc_candidate_count(k)
+        if self.centroids is None or candidates >= len(self.centroids):
+            return None
+        query = np.asarray(query_vector, dtype=np.float32)
+        dots = self.centroids @ query
+        if self.metric == "cosine":
+            distances = 1.0 - dots / (self.centroid_norms * np.linalg.norm(query) + 1e-12)
+        else:
+            distances = self.centroid_norms ** 2 - 2.0 * dots
+        docs = np.sort(top_k_indices(distances, candidates))
+        return np.concatenate([np.arange(self.doc_offsets[i], self.doc_offsets[i + 1]) for i in docs])
+
+    def search_documents(self, query_vector, k=10, rows=None):
+        """[(문서별 최적 청크 행 번호, 거리)] 서로 다른 문서 상위 k개 (rows는 오름차순 행 번호)
+
+        행이 문서 id 순으로 정렬되어 있어 거리 배열을 문서 구간별 최솟값(reduceat)으로 바로 묶음 (과다 조회 없음)
+        - 문서 대표 벡터가 있고 rows 제한이 없으면 후보 문서의 청크만 계산 (청크 수가 아닌 문서 수에 비례, 근사)
+        - 양자화 인덱스가 있으면 (후보 문서 안에서) 근사 거리로 k * rescore_factor개 문서를 고른 뒤 그 문서들의 청크만 float32로 재채점
+        """
+        if rows is not None:
+            rows = np.asarray(rows)
+        if not len(self) or (rows is not None and not len(rows)):
+            return []
+        if rows is None:
+            rows = self.centroid_candidate_rows(query_vector, k)
+        if self.compact is not None:
+            approx = self.approx_distances(query_vector, rows)
+            doc_seq = self.doc_ids if rows is None else self.doc_ids[rows]
+            starts, ends, best = _segment_minimums(doc_seq, approx)
+            candidates = top_k_indices(best, k * self.rescore_factor)
+            positions = np.sort(np.concatenate([np.arange(starts[i], ends[i]) for i in candidates]))
+            rows = positions if rows is None else rows[positions]
+
+        distances = self.distances(query_vector, rows)
+        doc_seq = self.doc_ids if rows is None else self.doc_ids[rows]
+        starts, ends, best = _segment_minimums(doc_seq, distances)
+        results = []
+        for i in top_k_indices(best, k):
+            position = starts[i] + int(np.argmin(distances[starts[i]:ends[i]]))
+            row = position if rows is None else rows[position]
+            results.append((int(row), float(distances[position])))
+        return results
+
+    def rows_for_documents(self, doc_ids):
+        """문서 id 목록에 속한 청크 행 번호 (doc_ids.npy가 문서 id 순으로 정렬되어 있어 이진 탐색)"""
+        wanted = np.unique(np.asarray(list(doc_ids), dtype=np.int64))
+        if not len(wanted):
+            return np.zeros(0, dtype=np.int64)
+        starts = np.searchsorted(self.doc_ids, wanted, side="left")
+        ends = np.searchsorted(self.doc_ids, wanted, side="right")
+        return np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+
+    def text(self, row):
+        start, end = self.text_offsets[row], self.text_offsets[row + 1]
+        return bytes(self.texts[start:end]).decode("utf-8")
+
+    def document(self, row):
+        """청크 행 → langchain Document (Chroma 검색 결과와 같은 메타데이터 형태)"""
+        doc_id = int(self.doc_ids[row])
+        metadata = {"source": "mysql", "table": "documents", "id": doc_id, **self.documents.get(doc_id, {})}
+        return Document(page_content=self.text(row), metadata=metadata)
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, rows=None):
+        if rows is not None and not len(rows):
+            return []
+        return [(self.document(row), distance) for row, distance in self.search_vector(embedding, k, rows)]
+
+    def search_documents_with_score(self, query, k=4, rows=None):
+        """[(Document, 거리)] 서로 다른 문서 상위 k개 (문서별 가장 가까운 청크)"""
+        if self.embedding_function is None:
+            raise ValueError("embedding_function 없이 텍스트 검색을 할 수 없습니다.")
+        return [(self.document(row), distance)
+                for row, distance in self.search_documents(self.embedding_function.embed_query(query), k, rows)]
+
+    def similarity_search_with_score(self, query, k=4, rows=None):
+        if self.embedding_function is None:
+            raise ValueError("embedding_function 없이 텍스트 검색을 할 수 없습니다.")
+        return self.similarity_search_by_vector_with_score(self.embedding_function.embed_query(query), k, rows)
+
+
+# ================================================================
+# 3. 벤치마크
+# ================================================================
+def sample_queries(index, queries, seed=0):
+    """held-out 벤치마크 쿼리 [(쿼리 벡터, 제외할 문서 id)] (Ollama 호출 없이)
+
+    임의 청크 벡터를 쿼리로 쓰고 그 청크가 속한 문서는 정답과 검색 결과 양쪽에서 뺌
+    (인덱스 안의 점을 그대로 쿼리로 쓰면 자기 문서가 항상 1순위라 근사 검색 재현율이 부풀려짐)
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(index), size=min(queries, len(index)), replace=False)
+    return [(np.asarray(index.vectors[row], dtype=np.float32), int(index.doc_ids[row])) for row in rows]
+
+
+def history_queries(snapshot_path, queries):
+    """search_history의 최근 검색어를 스냅샷 임베딩 모델로 임베딩한 쿼리 [(쿼리 벡터, None)] (MySQL, Ollama 필요)"""
+    from config.db import fetch_all
+    from vector_store.snapshot import resolve_query_embeddings
+
+    rows = fetch_all("SELECT query FROM search_history GROUP BY query ORDER BY MAX(id) DESC LIMIT %s", (queries,))
+    if not rows:
+        raise ValueError("search_history에 검색 기록이 없습니다. --query-source held-out을 사용하세요.")
+    embeddings = resolve_query_embeddings(snapshot_path)
+    return [(np.asarray(embeddings.embed_query(row["query"]), dtype=np.float32), None) for row in rows]
+
+
+def benchmark_queries(index, queries, seed=0, source="held-out"):
+    """벤치마크 쿼리 [(쿼리 벡터, 제외할 문서 id 또는 None)] (source: held-out / history)"""
+    if source == "history":
+        return history_queries(index.snapshot_path, queries)
+    if source != "held-out":
+        raise ValueError(f"지원하지 않는 쿼리 종류입니다: {source} (선택: {', '.join(BENCHMARK_QUERY_SOURCES)})")
+    return sample_queries(index, queries, seed)
+
+
+def held_out_depth(index, k, exclude, by_document=True):
+    """held-out 문서를 빼고도 k개가 남도록 검색할 개수 (문서 단위면 k + 1, 청크 단위면 k + 그 문서 청크 수)"""
+    if exclude is None:
+        return k
+    return k + 1 if by_document else k + len(index.rows_for_documents([exclude]))
+
+
+def drop_held_out(found, doc_ids, exclude, k):
+    """[(행, 거리)] 에서 held-out 문서의 행을 뺀 상위 k개"""
+    return [(row, distance) for row, distance in found if exclude is None or int(doc_ids[row]) != exclude][:k]
+
+
+def latency_summary(times):
+    times_ms = np.asarray(times) * 1000
+    return {"mean_ms": round(float(times_ms.mean()), 3), "p95_ms": round(float(np.percentile(times_ms, 95)), 3)}
+
+
+def benchmark(snapshot_path, queries=100, k=10, seed=0, source="held-out"):
+    """Chroma(HNSW) vs NumPy 전수 검색: 지연 시간과 Chroma의 정확 재현율(recall@k) 비교
+
+    NumPy float32 전수 검색 결과를 정답으로 봅니다 (metric=l2).
+    """
+    import chromadb
+
+    index = NumpyIndex(snapshot_path, metric="l2", use_quantized=False)
+    collection = chromadb.PersistentClient(path=snapshot_path).get_collection("langchain")
+    query_vectors = benchmark_queries(index, queries, seed, source)
+    chunk_docs = {str(chunk_id): int(doc_id) for chunk_id, doc_id in zip(index.chunk_ids, index.doc_ids)}
+
+    numpy_times, chroma_times, recalls = [], [], []
+    for query, exclude in query_vectors:
+        depth = held_out_depth(index, k, exclude, by_document=False)
+        started = time.perf_counter()
+        exact = index.search_vector(query, depth)
+        numpy_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=depth, include=[])
+        chroma_times.append(time.perf_counter() - started)
+
+        exact_ids = {str(index.chunk_ids[r]) for r, _ in drop_held_out(exact, index.doc_ids, exclude, k)}
+        found = [chunk_id for chunk_id in result["ids"][0] if chunk_docs.get(chunk_id) != exclude][:k]
+        recalls.append(len(exact_ids & set(found)) / max(1, len(exact_ids)))
+
+    return {
+        "snapshot": os.path.basename(os.path.normpath(snapshot_path)),
+        "chunks": len(index),
+        "dim": index.info.get("dim"),
+        "query_source": source,
+        "queries": len(query_vectors),
+        "k": k,
+        "numpy": latency_summary(numpy_times),
+        "chroma": latency_summary(chroma_times),
+        "chroma_recall_at_k": round(float(np.mean(recalls)), 4),
+    }
+
+
+def benchmark_quantization(snapshot_path, queries=100, k=10, seed=0, source="held-out"):
+    """양자화 인덱스(재채점 포함) vs float32 전수 검색: recall@k, 지연 시간, 행렬/디스크 크기 비교
+    disk_bytes는 현재 numpy_index/ 실제 크기, float32_disk_bytes는 압축 행렬 대신 vectors.npy를 둔 경우의 크기"""
+    exact_index = NumpyIndex(snapshot_path, metric="l2", use_quantized=False)
+    quantized_index = NumpyIndex(snapshot_path, metric="l2", use_quantized=True)
+    if quantized_index.compact is None:
+        raise ValueError("양자화 인덱스가 없습니다. 먼저 quantize 명령을 실행하세요.")
+    query_vectors = benchmark_queries(exact_index, queries, seed, source)
+
+    exact_times, quantized_times, recalls = [], [], []
+    for query, exclude in query_vectors:
+        depth = held_out_depth(exact_index, k, exclude, by_document=False)
+        started = time.perf_counter()
+        exact = drop_held_out(exact_index.search_vector(query, depth), exact_index.doc_ids, exclude, k)
+        exact_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        approx = drop_held_out(quantized_index.search_vector(query, depth), quantized_index.doc_ids, exclude, k)
+        quantized_times.append(time.perf_counter() - started)
+
+        exact_rows = {row for row, _ in exact}
+        recalls.append(len(exact_rows & {row for row, _ in approx}) / max(1, len(exact_rows)))
+
+    index_dir = numpy_index_path(snapshot_path)
+    full_bytes = exact_index.vectors.nbytes
+    compact_bytes = sum(os.path.getsize(os.path.join(index_dir, name))
+                        for name in (f"vectors_{quantized_index.quantization}.npy", "scales.npy")
+                        if os.path.exists(os.path.join(index_dir, name)))
+    disk_bytes = sum(entry.stat().st_size for entry in os.scandir(index_dir) if entry.is_file())
+    # vectors.npy가 남아 있는 예전 인덱스는 압축 행렬만 빼면 양자화 전 크기
+    has_float32 = os.path.exists(os.path.join(index_dir, "vectors.npy"))
+    float32_disk_bytes = disk_bytes - compact_bytes + (0 if has_float32 else full_bytes)
+    return {
+        "snapshot": os.path.basename(os.path.normpath(snapshot_path)),
+        "chunks": len(exact_index),
+        "quantization": quantized_index.quantization,
+        "rescore_factor": quantized_index.rescore_factor,
+        "query_source": source,
+        "queries": len(query_vectors),
+        "k": k,
+        "float32_bytes": full_bytes,
+        "quantized_bytes": compact_bytes,
+        "scan_size_ratio": round(full_bytes / max(1, compact_bytes), 2),
+        "rescore_source": "vectors.npy" if has_float32 else "chroma",
+        "float32_disk_bytes": float32_disk_bytes,
+        "disk_bytes": disk_bytes,
+        "disk_size_ratio": round(float32_disk_bytes / max(1, disk_bytes), 2),
+        "float32": latency_summary(exact_times),
+        "quantized": latency_summary(quantized_times),
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+    }
+
+
+def benchmark_documents(snapshot_path, queries=100, k=10, seed=0, source="held-out"):
+    """문서 대표 벡터 2단계 검색 vs 전체 청크 계산: 문서 단위 recall@k, 지연 시간, 계산한 청크 비율 비교"""
+    exact_index = NumpyIndex(snapshot_path, metric="l2", use_quantized=False, use_doc_centroids=False)
+    staged_index = NumpyIndex(snapshot_path, metric="l2", use_quantized=False, use_doc_centroids=True)
+    if staged_index.centroids is None:
+        raise ValueError("문서 대표 벡터가 없습니다. 먼저 centroids 명령을 실행하세요.")
+    query_vectors = benchmark_queries(exact_index, queries, seed, source)
+
+    exact_times, staged_times, recalls, scored = [], [], [], []
+    for query, exclude in query_vectors:
+        depth = held_out_depth(exact_index, k, exclude)
+        started = time.perf_counter()
+        exact = drop_held_out(exact_index.search_documents(query, depth), exact_index.doc_ids, exclude, k)
+        exact_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        staged = drop_held_out(staged_index.search_documents(query, depth), staged_index.doc_ids, exclude, k)
+        staged_times.append(time.perf_counter() - started)
+
+        candidate_rows = staged_index.centroid_candidate_rows(query, depth)
+        scored.append(len(staged_index) if candidate_rows is None else len(candidate_rows))
+        exact_docs = {int(exact_index.doc_ids[row]) for row, _ in exact}
+        recalls.append(len(exact_docs & {int(staged_index.doc_ids[row]) for row, _ in staged}) / max(1, len(exact_docs)))
+
+    return {
+        "snapshot": os.path.basename(os.path.normpath(snapshot_path)),
+        "chunks": len(exact_index),
+        "documents": len(staged_index.centroids),
+        "doc_candidate_factor": DOC_CANDIDATE_FACTOR,
+        "doc_candidate_min": DOC_CANDIDATE_MIN,
+        "doc_candidates": doc_candidate_count(k),
+        "query_source": source,
+        "queries": len(query_vectors),
+        "k": k,
+        "full_scan": latency_summary(exact_times),
+        "two_stage": latency_summary(staged_times),
+        "scored_chunk_ratio": round(float(np.mean(scored)) / max(1, len(exact_index)), 4),
+        "doc_recall_at_k": round(float(np.mean(recalls)), 4),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+    from vector_store.snapshot import active_snapshot_path
+
+    parser = argparse.ArgumentParser(description="NumPy 전수 검색 인덱스 관리 / 벤치마크")
+    parser.add_argument("command", choices=["export", "quantize", "centroids", "benchmark", "benchmark-quantized",
+                                            "benchmark-documents"],
+                        help="export: 기존 스냅샷에 numpy_index 생성, quantize: 양자화 인덱스 생성, "
+                             "centroids: 문서 대표 벡터 생성, benchmark: Chroma와 지연/재현율 비교, "
+                             "benchmark-quantized: 양자화 recall@k 측정, benchmark-documents: 2단계 문서 검색 recall@k 측정")
+    parser.add_argument("--snapshot", help="스냅샷 폴더 경로 (기본: 활성 스냅샷)")
+    parser.add_argument("--mode", choices=["int8", "float16"], default="int8", help="quantize 방식")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--query-source", choices=BENCHMARK_QUERY_SOURCES, default="held-out",
+                        help="벤치마크 쿼리 (held-out: 청크 벡터, 자기 문서 제외 / history: search_history 검색어 임베딩)")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    snapshot = args.snapshot or active_snapshot_path()
+    if not snapshot:
+        print("❌ 스냅샷을 찾을 수 없습니다.")
+        sys.exit(1)
+
+    if args.command == "export":
+        import chromadb
+        from vector_store.snapshot import read_snapshot_info
+
+        started = time.perf_counter()
+        collection = chromadb.PersistentClient(path=snapshot).get_collection("langchain")
+        info = export_numpy_index(collection, snapshot, (read_snapshot_info(snapshot) or {}).get("embedding_model"))
+        documents = build_document_centroids(snapshot)
+        print(f"✅ NumPy 인덱스 생성 완료: {info['count']}개 청크, {documents}개 문서, {info['dim']}차원 "
+              f"({time.perf_counter() - started:.1f}초)")
+    elif args.command == "quantize":
+        size = quantize_numpy_index(snapshot, args.mode)
+        print(f"✅ {args.mode} 양자화 인덱스 생성 완료 ({size / 1024 / 1024:.1f}MB, vectors.npy 삭제 → 재채점은 Chroma 임베딩 사용)")
+    elif args.command == "centroids":
+        print(f"✅ 문서 대표 벡터 생성 완료: {build_document_centroids(snapshot)}개 문서")
+    elif args.command == "benchmark":
+        print(json.dumps(benchmark(snapshot, queries=args.queries, k=args.k, source=args.query_source),
+                         ensure_ascii=False, indent=2))
+    elif args.command == "benchmark-documents":
+        print(json.dumps(benchmark_documents(snapshot, queries=args.queries, k=args.k, source=args.query_source),
+                         ensure_ascii=False, indent=2))
+    else:
+        print(json.dumps(benchmark_quantization(snapshot, queries=args.queries, k=args.k, source=args.query_source),
+                         ensure_ascii=False, indent=2))
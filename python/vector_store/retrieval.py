@@ -0,0 +1,252 @@
+# ================================================================
+# 📄 retrieval.py
+# ================================================================
+# 검색 백엔드 선택 (3d_file_search.py / vector_store_search.py 공용)
+# - chroma: Chroma(HNSW) 벡터스토어
+# - numpy : 스냅샷의 numpy_index/ 전수 검색 (numpy_index.py)
+# - sharded: 스냅샷의 shards/ 를 워커 프로세스에서 동시에 검색 후 병합 (shard_search.py)
+# - ivf   : 스냅샷의 ivf_index/ 에서 가까운 클러스터 nprobe개만 검색하는 근사 검색 (ivf_index.py)
+# 모든 백엔드가 similarity_search_with_score(query, k) → [(Document, 거리)] 를 제공
+# - 하이브리드 검색: 스냅샷에 lexical_index/ 가 있으면 벡터 결과와 BM25 결과를 RRF로 결합
+#   (결과 단위: 문서, 파일명과 정확히 같은 검색어는 항상 1순위)
+# - 검색 필터(파일 형식, 생성 기간): Chroma는 where 절, numpy/BM25는 조건에 맞는 행만 계산
+# - search_documents(): 서로 다른 문서 상위 k개 (문서별 최적 청크) - 두 검색 경로 공용
+#   numpy는 문서 구간별 최솟값으로 과다 조회 없이 (문서 대표 벡터가 있으면 후보 문서만 계산하는 근사),
+#   Chroma는 부족할 때만 조회 수를 늘리는 적응형 과다 조회
+#   filters = make_filters(doc_types=[".pdf"], date_from="2025-09-01", date_to="2025-09-30")
+# ================================================================
+
+import os
+import sys
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from vector_store.snapshot import resolve_query_embeddings
+from vector_store.numpy_index import NumpyIndex, has_numpy_index
+from vector_store.lexical_index import LexicalIndex, has_lexical_index
+from vector_store.shard_search import ShardedSearch, has_shards, SHARD_WORKERS
+from vector_store.ivf_index import IVFIndex, has_ivf_index
+
+SEARCH_BACKENDS = ("chroma", "numpy", "sharded", "ivf")
+# 기본 검색 백엔드 (환경 변수 SEARCH_BACKEND로 변경)
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "chroma")
+# 0이면 BM25 색인이 있어도 벡터 검색만 사용
+HYBRID_SEARCH = os.environ.get("HYBRID_SEARCH", "1") != "0"
+RRF_K = 60                # RRF 점수 = Σ 1 / (RRF_K + 순위)
+HYBRID_FETCH_FACTOR = 3   # 결합 전에 각 검색에서 k * 배수개 문서씩 가져옴
+DOCUMENT_FETCH_FACTOR = 3      # Chroma 문서 단위 검색 시 첫 조회 청크 수 = k * 배수
+DOCUMENT_FETCH_MAX_ROUNDS = 4  # 문서 수가 부족할 때 조회 수를 늘려 다시 검색하는 최대 횟수
+
+
+# ================================================================
+# 1. 검색 필터
+# ================================================================
+def normalize_doc_type(doc_type):
+    """".PDF", "pdf" → ".pdf" (documents.doc_type 형식)"""
+    doc_type = (doc_type or "").strip().lower()
+    return doc_type if not doc_type or doc_type.startswith(".") else f".{doc_type}"
+
+
+def make_filters(doc_types=None, date_from=None, date_to=None):
+    """검색 필터 dict 생성 (조건이 없으면 None)
+
+    doc_types: 파일 형식 목록, date_from / date_to: "YYYY-MM-DD" (date_to는 그날 끝까지 포함)
+    """
+    filters = {}
+    doc_types = sorted({normalize_doc_type(t) for t in doc_types or [] if normalize_doc_type(t)})
+    if doc_types:
+        filters["doc_types"] = doc_types
+    if date_from:
+        filters["created_from"] = int(datetime.strptime(date_from, "%Y-%m-%d").timestamp())
+    if date_to:
+        filters["created_to"] = int((datetime.strptime(date_to, "%Y-%m-%d") + timedelta(days=1)).timestamp()) - 1
+    return filters or None
+
+
+def chroma_where(filters=None, doc_ids=None):
+    """검색 필터 → Chroma where 절 (조건이 없으면 None)"""
+    filters = filters or {}
+    clauses = []
+    if doc_ids is not None:
+        clauses.append({"id": {"$in": [int(doc_id) for doc_id in doc_ids]}})
+    if filters.get("doc_types"):
+        clauses.append({"doc_type": {"$in": filters["doc_types"]}})
+    if "created_from" in filters:
+        clauses.append({"created_at": {"$gte": filters["created_from"]}})
+    if "created_to" in filters:
+        clauses.append({"created_at": {"$lte": filters["created_to"]}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def filter_mask(index, filters=None, doc_ids=None):
+    """NumpyIndex / LexicalIndex 행 중 필터를 만족하는 행 bool 배열 (생성 시각이 없는 행은 기간 필터에서 제외)"""
+    filters = filters or {}
+    mask = np.ones(len(index.doc_ids), dtype=bool)
+    if doc_ids is not None:
+        mask &= np.isin(index.doc_ids, np.asarray(list(doc_ids), dtype=np.int64))
+    if filters.get("doc_types"):
+        mask &= np.isin(index.row_doc_types, filters["doc_types"])
+    if "created_from" in filters:
+        mask &= index.row_created_at >= filters["created_from"]
+    if "created_to" in filters:
+        mask &= (index.row_created_at >= 0) & (index.row_created_at <= filters["created_to"])
+    return mask
+
+
+# ================================================================
+# 2. 문서 단위 top-k 검색
+# ================================================================
+def group_by_document(results):
+    """[(Document, 거리)] 거리 오름차순 → 문서별 첫(가장 가까운) 청크만 남긴 목록"""
+    seen, grouped = set(), []
+    for doc, distance in results:
+        doc_id = doc.metadata.get("id")
+        if doc_id and doc_id not in seen:
+            seen.add(doc_id)
+            grouped.append((doc, distance))
+    return grouped
+
+
+def search_documents(vectorstore, query, k, doc_ids=None, filters=None, lexical_query=None):
+    """서로 다른 문서 상위 k개 → [(문서별 최적 청크 Document, 거리)] (필터/문서 id 제한은 인덱스 단계에서 적용)
+
+    - HybridSearch: 벡터/BM25 결합 결과가 이미 문서 단위
+      lexical_query를 주면 BM25/파일명 일치는 그 문자열로 검색 (예: 벡터는 추출 키워드, BM25는 사용자 원문)
+    - NumpyIndex: 문서 구간별 최소 거리로 문서 top-k (과다 조회 없음)
+      문서 대표 벡터가 있으면 후보 문서의 청크만 계산하는 근사, NUMPY_USE_DOC_CENTROIDS=0이면 정확
+      (IVFIndex는 nprobe개 클러스터 안에서)
+    - ShardedSearch: 샤드별 NumpyIndex 문서 top-k를 힙 병합 (필터는 각 워커에서 적용)
+    - Chroma: k * DOCUMENT_FETCH_FACTOR개 청크를 조회하고, 문서가 k개보다 적으면
+      (k / 찾은 문서 수) 비율만큼 조회 수를 늘려 최대 DOCUMENT_FETCH_MAX_ROUNDS번 재검색
+    """
+    if isinstance(vectorstore, HybridSearch):
+        return vectorstore.similarity_search_with_score(query, k=k, doc_ids=doc_ids, filters=filters,
+                                                        lexical_query=lexical_query)
+    if isinstance(vectorstore, NumpyIndex):
+        rows = np.flatnonzero(filter_mask(vectorstore, filters, doc_ids)) if filters or doc_ids is not None else None
+        return vectorstore.search_documents_with_score(query, k=k, rows=rows)
+    if isinstance(vectorstore, ShardedSearch):
+        return vectorstore.search_documents_with_score(query, k=k, doc_ids=doc_ids, filters=filters)
+
+    where = chroma_where(filters, doc_ids)
+    embedding = vectorstore.embeddings.embed_query(query)
+    total = vectorstore._collection.count()
+    if not total:
+        return []
+    fetch_k = min(k * DOCUMENT_FETCH_FACTOR, total)
+    grouped = []
+    for _ in range(DOCUMENT_FETCH_MAX_ROUNDS):
+        results = vectorstore.similarity_search_by_vector_with_relevance_scores(embedding, k=fetch_k, filter=where)
+        grouped = group_by_document(results)
+        # 문서가 충분하거나, 조건에 맞는 청크를 모두 받았으면 종료
+        if len(grouped) >= k or len(results) < fetch_k or fetch_k >= total:
+            break
+        fetch_k = min(total, fetch_k * max(2, math.ceil(k / max(1, len(grouped)))))
+    return grouped[:k]
+
+
+# ================================================================
+# 3. 하이브리드 검색 (벡터 + BM25)
+# ================================================================
+def reciprocal_rank_fusion(rankings, rrf_k=RRF_K):
+    """여러 순위 목록을 RRF로 결합 → [(키, 점수)] 점수 내림차순"""
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridSearch:
+    """벡터 검색 + BM25 검색 결합 (similarity_search_with_score 인터페이스 유지)
+
+    반환 거리는 1 - RRF 점수 / 최대 RRF 점수 (0~1, 작을수록 관련성 높음, 파일명 일치는 0)
+    """
+
+    def __init__(self, vectorstore, lexical_index, rrf_k=RRF_K):
+        self.vectorstore = vectorstore
+        self.lexical_index = lexical_index
+        self.rrf_k = rrf_k
+
+    def close(self):
+        """감싼 벡터스토어 정리 (sharded 백엔드의 워커 프로세스 풀)"""
+        close = getattr(self.vectorstore, "close", None)
+        if close is not None:
+            close()
+
+    def similarity_search_with_score(self, query, k=4, doc_ids=None, filters=None, lexical_query=None):
+        """lexical_query가 있으면 BM25/파일명 일치는 query 대신 그 문자열로 검색"""
+        fetch_k = k * HYBRID_FETCH_FACTOR
+        lexical_query = lexical_query or query
+
+        # 벡터 검색: 문서별 가장 가까운 청크로 문서 순위 구성
+        best_chunks = {doc.metadata["id"]: doc
+                       for doc, _ in search_documents(self.vectorstore, query, fetch_k, doc_ids, filters)}
+
+        mask = filter_mask(self.lexical_index, filters, doc_ids) if filters or doc_ids is not None else None
+        lexical_ranking = [doc_id for doc_id, _ in self.lexical_index.search(lexical_query, fetch_k, mask)]
+        fused = dict(reciprocal_rank_fusion([list(best_chunks), lexical_ranking], self.rrf_k))
+        exact = self.lexical_index.exact_matches(lexical_query)
+        if mask is not None:
+            allowed = set(self.lexical_index.doc_ids[mask].tolist())
+            exact = [doc_id for doc_id in exact if doc_id in allowed]
+        ranked = exact + [doc_id for doc_id in fused if doc_id not in exact]
+
+        max_score = 2.0 / (self.rrf_k + 1)
+        results = []
+        for doc_id in ranked[:k]:
+            doc = best_chunks.get(doc_id) or self.lexical_index.document(doc_id)
+            distance = 0.0 if doc_id in exact else 1.0 - fused.get(doc_id, 0.0) / max_score
+            results.append((doc, distance))
+        return results
+
+
+# ================================================================
+# 4. 백엔드 열기
+# ================================================================
+def open_search_backend(snapshot_path, backend=None, hybrid=None, shard_workers=None):
+    """스냅샷을 지정한 백엔드로 열기 (샤드/IVF 인덱스가 없으면 numpy, numpy 인덱스가 없는 이전 스냅샷은 Chroma로 대체)
+
+    hybrid(None이면 HYBRID_SEARCH)이고 BM25 색인이 있으면 HybridSearch로 감싸서 반환
+    shard_workers: sharded 백엔드 워커 프로세스 수 (None이면 SHARD_WORKERS, 1이면 현재 프로세스에서 검색)
+
+    스냅샷과 쿼리 임베딩 모델이 다르면 EmbeddingModelMismatchError 발생
+    """
+    backend = backend or SEARCH_BACKEND
+    if backend not in SEARCH_BACKENDS:
+        raise ValueError(f"지원하지 않는 검색 백엔드입니다: {backend} (선택: {', '.join(SEARCH_BACKENDS)})")
+
+    embedding = resolve_query_embeddings(snapshot_path)
+    vectorstore = None
+    if backend == "sharded":
+        if has_shards(snapshot_path):
+            vectorstore = ShardedSearch(snapshot_path, embedding_function=embedding,
+                                        workers=SHARD_WORKERS if shard_workers is None else shard_workers)
+        else:
+            print(f"⚠️ 샤드가 없는 스냅샷이라 NumPy 인덱스로 검색합니다: {snapshot_path}", file=sys.stderr)
+            backend = "numpy"
+    if backend == "ivf":
+        if has_ivf_index(snapshot_path):
+            vectorstore = IVFIndex(snapshot_path, embedding_function=embedding)
+        else:
+            print(f"⚠️ IVF 인덱스가 없는 스냅샷이라 NumPy 인덱스로 검색합니다: {snapshot_path}", file=sys.stderr)
+            backend = "numpy"
+    if backend == "numpy":
+        if has_numpy_index(snapshot_path):
+            vectorstore = NumpyIndex(snapshot_path, embedding_function=embedding)
+        else:
+            print(f"⚠️ NumPy 인덱스가 없는 스냅샷이라 Chroma로 검색합니다: {snapshot_path}", file=sys.stderr)
+    if vectorstore is None:
+        # langchain_community는 무거우므로 Chroma 백엔드를 실제로 열 때만 import
+        from langchain_community.vectorstores import Chroma
+        vectorstore = Chroma(persist_directory=snapshot_path, embedding_function=embedding)
+
+    if HYBRID_SEARCH if hybrid is None else hybrid:
+        if has_lexical_index(snapshot_path):
+            return HybridSearch(vectorstore, LexicalIndex(snapshot_path))
+        print(f"ℹ️ BM25 색인이 없는 스냅샷이라 벡터 검색만 사용합니다: {snapshot_path}", file=sys.stderr)
+    return vectorstore
@@ -0,0 +1,352 @@
+# ================================================================
+# 📄 shard_search.py
+# ================================================================
+# 스냅샷 NumPy 인덱스를 N개 샤드로 나누고 여러 워커 프로세스에서 동시에 검색 (scatter-gather)
+# - 샤드 기준: id (문서 id % N) / doc_type (청크 수가 많은 파일 형식부터 가장 작은 샤드에 배정)
+#   한 문서의 청크는 항상 같은 샤드에 있으므로 샤드별 정확한 문서 top-k를 합치면 전체 문서 top-k와 같음
+#   단, 샤드도 NumPy 백엔드처럼 기본으로 문서 대표 벡터 2단계 검색(근사)을 쓰므로 전체 정확 검색과 다를 수 있음
+#   (NUMPY_USE_DOC_CENTROIDS=0이면 샤드별 전체 청크 계산 → 정확, benchmark로 정확 검색 대비 재현율 확인)
+# - 스냅샷 폴더 안 shards/ 에 저장
+#     shards.json           : 샤드 수, 기준, 샤드별 청크/문서 수와 파일 형식
+#     <NN>/numpy_index/     : 샤드마다 numpy_index.py와 같은 형식 (문서 대표 벡터 포함)
+#                             양자화 샤드는 vectors.npy 없이 스냅샷 Chroma 컬렉션에서 재채점 (quantization.json의 상대 경로)
+# - ShardedSearch: 쿼리 임베딩 1회 → 샤드별 검색을 프로세스 풀에 분배 → 거리순 힙 병합(heapq.merge)
+#   doc_type 기준 샤드는 파일 형식 필터에 해당하지 않는 샤드를 건너뜀
+# - 워커 프로세스 풀은 상주 서버처럼 여러 검색에 재사용할 때만 이득 (1회 실행 CLI는 workers=1로 현재 프로세스에서 검색)
+#
+# 사용법:
+#   python python/vector_store/shard_search.py build --shards 4 [--shard-by id|doc_type] [--snapshot <경로>]
+#   python python/vector_store/shard_search.py benchmark --shard-counts 1,2,4,8 [--queries 100]
+# ================================================================
+
+import os
+import sys
+import json
+import time
+import heapq
+import shutil
+import tempfile
+import multiprocessing
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from vector_store.numpy_index import (
+    NumpyIndex, numpy_index_path, build_document_centroids, quantize_numpy_index, USE_DOC_CENTROIDS,
+    benchmark_queries, held_out_depth, drop_held_out, latency_summary, QUANTIZE_BLOCK_ROWS, BENCHMARK_QUERY_SOURCES,
+)
+
+SHARD_DIR = "shards"
+SHARD_INFO_FILE = "shards.json"
+SHARD_KEYS = ("id", "doc_type")
+# 벡터스토어 생성 시 기본 샤드 수 (0이면 샤드를 만들지 않음) / 샤드 기준
+VECTOR_SHARDS = int(os.environ.get("VECTOR_SHARDS", "0"))
+VECTOR_SHARD_BY = os.environ.get("VECTOR_SHARD_BY", "id")
+# 검색 워커 프로세스 수 (0이면 min(샤드 수, CPU 수))
+SHARD_WORKERS = int(os.environ.get("SHARD_WORKERS", "0"))
+
+
+def shard_root(snapshot_path):
+    return os.path.join(snapshot_path, SHARD_DIR)
+
+
+def has_shards(snapshot_path):
+    return os.path.exists(os.path.join(shard_root(snapshot_path), SHARD_INFO_FILE))
+
+
+def read_shard_info(snapshot_path):
+    """shards.json 읽기 (샤드가 없으면 None)"""
+    if not has_shards(snapshot_path):
+        return None
+    with open(os.path.join(shard_root(snapshot_path), SHARD_INFO_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def assign_shards(doc_ids, doc_types, shard_count, shard_by="id"):
+    """청크 행별 샤드 번호 (같은 문서의 청크는 같은 샤드)"""
+    if shard_by == "doc_type":
+        # 청크 수가 많은 파일 형식부터 현재 청크 수가 가장 적은 샤드에 배정 (해시 배정은 형식 수가 적으면 쏠림)
+        # 파일 형식 수가 샤드 수보다 적으면 남는 샤드는 비어 있음 (검색 시 건너뜀)
+        unique_types, inverse, counts = np.unique(doc_types, return_inverse=True, return_counts=True)
+        loads = np.zeros(shard_count, dtype=np.int64)
+        codes = np.zeros(len(unique_types), dtype=np.int64)
+        for i in np.argsort(-counts, kind="stable"):
+            codes[i] = int(np.argmin(loads))
+            loads[codes[i]] += counts[i]
+        return codes[inverse] if len(unique_types) else np.zeros(0, dtype=np.int64)
+    return np.asarray(doc_ids, dtype=np.int64) % shard_count
+
+
+# ================================================================
+# 1. 샤드 생성 (vector_store_create.py에서 NumPy 인덱스 내보내기 후 호출)
+# ================================================================
+def write_shard(source, rows, shard_path):
+    """source(NumpyIndex)의 rows 행만 shard_path/numpy_index/ 로 복사, (청크 수, 문서 수) 반환"""
+    index_dir = numpy_index_path(shard_path)
+    os.makedirs(index_dir, exist_ok=True)
+    dim = int(source.vectors.shape[1]) if source.vectors.ndim == 2 else 0
+
+    vectors = np.lib.format.open_memmap(os.path.join(index_dir, "vectors.npy"), mode="w+",
+                                        dtype=np.float32, shape=(len(rows), dim))
+    for start in range(0, len(rows), QUANTIZE_BLOCK_ROWS):
+        block = rows[start:start + QUANTIZE_BLOCK_ROWS]
+        vectors[start:start + len(block)] = source.vectors[block]
+    vectors.flush()
+
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    with open(os.path.join(index_dir, "texts.bin"), "wb") as texts_file:
+        for i, row in enumerate(rows):
+            encoded = source.texts[source.text_offsets[row]:source.text_offsets[row + 1]].tobytes()
+            texts_file.write(encoded)
+            offsets[i + 1] = offsets[i] + len(encoded)
+
+    doc_ids = source.doc_ids[rows]
+    np.save(os.path.join(index_dir, "norms.npy"), source.norms[rows])
+    np.save(os.path.join(index_dir, "doc_ids.npy"), doc_ids)
+    np.save(os.path.join(index_dir, "chunk_ids.npy"), source.chunk_ids[rows])
+    np.save(os.path.join(index_dir, "text_offsets.npy"), offsets)
+    unique_ids = np.unique(doc_ids)
+    with open(os.path.join(index_dir, "documents.json"), "w", encoding="utf-8") as f:
+        json.dump({str(int(doc_id)): source.documents.get(int(doc_id), {}) for doc_id in unique_ids},
+                  f, ensure_ascii=False)
+    with open(os.path.join(index_dir, "index_info.json"), "w", encoding="utf-8") as f:
+        json.dump({"count": len(rows), "dim": dim, "embedding_model": source.info.get("embedding_model")},
+                  f, ensure_ascii=False, indent=2)
+    return len(rows), len(unique_ids)
+
+
+def build_shards(snapshot_path, shard_count, shard_by="id", target_root=None, quantization="none"):
+    """스냅샷 numpy_index/ 를 shard_count개 샤드로 나눠 저장, shards.json 내용 반환
+
+    target_root를 지정하면 스냅샷 폴더 대신 그 폴더에 저장 (벤치마크용)
+    """
+    if shard_count < 1:
+        raise ValueError(f"샤드 수는 1 이상이어야 합니다: {shard_count}")
+    if shard_by not in SHARD_KEYS:
+        raise ValueError(f"지원하지 않는 샤드 기준입니다: {shard_by} (선택: {', '.join(SHARD_KEYS)})")
+
+    root = target_root or shard_root(snapshot_path)
+    if os.path.isdir(root):
+        shutil.rmtree(root)
+    os.makedirs(root)
+
+    source = NumpyIndex(snapshot_path, use_quantized=False, use_doc_centroids=False)
+    assignment = assign_shards(source.doc_ids, source.row_doc_types, shard_count, shard_by)
+    shards = []
+    for shard_no in range(shard_count):
+        rows = np.flatnonzero(assignment == shard_no)   # 오름차순 → 문서 id 순서(문서별 연속 구간) 유지
+        folder = f"{shard_no:02d}"
+        shard_path = os.path.join(root, folder)
+        chunks, documents = write_shard(source, rows, shard_path)
+        build_document_centroids(shard_path)
+        if quantization != "none":
+            # 샤드 폴더에는 Chroma가 없으므로 원본 스냅샷 Chroma 임베딩으로 재채점
+            quantize_numpy_index(shard_path, quantization, chroma_path=source.chroma_path)
+        shards.append({
+            "folder": folder,
+            "chunks": chunks,
+            "documents": documents,
+            "doc_types": sorted(set(source.row_doc_types[rows].tolist())),
+        })
+
+    info = {"count": shard_count, "shard_by": shard_by, "shards": shards}
+    with open(os.path.join(root, SHARD_INFO_FILE), "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+    return info
+
+
+# ================================================================
+# 2. 워커 프로세스 (샤드 인덱스를 최초 요청 시 메모리 매핑으로 열어 재사용)
+# ================================================================
+_OPEN_SHARDS = {}
+
+
+def _open_shard(shard_path):
+    index = _OPEN_SHARDS.get(shard_path)
+    if index is None:
+        index = _OPEN_SHARDS[shard_path] = NumpyIndex(shard_path)
+    return index
+
+
+def _search_shard(shard_path, query_vector, k, doc_ids=None, filters=None, by_document=True):
+    """샤드 1개 검색 → [(거리, Document)] 거리 오름차순"""
+    from vector_store.retrieval import filter_mask   # retrieval.py가 이 모듈을 import하므로 지연 import
+
+    index = _open_shard(shard_path)
+    rows = None
+    if filters or doc_ids is not None:
+        rows = np.flatnonzero(filter_mask(index, filters, doc_ids))
+        if not len(rows):
+            return []
+    if by_document:
+        found = index.search_documents(query_vector, k, rows)
+    else:
+        found = index.search_vector(query_vector, k, rows)
+    return [(distance, index.document(row)) for row, distance in found]
+
+
+# ================================================================
+# 3. 코디네이터
+# ================================================================
+class ShardedSearch:
+    """샤드별 검색을 워커 프로세스에 분배하고 결과를 거리순으로 병합하는 벡터스토어
+
+    similarity_search_with_score(query, k) / search_documents_with_score(query, k) 인터페이스 제공
+    """
+
+    def __init__(self, snapshot_path, embedding_function=None, workers=SHARD_WORKERS, shard_root_path=None):
+        root = shard_root_path or shard_root(snapshot_path)
+        with open(os.path.join(root, SHARD_INFO_FILE), encoding="utf-8") as f:
+            self.info = json.load(f)
+        self.snapshot_path = snapshot_path
+        self.embedding_function = embedding_function
+        self.shards = [dict(shard, path=os.path.join(root, shard["folder"])) for shard in self.info["shards"]]
+        self.workers = min(len(self.shards), workers or os.cpu_count() or 1)
+        self._executor = None
+
+    def __len__(self):
+        return sum(shard["chunks"] for shard in self.shards)
+
+    def executor(self):
+        """워커 프로세스 풀 (최초 사용 시 생성)
+
+        상주 서버에서는 요청 처리 스레드에서 처음 만들어지므로 fork 대신 forkserver(없으면 spawn)로 워커 시작
+        (멀티스레드 프로세스를 fork하면 다른 스레드가 잡고 있던 잠금이 자식에 복사되어 멈출 수 있음)
+        """
+        if self._executor is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context(method))
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def target_shards(self, filters=None):
+        """검색할 샤드 (doc_type 기준이면 파일 형식 필터에 해당하는 샤드만, 빈 샤드는 제외)"""
+        shards = [shard for shard in self.shards if shard["chunks"]]
+        doc_types = (filters or {}).get("doc_types")
+        if self.info["shard_by"] == "doc_type" and doc_types:
+            shards = [shard for shard in shards if set(shard["doc_types"]) & set(doc_types)]
+        return shards
+
+    def search_vector(self, query_vector, k=10, doc_ids=None, filters=None, by_document=True):
+        """[(Document, 거리)] 상위 k개 (by_document면 서로 다른 문서 k개)
+
+        대상 샤드가 1개이거나 워커가 1개면 프로세스 간 전송 없이 현재 프로세스에서 검색
+        """
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        shards = self.target_shards(filters)
+        if len(shards) <= 1 or self.workers <= 1:
+            partials = [_search_shard(shard["path"], query_vector, k, doc_ids, filters, by_document)
+                        for shard in shards]
+        else:
+            futures = [self.executor().submit(_search_shard, shard["path"], query_vector, k, doc_ids, filters,
+                                              by_document)
+                       for shard in shards]
+            partials = [future.result() for future in futures]
+        # 샤드별 결과가 이미 거리순이므로 힙 병합으로 상위 k개만 꺼냄
+        merged = heapq.merge(*partials, key=lambda item: item[0])
+        return [(doc, distance) for distance, doc in islice(merged, k)]
+
+    def search_documents_with_score(self, query, k=4, doc_ids=None, filters=None):
+        """[(Document, 거리)] 서로 다른 문서 상위 k개 (문서별 가장 가까운 청크)"""
+        if self.embedding_function is None:
+            raise ValueError("embedding_function 없이 텍스트 검색을 할 수 없습니다.")
+        return self.search_vector(self.embedding_function.embed_query(query), k, doc_ids, filters)
+
+    def similarity_search_with_score(self, query, k=4):
+        if self.embedding_function is None:
+            raise ValueError("embedding_function 없이 텍스트 검색을 할 수 없습니다.")
+        return self.search_vector(self.embedding_function.embed_query(query), k, by_document=False)
+
+
+# ================================================================
+# 4. 벤치마크 (샤드 수별 지연 시간)
+# ================================================================
+def benchmark_shards(snapshot_path, shard_counts=(1, 2, 4, 8), shard_by="id", queries=100, k=10, seed=0,
+                     workers=SHARD_WORKERS, source="held-out"):
+    """샤드 수별 문서 top-k 검색 지연 시간과 분할하지 않은 정확 검색(전체 청크 계산) 대비 재현율
+    (샤드는 임시 폴더에 생성 후 삭제, 샤드 안 검색은 NUMPY_USE_DOC_CENTROIDS 설정대로 2단계 근사 또는 정확)"""
+    exact_index = NumpyIndex(snapshot_path, use_quantized=False, use_doc_centroids=False)
+    query_vectors = benchmark_queries(exact_index, queries, seed, source)
+    expected = [{int(exact_index.doc_ids[row]) for row, _ in drop_held_out(
+                    exact_index.search_documents(query, held_out_depth(exact_index, k, exclude)),
+                    exact_index.doc_ids, exclude, k)}
+                for query, exclude in query_vectors]
+
+    results = []
+    for shard_count in shard_counts:
+        root = tempfile.mkdtemp(prefix="shards_")
+        try:
+            build_shards(snapshot_path, shard_count, shard_by, target_root=root)
+            search = ShardedSearch(snapshot_path, workers=workers, shard_root_path=root)
+            search.search_vector(query_vectors[0][0], k)   # 워커 프로세스 생성/샤드 열기는 측정에서 제외
+            if search.workers > 1:
+                for _ in range(search.workers):
+                    search.search_vector(query_vectors[0][0], k)
+            times, recalls = [], []
+            for (query, exclude), expected_docs in zip(query_vectors, expected):
+                started = time.perf_counter()
+                found = [(doc, distance) for doc, distance in search.search_vector(query, held_out_depth(exact_index, k, exclude))
+                         if doc.metadata["id"] != exclude][:k]
+                times.append(time.perf_counter() - started)
+                recalls.append(len(expected_docs & {doc.metadata["id"] for doc, _ in found}) / max(1, len(expected_docs)))
+            search.close()
+            results.append({"shards": shard_count, "workers": search.workers, **latency_summary(times),
+                            "doc_recall_at_k": round(float(np.mean(recalls)), 4)})
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        "snapshot": os.path.basename(os.path.normpath(snapshot_path)),
+        "chunks": len(exact_index),
+        "shard_by": shard_by,
+        "shard_search": "approximate" if USE_DOC_CENTROIDS else "exact",
+        "recall_baseline": "exact-unsharded",
+        "query_source": source,
+        "queries": len(query_vectors),
+        "k": k,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from vector_store.snapshot import active_snapshot_path
+
+    parser = argparse.ArgumentParser(description="NumPy 인덱스 샤드 생성 / 샤드 수별 벤치마크")
+    parser.add_argument("command", choices=["build", "benchmark"],
+                        help="build: 스냅샷에 shards/ 생성, benchmark: 샤드 수별 지연 시간 비교")
+    parser.add_argument("--snapshot", help="스냅샷 폴더 경로 (기본: 활성 스냅샷)")
+    parser.add_argument("--shards", type=int, default=VECTOR_SHARDS or 4, help="build 시 샤드 수")
+    parser.add_argument("--shard-by", choices=SHARD_KEYS, default=VECTOR_SHARD_BY, help="샤드 기준")
+    parser.add_argument("--shard-counts", default="1,2,4,8", help="benchmark 시 비교할 샤드 수 목록")
+    parser.add_argument("--workers", type=int, default=SHARD_WORKERS, help="워커 프로세스 수 (0이면 min(샤드 수, CPU 수))")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--query-source", choices=BENCHMARK_QUERY_SOURCES, default="held-out",
+                        help="벤치마크 쿼리 (held-out: 청크 벡터, 자기 문서 제외 / history: search_history 검색어 임베딩)")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    snapshot = args.snapshot or active_snapshot_path()
+    if not snapshot:
+        print("❌ 스냅샷을 찾을 수 없습니다.")
+        sys.exit(1)
+
+    if args.command == "build":
+        started = time.perf_counter()
+        info = build_shards(snapshot, args.shards, args.shard_by)
+        print(f"✅ 샤드 {info['count']}개 생성 완료 ({info['shard_by']} 기준, {time.perf_counter() - started:.1f}초)")
+        for shard in info["shards"]:
+            print(f"   - {shard['folder']}: {shard['chunks']}개 청크, {shard['documents']}개 문서")
+    else:
+        counts = [int(count) for count in args.shard_counts.split(",") if count.strip()]
+        print(json.dumps(benchmark_shards(snapshot, counts, args.shard_by, queries=args.queries, k=args.k,
+                                          workers=args.workers, source=args.query_source),
+                         ensure_ascii=False, indent=2))
@@ -0,0 +1,207 @@
+# ================================================================
+# 📄 snapshot.py
+# ================================================================
+# 벡터스토어 스냅샷(rag_chroma/documents/<폴더>) 정보 관리
+# - 생성 시 사용한 임베딩 모델명/차원을 스냅샷 폴더에 기록
+# - 검색 시 쿼리 임베딩 모델이 스냅샷과 같은지 확인
+# - 증분 생성용 문서별 내용 해시 기록
+# - 스테이징 폴더에서 생성 → 이름 변경 + 활성 스냅샷 매니페스트 교체로 원자적 게시
+# - 보관 개수를 넘는 오래된 스냅샷 정리
+# ================================================================
+
+import os
+import sys
+import json
+import time
+import shutil
+from datetime import datetime
+
+from config.models import EMBEDDING_MODEL_NAME, EMBEDDING_MISMATCH_POLICY
+from config.embedding_cache import get_query_embeddings
+
+SNAPSHOT_INFO_FILE = "snapshot_info.json"
+DOC_HASHES_FILE = "doc_hashes.json"
+
+RAG_CHROMA_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rag_chroma")
+# 게시된 스냅샷 폴더들 (python/vector_store/rag_chroma/documents/<YYYYMMDD_HHMMSS>)
+SNAPSHOT_ROOT = os.path.join(RAG_CHROMA_ROOT, "documents")
+# 생성 중인 스냅샷 (완성 전에는 검색 쪽에서 보이지 않음)
+STAGING_ROOT = os.path.join(RAG_CHROMA_ROOT, "staging")
+# 현재 검색에 사용하는 스냅샷 정보 (os.replace로 통째로 교체)
+ACTIVE_MANIFEST = os.path.join(RAG_CHROMA_ROOT, "active_snapshot.json")
+
+# 활성 스냅샷을 포함해 남겨 둘 스냅샷 개수 (나머지는 생성 후 자동 삭제)
+SNAPSHOT_RETENTION = int(os.environ.get("VECTORSTORE_RETENTION", "5"))
+STAGING_STALE_SEC = 24 * 3600   # 이 시간보다 오래된 스테이징 폴더는 중단된 생성으로 보고 삭제
+
+
+class EmbeddingModelMismatchError(RuntimeError):
+    """스냅샷을 만든 임베딩 모델과 쿼리 임베딩 모델이 다를 때 발생"""
+
+
+def write_snapshot_info(snapshot_path, info):
+    """스냅샷 폴더에 snapshot_info.json 저장"""
+    with open(os.path.join(snapshot_path, SNAPSHOT_INFO_FILE), "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=2, default=str)
+
+
+def read_snapshot_info(snapshot_path):
+    """snapshot_info.json 읽기 (기록 이전에 만든 스냅샷이면 None)"""
+    info_path = os.path.join(snapshot_path, SNAPSHOT_INFO_FILE)
+    if not os.path.exists(info_path):
+        return None
+    with open(info_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_doc_hashes(snapshot_path, doc_hashes):
+    """스냅샷에 포함된 문서별 내용 해시 저장 ({문서 id: sha256})"""
+    with open(os.path.join(snapshot_path, DOC_HASHES_FILE), "w", encoding="utf-8") as f:
+        json.dump({str(doc_id): h for doc_id, h in doc_hashes.items()}, f)
+
+
+def read_doc_hashes(snapshot_path):
+    """문서별 내용 해시 읽기 ({문서 id(int): sha256}, 기록 이전 스냅샷이면 None)"""
+    path = os.path.join(snapshot_path, DOC_HASHES_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return {int(doc_id): h for doc_id, h in json.load(f).items()}
+
+
+def latest_snapshot_path(exclude=None):
+    """SNAPSHOT_ROOT 아래에서 이름이 가장 최신인 스냅샷 폴더 경로 (없으면 None)
+
+    활성 스냅샷 매니페스트가 없던 시절에 만든 스냅샷을 찾을 때만 사용
+    """
+    if not os.path.isdir(SNAPSHOT_ROOT):
+        return None
+    folders = sorted(
+        (d for d in os.listdir(SNAPSHOT_ROOT)
+         if d != exclude and os.path.isdir(os.path.join(SNAPSHOT_ROOT, d))),
+        reverse=True,
+    )
+    return os.path.join(SNAPSHOT_ROOT, folders[0]) if folders else None
+
+
+def read_active_manifest():
+    """활성 스냅샷 매니페스트 읽기 (아직 게시된 적이 없으면 None)"""
+    if not os.path.exists(ACTIVE_MANIFEST):
+        return None
+    with open(ACTIVE_MANIFEST, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def active_snapshot_path():
+    """검색에 사용할 스냅샷 경로 (매니페스트 1회 읽기, 매니페스트가 없으면 최신 폴더로 대체)"""
+    manifest = read_active_manifest()
+    if manifest:
+        path = os.path.join(SNAPSHOT_ROOT, manifest["folder"])
+        if os.path.isdir(path):
+            return path
+        print(f"⚠️ 활성 스냅샷 폴더가 없습니다: {path}", file=sys.stderr)
+    return latest_snapshot_path()
+
+
+def staging_snapshot_path(folder):
+    """folder 이름으로 생성할 스테이징 경로"""
+    return os.path.join(STAGING_ROOT, folder)
+
+
+def publish_snapshot(staging_path, folder, info=None):
+    """완성된 스테이징 폴더를 SNAPSHOT_ROOT로 옮기고 활성 스냅샷으로 지정, 게시 경로 반환
+
+    폴더 이동(os.rename)과 매니페스트 교체(os.replace) 모두 같은 파일시스템 안의 원자적 연산이므로
+    검색 쪽에서는 이전 스냅샷 또는 완성된 새 스냅샷만 보입니다.
+    """
+    os.makedirs(SNAPSHOT_ROOT, exist_ok=True)
+    final_path = os.path.join(SNAPSHOT_ROOT, folder)
+    os.rename(staging_path, final_path)
+
+    manifest = {
+        "folder": folder,
+        "embedding_model": (info or {}).get("embedding_model"),
+        "embedding_dim": (info or {}).get("embedding_dim"),
+        "count": (info or {}).get("count"),
+        "published_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    tmp_path = f"{ACTIVE_MANIFEST}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, ACTIVE_MANIFEST)
+    return final_path
+
+
+def directory_size(path):
+    """폴더 전체 크기 (bytes)"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def prune_snapshots(keep=SNAPSHOT_RETENTION):
+    """활성 스냅샷을 포함해 최신 keep개만 남기고 삭제, [(폴더명, 삭제한 bytes)] 반환
+
+    오래된 스테이징 폴더(중단된 생성)도 함께 정리합니다.
+    """
+    removed = []
+    if os.path.isdir(STAGING_ROOT):
+        for folder in os.listdir(STAGING_ROOT):
+            path = os.path.join(STAGING_ROOT, folder)
+            if os.path.isdir(path) and time.time() - os.path.getmtime(path) > STAGING_STALE_SEC:
+                size = directory_size(path)
+                shutil.rmtree(path, ignore_errors=True)
+                removed.append((f"staging/{folder}", size))
+
+    if keep <= 0 or not os.path.isdir(SNAPSHOT_ROOT):
+        return removed
+
+    manifest = read_active_manifest() or {}
+    folders = sorted((d for d in os.listdir(SNAPSHOT_ROOT) if os.path.isdir(os.path.join(SNAPSHOT_ROOT, d))),
+                     reverse=True)
+    kept = [d for d in folders if d == manifest.get("folder")]
+    for folder in folders:
+        if folder in kept:
+            continue
+        if len(kept) < keep:
+            kept.append(folder)
+            continue
+        path = os.path.join(SNAPSHOT_ROOT, folder)
+        size = directory_size(path)
+        shutil.rmtree(path, ignore_errors=True)
+        removed.append((folder, size))
+    return removed
+
+
+def resolve_query_embeddings(snapshot_path):
+    """스냅샷과 호환되는 쿼리 임베딩 모델 반환 (쿼리 임베딩 영속 캐시 적용)
+
+    - 모델이 같으면 설정된 임베딩 모델 사용
+    - 다르면 EMBEDDING_MISMATCH_POLICY에 따라 거부하거나 스냅샷 모델로 임베딩
+    - 모델 기록이 없는 이전 스냅샷은 경고만 출력하고 설정된 모델 사용
+    """
+    info = read_snapshot_info(snapshot_path) or {}
+    snapshot_model = info.get("embedding_model")
+
+    if not snapshot_model:
+        print(f"⚠️ 임베딩 모델 기록이 없는 벡터스토어입니다. 현재 설정({EMBEDDING_MODEL_NAME})으로 검색합니다.", file=sys.stderr)
+        return get_query_embeddings()
+
+    if snapshot_model == EMBEDDING_MODEL_NAME:
+        return get_query_embeddings()
+
+    if EMBEDDING_MISMATCH_POLICY == "snapshot":
+        print(f"⚠️ 벡터스토어 임베딩 모델({snapshot_model})로 쿼리를 임베딩합니다. (현재 설정: {EMBEDDING_MODEL_NAME})", file=sys.stderr)
+        return get_query_embeddings(snapshot_model)
+
+    raise EmbeddingModelMismatchError(
+        f"벡터스토어 임베딩 모델({snapshot_model}, {info.get('embedding_dim')}차원)과 "
+        f"현재 임베딩 모델({EMBEDDING_MODEL_NAME})이 다릅니다. 벡터스토어를 새로 생성하세요."
+    )
@@ -0,0 +1,65 @@
+# ================================================================
+# 📄 test_numpy_index.py
+# ================================================================
+# NumPy 인덱스 내보내기 / 양자화 테스트 (합성 스냅샷, MySQL/Ollama 불필요)
+#   python -m pytest python/vector_store
+# ================================================================
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from vector_store.numpy_index import NumpyIndex, numpy_index_path, quantize_numpy_index, benchmark_quantization
+
+
+def index_size(snapshot_path):
+    """numpy_index/ 안 파일 크기 합계 (bytes)"""
+    return sum(entry.stat().st_size for entry in os.scandir(numpy_index_path(snapshot_path)) if entry.is_file())
+
+
+def test_export_norms_match_vectors(make_snapshot):
+    index = NumpyIndex(make_snapshot(), use_quantized=False)
+    assert np.allclose(index.norms, np.linalg.norm(np.asarray(index.vectors), axis=1))
+
+
+@pytest.mark.parametrize("mode, scan_ratio", [("int8", 3.9), ("float16", 1.9)])
+def test_quantize_replaces_float32_vectors_on_disk(make_snapshot, mode, scan_ratio):
+    snapshot = make_snapshot(documents=100, dim=256)
+    vectors_path = os.path.join(numpy_index_path(snapshot), "vectors.npy")
+    float32_bytes = os.path.getsize(vectors_path)
+    before = index_size(snapshot)
+
+    compact_bytes = quantize_numpy_index(snapshot, mode)
+
+    # vectors.npy는 지우고 압축 행렬만 남김 (스케일/설정 파일 몇 KB 외에는 줄어든 만큼 그대로 절약)
+    assert not os.path.exists(vectors_path)
+    assert float32_bytes / compact_bytes > scan_ratio
+    assert index_size(snapshot) <= before - float32_bytes + compact_bytes + 4096
+
+    report = benchmark_quantization(snapshot, queries=20, k=5)
+    assert report["rescore_source"] == "chroma"
+    assert report["disk_bytes"] == index_size(snapshot)
+    assert report["disk_size_ratio"] > 1.5
+    assert report["recall_at_k"] >= 0.9
+
+
+def test_quantized_search_rescores_with_chroma_embeddings(make_snapshot):
+    snapshot = make_snapshot(documents=100, dim=32)
+    exact = NumpyIndex(snapshot, use_quantized=False, use_doc_centroids=False)
+    queries = np.random.default_rng(1).normal(size=(5, 32)).astype(np.float32)
+    expected = [(exact.search_vector(query, 10), exact.search_documents(query, 5)) for query in queries]
+    del exact
+
+    quantize_numpy_index(snapshot, "int8")
+    quantized = NumpyIndex(snapshot, use_doc_centroids=False)
+    assert quantized.compact is not None and quantized._vectors is None
+    for query, (chunks, documents) in zip(queries, expected):
+        # 재채점 거리는 Chroma에 저장된 float32 임베딩으로 계산하므로 양자화 전과 같음
+        found = quantized.search_vector(query, 10)
+        assert [row for row, _ in found] == [row for row, _ in chunks]
+        assert np.allclose([d for _, d in found], [d for _, d in chunks], atol=1e-4)
+        found = quantized.search_documents(query, 5)
+        assert [row for row, _ in found] == [row for row, _ in documents]
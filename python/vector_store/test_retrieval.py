@@ -0,0 +1,58 @@
+# ================================================================
+# 📄 test_retrieval.py
+# ================================================================
+# 하이브리드 검색(벡터 + BM25) 파일명 정확 일치 테스트 (합성 스냅샷, MySQL/Ollama 불필요)
+#   python -m pytest python/vector_store
+# ================================================================
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from langchain_text_splitters import CharacterTextSplitter
+from vector_store import vector_store_create
+from vector_store.conftest import FixedEmbeddings, document_row, CHUNKS_PER_DOC
+from vector_store.numpy_index import NumpyIndex
+from vector_store.lexical_index import LexicalIndex, LexicalIndexBuilder
+from vector_store.retrieval import HybridSearch, search_documents
+
+
+def open_hybrid(snapshot, near_doc_id=1):
+    """쿼리 임베딩이 near_doc_id 문서의 첫 청크와 같은 HybridSearch"""
+    vectors = NumpyIndex(snapshot, use_quantized=False).vectors
+    embedding = FixedEmbeddings(vectors[(near_doc_id - 1) * CHUNKS_PER_DOC])
+    return HybridSearch(NumpyIndex(snapshot, embedding_function=embedding), LexicalIndex(snapshot))
+
+
+def test_exact_file_name_uses_lexical_query(make_snapshot):
+    hybrid = open_hybrid(make_snapshot())
+
+    # 벡터 검색은 추출 키워드로, 파일명 일치는 사용자 원문으로 확인
+    results = search_documents(hybrid, "추출된 키워드", 5, lexical_query=document_row(17)["file_name"])
+    assert results[0][0].metadata["id"] == 17
+    assert results[0][1] == 0.0
+
+    # 원문을 주지 않으면 추출 키워드로는 파일명 일치가 없어 벡터 검색 순위를 따름
+    results = search_documents(hybrid, "추출된 키워드", 5)
+    assert results[0][0].metadata["id"] == 1
+    assert 17 not in [doc.metadata["id"] for doc, _ in results]
+
+
+def test_document_without_title_is_found_by_file_name(make_snapshot, monkeypatch):
+    snapshot = make_snapshot(documents=10, lexical=False)
+    empty = {**document_row(11), "file_name": "빈문서.pdf", "title": "", "summary": ""}
+    rows = [document_row(doc_id) for doc_id in range(1, 11)] + [empty]
+    monkeypatch.setattr(vector_store_create, "stream_pages", lambda sql, page_size: iter([rows]))
+
+    # 제목/요약이 비어 청크가 없는 문서도 BM25 색인에는 추가
+    builder = LexicalIndexBuilder()
+    stream = vector_store_create.DocumentStream(CharacterTextSplitter(chunk_size=300, chunk_overlap=50),
+                                                lexical_builder=builder)
+    list(stream)
+    assert stream.document_count == 10
+    assert len(builder) == 11
+    builder.save(snapshot)
+
+    results = search_documents(open_hybrid(snapshot), "빈문서.pdf", 3)
+    assert results[0][0].metadata["id"] == 11
+    assert results[0][0].metadata["file_name"] == "빈문서.pdf"
@@ -0,0 +1,76 @@
+# ================================================================
+# 📄 test_shard_search.py
+# ================================================================
+# 샤드 검색 vs 분할하지 않은 정확 검색 비교 테스트 (합성 스냅샷, MySQL/Ollama 불필요)
+# - 샤드마다 문서가 DOC_CANDIDATE_MIN(50)개 미만이라 샤드 안 검색은 문서 대표 벡터 근사 없이 정확 검색
+#   python -m pytest python/vector_store
+# ================================================================
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from vector_store.numpy_index import NumpyIndex, read_quantization
+from vector_store.retrieval import filter_mask, make_filters
+from vector_store.shard_search import ShardedSearch, build_shards, benchmark_shards, shard_root
+
+
+def query_vectors(count=8, dim=16, seed=1):
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+
+
+def exact_documents(index, query, k, rows=None):
+    """분할하지 않은 정확 검색 → [(문서 id, 거리)]"""
+    return [(int(index.doc_ids[row]), distance) for row, distance in index.search_documents(query, k, rows)]
+
+
+def sharded_documents(search, query, k, filters=None):
+    return [(doc.metadata["id"], distance) for doc, distance in search.search_vector(query, k, filters=filters)]
+
+
+def assert_same_documents(found, expected):
+    assert [doc_id for doc_id, _ in found] == [doc_id for doc_id, _ in expected]
+    assert np.allclose([d for _, d in found], [d for _, d in expected], atol=1e-4)
+
+
+@pytest.mark.parametrize("shard_by", ["id", "doc_type"])
+@pytest.mark.parametrize("quantization", ["none", "int8"])
+def test_sharded_search_matches_exact(make_snapshot, shard_by, quantization):
+    snapshot = make_snapshot(documents=60)
+    exact = NumpyIndex(snapshot, use_quantized=False, use_doc_centroids=False)
+    build_shards(snapshot, 3, shard_by, quantization=quantization)
+    if quantization != "none":
+        # 샤드 폴더에는 Chroma가 없으므로 원본 스냅샷 Chroma로 재채점
+        assert read_quantization(os.path.join(shard_root(snapshot), "00"))["chroma_path"] == os.path.join("..", "..")
+
+    search = ShardedSearch(snapshot, workers=1)
+    for query in query_vectors():
+        assert_same_documents(sharded_documents(search, query, 10), exact_documents(exact, query, 10))
+
+    # 파일 형식 필터 (doc_type 기준이면 해당 샤드만 검색)
+    filters = make_filters(doc_types=[".hwp"])
+    rows = np.flatnonzero(filter_mask(exact, filters))
+    for query in query_vectors():
+        assert_same_documents(sharded_documents(search, query, 5, filters), exact_documents(exact, query, 5, rows))
+
+
+def test_sharded_worker_processes_match_in_process(make_snapshot):
+    snapshot = make_snapshot(documents=60)
+    build_shards(snapshot, 3)
+    local = ShardedSearch(snapshot, workers=1)
+    pooled = ShardedSearch(snapshot, workers=2)
+    try:
+        for query in query_vectors():
+            assert_same_documents(sharded_documents(pooled, query, 10), sharded_documents(local, query, 10))
+    finally:
+        pooled.close()
+    assert pooled._executor is None
+
+
+def test_benchmark_recall_against_exact_unsharded(make_snapshot):
+    report = benchmark_shards(make_snapshot(documents=60), shard_counts=(1, 3), queries=10, k=5, workers=1)
+    assert report["recall_baseline"] == "exact-unsharded"
+    assert [result["doc_recall_at_k"] for result in report["results"]] == [1.0, 1.0]
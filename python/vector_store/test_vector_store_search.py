@@ -0,0 +1,42 @@
+# ================================================================
+# 📄 test_vector_store_search.py
+# ================================================================
+# fulltext 모드 키워드 검색어 응답 테스트 (합성 스냅샷, MySQL/Ollama 불필요)
+# - FULLTEXT 조회(fetch_all)와 메타데이터 조회(select_in)는 documents 테이블 대신 합성 행으로 응답
+#   python -m pytest python/vector_store
+# ================================================================
+
+import os
+import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from config import metadata_cache
+from config.metadata_cache import DocumentMetadataCache
+from vector_store import vector_store_search
+from vector_store.conftest import document_row
+
+
+def fake_select_in(sql, values):
+    """SELECT에 적힌 컬럼만 담은 합성 documents 행 (실제 쿼리처럼 빠진 컬럼은 반환하지 않음)"""
+    columns = [column.strip() for column in re.search(r"SELECT (.+?) FROM", sql).group(1).split(",")]
+    return [{column: document_row(doc_id)[column] for column in columns} for doc_id in values]
+
+
+def test_keyword_fulltext_results_include_title(make_snapshot, monkeypatch):
+    snapshot = make_snapshot(documents=10)
+    # 99번 문서는 스냅샷 이후 추가된 문서 → 후보에서 제외
+    fulltext_rows = [{"id": 99, "score": 4.0}, {"id": 5, "score": 3.0}, {"id": 7, "score": 1.5}]
+    monkeypatch.setattr(vector_store_search, "fetch_all", lambda sql, params: fulltext_rows)
+    monkeypatch.setattr(metadata_cache, "select_in", fake_select_in)
+    monkeypatch.setattr(vector_store_search, "DOCUMENT_CACHE", DocumentMetadataCache())
+
+    stats = {}
+    results = vector_store_search.search_similar_documents("제목 보고서", snapshot, top_k=2, stats=stats,
+                                                           mode="fulltext")
+
+    assert [result["file_name"] for result in results] == [document_row(5)["file_name"], document_row(7)["file_name"]]
+    assert results[0]["content_preview"] == "제목 5. 요약 5"
+    assert results[1]["content_preview"].startswith("제목 7")
+    # FULLTEXT 1회 + 메타데이터 1회 (임베딩/벡터 검색 없음)
+    assert stats["db_round_trips"] == 2
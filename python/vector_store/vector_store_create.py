@@ -3,11 +3,32 @@
 MySQL에서 documents(title, summary)를 로드하여
 LangChain + Ollama Embeddings으로 Chroma 벡터스토어를 생성하고
 생성 시점(날짜시간)별로 저장 경로를 분리하는 스크립트
+
+--incremental: 직전 스냅샷을 복사한 뒤 추가/변경/삭제된 문서만 반영 (나머지 임베딩 재사용)
+--batch-size / --concurrency: 임베딩 배치 크기 / 동시 임베딩 요청 수
+--page-size: documents 테이블을 한 번에 읽는 행 수 (서버 측 커서 스트리밍)
+--keep: 활성 스냅샷을 포함해 남겨 둘 스냅샷 개수 (나머지는 생성 후 삭제)
+스냅샷은 rag_chroma/staging에서 만든 뒤 완성되면 documents로 옮기고 활성 스냅샷으로 게시
+청크 임베딩은 embedding_store.py 저장소에서 먼저 찾고, 없는 청크만 Ollama로 임베딩
+스냅샷마다 파일명/제목/요약/키워드 BM25 색인(lexical_index.py)을 함께 생성 (하이브리드 검색용)
+NumPy 인덱스에 문서별 청크 임베딩 평균(문서 대표 벡터)을 함께 저장 (후보 문서를 먼저 고르는 2단계 검색용)
+--shards / --shard-by: NumPy 인덱스를 문서 id 해시 또는 파일 형식 기준 N개 샤드로 분할 (SEARCH_BACKEND=sharded)
+--ivf / --ivf-lists: NumPy 인덱스로 k-means 클러스터 IVF 근사 검색 인덱스 생성 (SEARCH_BACKEND=ivf)
+청크 메타데이터에 doc_type / created_at(Unix 초)을 기록해 검색 시 파일 형식·기간 필터를 인덱스에서 바로 적용
 """
 
 import os
 import sys
+import math
+import time
+import uuid
+import shutil
+import hashlib
+import argparse
 import pymysql
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from datetime import datetime
 from langchain_core.documents import Document
 from langchain_text_splitters import CharacterTextSplitter
@@ -15,107 +36,255 @@ from langchain_community.vectorstores import Chroma
 
 # 공통 모델 설정 import
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from config.models import EMBEDDINGS
+from config.models import get_embeddings, EMBEDDING_MODEL_NAME
+from config.db import stream_pages, execute, STREAM_PAGE_SIZE
+from vector_store.snapshot import (
+    SNAPSHOT_RETENTION, write_snapshot_info, read_snapshot_info,
+    write_doc_hashes, read_doc_hashes, active_snapshot_path,
+    staging_snapshot_path, publish_snapshot, prune_snapshots, directory_size,
+)
+from vector_store.embedding_store import EmbeddingStore, StoredEmbeddings
+from vector_store.numpy_index import (
+    export_numpy_index, numpy_index_path, quantize_numpy_index, build_document_centroids,
+    QUANTIZATION_MODES, VECTOR_QUANTIZATION, DOC_CANDIDATE_FACTOR, DOC_CANDIDATE_MIN, USE_DOC_CENTROIDS,
+)
+from vector_store.lexical_index import LexicalIndexBuilder, lexical_index_path
+from vector_store.shard_search import build_shards, shard_root, SHARD_KEYS, VECTOR_SHARDS, VECTOR_SHARD_BY
+from vector_store.ivf_index import build_ivf_index, ivf_index_path, IVF_LISTS, VECTOR_IVF
+
+DELETE_BATCH_SIZE = 500   # 증분 생성 시 청크 삭제 1회당 문서 수
+EMBED_BATCH_SIZE = 32     # 임베딩 요청 1회당 청크 수
+EMBED_CONCURRENCY = 4     # 동시에 진행하는 임베딩 배치 수 (Ollama 서버 부하에 맞춰 조정)
+# 검색 필터용으로 청크 메타데이터에 기록하는 필드 (이 필드가 없는 스냅샷은 증분 생성 기준으로 쓰지 않음)
+FILTER_METADATA_FIELDS = ["doc_type", "created_at"]
 
 
 # ==============================
-# 1. MySQL 접속 정보
+# 1. 문서 스트리밍 함수
 # ==============================
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'admin',
-    'password': '1qazZAQ!',
-    'db': 'final',
-    'charset': 'utf8mb4'
-}
+def document_hash(file_name, text):
+    """문서 내용 해시 (파일명 + 임베딩 대상 텍스트가 같으면 같은 값)"""
+    return hashlib.sha256(f"{file_name}\n{text}".encode("utf-8")).hexdigest()
 
 
-# ==============================
-# 2. RAG Chroma 구축 함수
-# ==============================
-def build_rag_chroma():
-    conn = None
-    documents = []
+def row_to_document(row):
+    """documents 행 → Document (제목/요약이 모두 비어 있으면 None)"""
+    file_name = (row.get("file_name") or "").strip()
+    created_at = row.get("created_at")
+    title_text = (row.get("title") or "").strip()
+    summary_text = (row.get("summary") or "").strip()
 
-    try:
-        # ✅ MySQL 연결
-        conn = pymysql.connect(**DB_CONFIG)
-        print("✅ MySQL 연결 성공")
+    # 제목과 요약 결합
+    if title_text and summary_text:
+        combined_text = f"{title_text}. {summary_text}"
+    elif title_text:
+        combined_text = title_text
+    elif summary_text:
+        combined_text = summary_text
+    else:
+        return None
 
-        # ✅ DictCursor 사용 → 컬럼명을 키로 접근 가능
-        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-            cursor.execute("SELECT id, file_name, title, summary FROM documents")
-            rows = cursor.fetchall()
+    metadata = {
+        "source": "mysql",
+        "table": "documents",
+        "id": row["id"],
+        "file_name": file_name,
+        "title": title_text,
+        "summary": summary_text,
+        "doc_type": (row.get("doc_type") or "").lower(),
+    }
+    # Chroma 메타데이터는 datetime을 저장할 수 없으므로 Unix 초로 기록 (where $gte/$lte 비교용)
+    if created_at:
+        metadata["created_at"] = int(created_at.timestamp())
+    return Document(page_content=combined_text, metadata=metadata)
 
-            if not rows:
-                print("⚠️ 로드된 데이터가 없습니다. 'documents' 테이블을 확인해주세요.")
-                return
 
-            # ✅ Document 객체 생성
+class DocumentStream:
+    """documents 테이블을 페이지 단위로 읽어 청크를 하나씩 내보내는 스트림
+
+    - 서버 측 커서(SSCursor)로 page_size행씩 읽으므로 테이블 크기와 관계없이 메모리 사용량 일정
+    - 첫 페이지가 도착하면 바로 청크가 나가므로 전체 로드를 기다리지 않고 임베딩 시작
+    - base_hashes(직전 스냅샷 문서 해시)가 있으면 추가/변경된 문서만 내보내고,
+      변경된 문서의 기존 청크는 해당 페이지를 내보내기 전에 collection에서 삭제
+    - lexical_builder가 있으면 변경 여부와 관계없이 모든 문서 행을 BM25 색인에 추가
+    """
+
+    def __init__(self, splitter, page_size=STREAM_PAGE_SIZE, base_hashes=None, collection=None,
+                 lexical_builder=None):
+        self.splitter = splitter
+        self.page_size = page_size
+        self.base_hashes = base_hashes
+        self.collection = collection
+        self.lexical_builder = lexical_builder
+        self.doc_hashes = {}      # 다음 증분 생성용 {문서 id: 내용 해시}
+        self.added_ids = set()
+        self.updated_ids = set()
+        self.document_count = 0
+        self.chunk_count = 0
+
+    @property
+    def deleted_ids(self):
+        """직전 스냅샷에는 있었지만 이번에 읽히지 않은 문서 (스트림을 끝까지 읽은 뒤 사용)"""
+        if self.base_hashes is None:
+            return set()
+        return set(self.base_hashes) - set(self.doc_hashes)
+
+    def __iter__(self):
+        # ✅ MySQL 조회 (공용 커넥션 풀의 연결 1개로 서버 측 커서 스트리밍)
+        pages = stream_pages("SELECT id, file_name, title, summary, keywords, doc_type, created_at FROM documents ORDER BY id",
+                             page_size=self.page_size)
+        for rows in pages:
+            changed_docs, stale_ids = [], []
             for row in rows:
-                doc_id = row["id"]
-                file_name = (row.get("file_name") or "").strip()
-                title_text = (row.get("title") or "").strip()
-                summary_text = (row.get("summary") or "").strip()
-
-                # 제목과 요약 결합
-                if title_text and summary_text:
-                    combined_text = f"{title_text}. {summary_text}"
-                elif title_text:
-                    combined_text = title_text
-                elif summary_text:
-                    combined_text = summary_text
-                else:
+                # 제목/요약이 비어 임베딩할 내용이 없는 문서도 파일명/키워드로는 찾을 수 있도록 BM25 색인에는 추가
+                if self.lexical_builder is not None:
+                    self.lexical_builder.add(row)
+                doc = row_to_document(row)
+                if doc is None:
                     continue
+                doc_id = doc.metadata["id"]
+                doc_hash = document_hash(doc.metadata["file_name"], doc.page_content)
+                self.doc_hashes[doc_id] = doc_hash
 
-                documents.append(Document(
-                    page_content=combined_text,
-                    metadata={
-                        "source": "mysql",
-                        "table": "documents",
-                        "id": doc_id,
-                        "file_name": file_name,
-                        "title": title_text,
-                        "summary": summary_text
-                    }
-                ))
-
-            print(f"✅ MySQL에서 {len(documents)}개 문서 로드 완료")
-
-            # 상위 5개 미리보기
-            for i, doc in enumerate(documents[:5]):
-                print(f"\n--- 문서 #{i + 1} ---")
-                print(f"ID: {doc.metadata['id']}")
-                print(f"제목: {doc.metadata['title']}")
-                print(f"요약: {doc.metadata['summary']}")
-                print(f"파일명: {doc.metadata['file_name']}")
-                print(f"내용 일부: {doc.page_content[:150]}...")
+                # 상위 5개 미리보기
+                self.document_count += 1
+                if self.document_count <= 5:
+                    print(f"\n--- 문서 #{self.document_count} ---")
+                    print(f"ID: {doc_id}")
+                    print(f"제목: {doc.metadata['title']}")
+                    print(f"요약: {doc.metadata['summary']}")
+                    print(f"파일명: {doc.metadata['file_name']}")
+                    print(f"내용 일부: {doc.page_content[:150]}...")
 
-    except pymysql.Error as err:
-        print(f"❌ MySQL 오류: {err}")
-        return
-    finally:
-        if conn:
-            conn.close()
-            print("🔒 MySQL 연결 해제")
-
-    # ✅ 문서가 없으면 중단
-    if not documents:
-        print("⚠️ 유효한 문서가 없어 벡터스토어를 생성하지 않습니다.")
-        return
+                previous_hash = self.base_hashes.get(doc_id) if self.base_hashes is not None else None
+                if previous_hash == doc_hash:
+                    continue
+                if previous_hash is None:
+                    self.added_ids.add(doc_id)
+                else:
+                    self.updated_ids.add(doc_id)
+                    stale_ids.append(doc_id)
+                changed_docs.append(doc)
 
-    # ==============================
-    # 3. 텍스트 분할 (청킹)
-    # ==============================
-    splitter = CharacterTextSplitter(chunk_size=300, chunk_overlap=50)
-    split_docs = splitter.split_documents(documents)
-    print(f"\n✅ 청킹 완료. 총 {len(split_docs)}개 청크 생성")
+            if stale_ids:
+                self.collection.delete(where={"id": {"$in": stale_ids}})
+
+            for doc in changed_docs:
+                for chunk in self.splitter.split_documents([doc]):
+                    self.chunk_count += 1
+                    yield chunk
+
+
+def find_incremental_base():
+    """증분 생성에 사용할 활성 스냅샷 경로 (사용할 수 없으면 이유 출력 후 None)"""
+    base_path = active_snapshot_path()
+    if not base_path:
+        print("ℹ️ 이전 벡터스토어가 없어 전체 생성합니다.")
+        return None
+
+    info = read_snapshot_info(base_path) or {}
+    if info.get("embedding_model") != EMBEDDING_MODEL_NAME:
+        print(f"ℹ️ 이전 벡터스토어의 임베딩 모델({info.get('embedding_model')})이 현재 설정과 달라 전체 생성합니다.")
+        return None
+    if read_doc_hashes(base_path) is None:
+        print("ℹ️ 이전 벡터스토어에 문서 해시 기록이 없어 전체 생성합니다.")
+        return None
+    if not set(FILTER_METADATA_FIELDS) <= set(info.get("metadata_fields") or []):
+        print("ℹ️ 이전 벡터스토어에 필터용 메타데이터(doc_type, created_at)가 없어 전체 생성합니다.")
+        return None
+    return base_path
+
+
+# ==============================
+# 2. 임베딩 단계 (배치 + 동시 요청)
+# ==============================
+def iter_batches(items, batch_size):
+    """iterable을 batch_size개씩 리스트로 묶어 반환"""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _embed_batch(embeddings, texts):
+    started = time.perf_counter()
+    vectors = embeddings.embed_documents(texts)
+    return vectors, time.perf_counter() - started
+
+
+def embed_and_store(collection, docs, embeddings, batch_size=EMBED_BATCH_SIZE, concurrency=EMBED_CONCURRENCY):
+    """청크를 batch_size개씩 임베딩(최대 concurrency개 배치 동시 진행)해 Chroma 컬렉션에 저장
+
+    배치는 들어온 순서대로 저장하며, 진행 중인 배치가 concurrency개를 넘지 않도록 대기합니다.
+    반환: 처리량 통계 dict (chunks, batches, wall_sec, chunks_per_sec, p95_batch_sec)
+    """
+    latencies = []
+    stored = 0
+    pending = deque()   # (배치, Future) - 제출 순서 유지
+    started = time.perf_counter()
+
+    def store_oldest():
+        nonlocal stored
+        batch, future = pending.popleft()
+        vectors, elapsed = future.result()
+        latencies.append(elapsed)
+        collection.upsert(
+            ids=[str(uuid.uuid4()) for _ in batch],
+            embeddings=vectors,
+            documents=[doc.page_content for doc in batch],
+            metadatas=[doc.metadata for doc in batch],
+        )
+        stored += len(batch)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for batch in iter_batches(docs, batch_size):
+            while len(pending) >= concurrency:
+                store_oldest()
+            pending.append((batch, executor.submit(_embed_batch, embeddings, [doc.page_content for doc in batch])))
+        while pending:
+            store_oldest()
+
+    wall_sec = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "chunks": stored,
+        "batches": len(latencies),
+        "batch_size": batch_size,
+        "concurrency": concurrency,
+        "wall_sec": round(wall_sec, 3),
+        "chunks_per_sec": round(stored / wall_sec, 2) if wall_sec > 0 else 0.0,
+        "p95_batch_sec": round(latencies[max(0, math.ceil(len(latencies) * 0.95) - 1)], 3) if latencies else 0.0,
+    }
+
+
+# ==============================
+# 3. RAG Chroma 구축 함수
+# ==============================
+def discard_staging(staging_path, published_path):
+    """생성 실패 시 스테이징 폴더만 삭제 (이미 게시된 스냅샷은 운영중이므로 남겨 둠)"""
+    if published_path is None:
+        shutil.rmtree(staging_path, ignore_errors=True)
+    else:
+        print(f"⚠️ 스냅샷은 이미 게시되었습니다: {published_path} (삭제하지 않음)")
+
+
+def build_rag_chroma(incremental=False, batch_size=EMBED_BATCH_SIZE, concurrency=EMBED_CONCURRENCY,
+                     page_size=STREAM_PAGE_SIZE, keep=SNAPSHOT_RETENTION, quantization=VECTOR_QUANTIZATION,
+                     shards=VECTOR_SHARDS, shard_by=VECTOR_SHARD_BY, ivf=VECTOR_IVF, ivf_lists=IVF_LISTS):
+    build_started = time.perf_counter()
+
+    # ✅ 증분 생성: 직전 스냅샷을 기준으로 문서 해시 비교
+    base_path = find_incremental_base() if incremental else None
+    base_hashes = read_doc_hashes(base_path) if base_path else None
 
     # ==============================
     # 4. 임베딩 설정 (공통 모델 설정에서 import)
     # ==============================
     try:
-        embeddings = EMBEDDINGS  # config/models.py에서 import한 모델 사용
+        # config/models.py에서 최초 사용 시 생성, 이전에 임베딩한 청크는 저장소에서 재사용
+        embeddings = StoredEmbeddings(get_embeddings(), EMBEDDING_MODEL_NAME, EmbeddingStore())
         print("✅ 임베딩 모델 설정 완료")
     except Exception as e:
         print(f"❌ 임베딩 모델 설정 오류: {e}")
@@ -124,52 +293,211 @@ def build_rag_chroma():
 
     # ==============================
     # 5. 벡터스토어 생성 및 저장 (날짜시간 경로)
+    #    문서 읽기 → 청킹 → 임베딩 → 저장을 페이지/배치 단위로 이어서 처리
+    #    완성 전까지는 스테이징 폴더에 만들어 검색 쪽에서 보이지 않게 함
     # ==============================
     now = datetime.now().strftime("%Y%m%d_%H%M%S")
-    rag_path = f"./python/vector_store/rag_chroma/documents/{now}/"
-    os.makedirs(rag_path, exist_ok=True)
+    rag_path = staging_snapshot_path(now)
+    published_path = None  # 게시 후에는 스테이징 폴더가 없고, 게시된 폴더는 운영중이므로 지우지 않음
 
     print(f"\n⏳ 벡터스토어 생성 중... (경로: {rag_path})")
 
     try:
-        db = Chroma.from_documents(
-            documents=split_docs,
-            embedding=embeddings,
-            persist_directory=rag_path
-        )
+        if base_path:
+            # 직전 스냅샷 복사 → 변경/삭제 문서 청크 제거 → 추가/변경 문서 청크만 임베딩
+            print(f"🔁 증분 생성 (기준: {os.path.basename(base_path)})")
+            shutil.copytree(base_path, rag_path)
+        else:
+            os.makedirs(rag_path)
+        db = Chroma(persist_directory=rag_path, embedding_function=embeddings)
+
+        splitter = CharacterTextSplitter(chunk_size=300, chunk_overlap=50)
+        lexical_builder = LexicalIndexBuilder()
+        stream = DocumentStream(splitter, page_size=page_size, base_hashes=base_hashes, collection=db._collection,
+                                lexical_builder=lexical_builder)
+
+        # 청크 임베딩 → 배치 단위로 Chroma에 직접 저장 (Chroma.from_documents 대신)
+        embed_stats = embed_and_store(db._collection, stream, embeddings,
+                                      batch_size=batch_size, concurrency=concurrency)
+        embed_stats["reused"] = embeddings.reused
+        embed_stats["embedded"] = embeddings.embedded
+        print(f"✅ MySQL에서 {stream.document_count}개 문서 로드 완료")
+        print(f"\n✅ 청킹 완료. 총 {stream.chunk_count}개 청크 생성")
+
+        # ✅ 문서가 없으면 중단
+        if not stream.document_count:
+            print("⚠️ 유효한 문서가 없어 벡터스토어를 생성하지 않습니다.")
+            shutil.rmtree(rag_path, ignore_errors=True)
+            return
+
+        added_ids, updated_ids, deleted_ids = stream.added_ids, stream.updated_ids, stream.deleted_ids
+        if base_path:
+            print(f"🔁 추가 {len(added_ids)}개, 변경 {len(updated_ids)}개, 삭제 {len(deleted_ids)}개")
+            if not (added_ids or updated_ids or deleted_ids):
+                print("✅ 변경된 문서가 없어 새 벡터스토어를 만들지 않습니다.")
+                shutil.rmtree(rag_path, ignore_errors=True)
+                return
+            stale_ids = sorted(deleted_ids)
+            for start in range(0, len(stale_ids), DELETE_BATCH_SIZE):
+                db._collection.delete(where={"id": {"$in": stale_ids[start:start + DELETE_BATCH_SIZE]}})
+
         # persist() is deprecated in newer versions - data is automatically persisted
+        chunk_count = db._collection.count()
+        # 임베딩 차원 확인 (저장된 벡터 1개에서 추출, 추가 임베딩 호출 없음)
+        sample = db._collection.get(limit=1, include=["embeddings"])
+        embedding_dim = len(sample["embeddings"][0]) if len(sample["embeddings"]) else None
+
+        # 검색 시 모델 불일치 확인용 스냅샷 정보 + 다음 증분 생성용 문서 해시 기록
+        build_mode = "incremental" if base_path else "full"
+        base_folder = os.path.basename(base_path) if base_path else None
+        snapshot_info = {
+            "folder": now,
+            "embedding_model": EMBEDDING_MODEL_NAME,
+            "embedding_dim": embedding_dim,
+            "count": chunk_count,
+            "build_mode": build_mode,
+            "base_folder": base_folder,
+            "added": len(added_ids),
+            "updated": len(updated_ids),
+            "deleted": len(deleted_ids),
+            "embedding_stats": embed_stats,
+            "quantization": quantization,
+            # NumPy 문서 검색은 대표 벡터로 후보 문서를 고르는 근사 검색 (생성 시점 기본값, 검색 시 환경 변수로 변경 가능)
+            "doc_centroids": {"search": "approximate" if USE_DOC_CENTROIDS else "exact",
+                              "candidate_factor": DOC_CANDIDATE_FACTOR, "candidate_min": DOC_CANDIDATE_MIN},
+            "shards": {"count": shards, "shard_by": shard_by} if shards else None,
+            "ivf": ivf,
+            "metadata_fields": FILTER_METADATA_FIELDS,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        write_snapshot_info(rag_path, snapshot_info)
+        write_doc_hashes(rag_path, stream.doc_hashes)
+
+        # NumPy 전수 검색용 행렬 내보내기 (SEARCH_BACKEND=numpy)
+        export_started = time.perf_counter()
+        if os.path.isdir(numpy_index_path(rag_path)):
+            shutil.rmtree(numpy_index_path(rag_path))  # 증분 생성 시 복사된 이전 인덱스
+        export_numpy_index(db._collection, rag_path, EMBEDDING_MODEL_NAME)
+        print(f"🧮 NumPy 인덱스 내보내기 완료 ({time.perf_counter() - export_started:.1f}초)")
+        # 문서별 청크 임베딩 평균 (2단계 검색: 후보 문서 선택 → 해당 문서 청크만 계산)
+        print(f"📑 문서 대표 벡터 생성 완료: {build_document_centroids(rag_path)}개 문서")
+
+        # 샤드 분할 (워커 프로세스 병렬 검색용, 증분 생성 시 복사된 이전 샤드는 다시 만듦)
+        if os.path.isdir(shard_root(rag_path)):
+            shutil.rmtree(shard_root(rag_path))
+        if shards:
+            shard_info = build_shards(rag_path, shards, shard_by, quantization=quantization)
+            sizes = ", ".join(str(shard["chunks"]) for shard in shard_info["shards"])
+            print(f"🧩 샤드 {shards}개 생성 완료 ({shard_by} 기준, 샤드별 청크 수: {sizes})")
+
+        # IVF 근사 검색 인덱스 (k-means 클러스터별 연속 블록, 증분 생성 시에도 전체 다시 학습)
+        if os.path.isdir(ivf_index_path(rag_path)):
+            shutil.rmtree(ivf_index_path(rag_path))
+        if ivf and chunk_count:
+            ivf_started = time.perf_counter()
+            ivf_info = build_ivf_index(rag_path, ivf_lists)
+            print(f"🗂️ IVF 인덱스 생성 완료: 클러스터 {ivf_info['lists']}개 "
+                  f"(최대 {ivf_info['largest_list']}개 청크, {time.perf_counter() - ivf_started:.1f}초)")
+
+        # 전수 검색용 압축 행렬 (샤드/IVF는 위에서 float32 vectors.npy로 만든 뒤 양자화)
+        # vectors.npy는 지우고 재채점은 같은 임베딩이 저장된 Chroma 컬렉션에서 읽음
+        if quantization != "none":
+            before_size = directory_size(numpy_index_path(rag_path))
+            quantize_numpy_index(rag_path, quantization)
+            after_size = directory_size(numpy_index_path(rag_path))
+            print(f"🗜️ {quantization} 양자화 완료: numpy_index {before_size / 1024 / 1024:.1f}MB → "
+                  f"{after_size / 1024 / 1024:.1f}MB (vectors.npy 삭제, 재채점은 Chroma 임베딩 사용)")
+
+        # 파일명/제목/요약/키워드 BM25 색인 (하이브리드 검색용)
+        if os.path.isdir(lexical_index_path(rag_path)):
+            shutil.rmtree(lexical_index_path(rag_path))  # 증분 생성 시 복사된 이전 색인
+        lexical_info = lexical_builder.save(rag_path)
+        print(f"🔤 BM25 색인 생성 완료: {lexical_info['count']}개 문서, {lexical_info['terms']}개 색인어")
+
+        # 완성된 스냅샷 게시 (폴더 이동 + 활성 스냅샷 매니페스트 교체)
+        published_path = publish_snapshot(rag_path, now, snapshot_info)
         print(f"🎉 RAG Chroma 벡터스토어 구축 완료!")
-        print(f"   저장 경로: {rag_path}")
+        print(f"   저장 경로: {published_path} (활성 스냅샷으로 게시)")
+        print(f"   임베딩 모델: {EMBEDDING_MODEL_NAME} ({embedding_dim}차원)")
+        print(f"📊 임베딩 처리량: {embed_stats['chunks']}개 청크 / {embed_stats['wall_sec']}초 "
+              f"({embed_stats['chunks_per_sec']} 청크/초, 배치 p95 {embed_stats['p95_batch_sec']}초, "
+              f"배치 {embed_stats['batch_size']}개 x 동시 {embed_stats['concurrency']}개)")
+        print(f"♻️ 임베딩 저장소 재사용 {embed_stats['reused']}개, 새로 임베딩 {embed_stats['embedded']}개")
+    except pymysql.Error as err:
+        print(f"❌ MySQL 오류: {err}")
+        discard_staging(rag_path, published_path)
+        return
     except Exception as e:
         print(f"❌ 벡터스토어 생성 오류: {e}")
+        discard_staging(rag_path, published_path)
         return
 
     # ==============================
     # 6. MySQL에 벡터스토어 정보 저장
     # ==============================
     try:
-        conn = pymysql.connect(**DB_CONFIG)
-        with conn.cursor() as cursor:
-            sql = """
-                INSERT INTO vectorStore (folder, count, created_at)
-                VALUES (%s, %s, %s)
+        execute(
             """
-            cursor.execute(sql, (now, len(split_docs), datetime.now()))
-            conn.commit()
+            INSERT INTO vectorStore (folder, count, embedding_model, embedding_dim, build_mode, base_folder,
+                                     added_count, updated_count, deleted_count, shard_count, is_active, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 1, %s)
+            """,
+            (now, chunk_count, EMBEDDING_MODEL_NAME, embedding_dim, build_mode, base_folder,
+             len(added_ids), len(updated_ids), len(deleted_ids), shards, datetime.now()),
+        )
+        execute("UPDATE vectorStore SET is_active = 0 WHERE is_active = 1 AND folder <> %s", (now,))
 
         print(f"✅ 벡터스토어 정보를 MySQL에 저장 완료")
         print(f"   폴더: {now}")
-        print(f"   문서 수량: {len(split_docs)}개")
+        print(f"   문서 수량: {chunk_count}개")
     except pymysql.Error as err:
+        # 스냅샷은 이미 게시되어 검색에 쓰이는 중 → 되돌리지 않고 DB 기록 누락만 알림
         print(f"⚠️ MySQL 저장 오류: {err}")
-    finally:
-        if conn:
-            conn.close()
-            print("🔒 MySQL 연결 해제")
+        print(f"⚠️ 스냅샷 {now}은(는) 활성 스냅샷으로 게시되었지만 vectorStore 테이블에 기록되지 않았습니다. "
+              f"목록/삭제 화면에 보이지 않으니 수동으로 행을 추가하세요.")
+
+    # ==============================
+    # 7. 오래된 스냅샷 정리 (보관 개수 초과분)
+    # ==============================
+    try:
+        removed = prune_snapshots(keep)
+        if removed:
+            freed_mb = sum(size for _, size in removed) / 1024 / 1024
+            print(f"🧹 오래된 스냅샷 {len(removed)}개 삭제 ({freed_mb:.1f}MB 확보, 보관 {keep}개)")
+            folders = [folder for folder, _ in removed if not folder.startswith("staging/")]
+            if folders:
+                execute(f"DELETE FROM vectorStore WHERE folder IN ({', '.join(['%s'] * len(folders))})", folders)
+    except Exception as e:
+        print(f"⚠️ 오래된 스냅샷 정리 오류: {e}")
+
+    print(f"⏱️ 전체 소요 시간: {time.perf_counter() - build_started:.1f}초")
 
 
 # ==============================
-# 7. 실행부
+# 8. 실행부
 # ==============================
 if __name__ == "__main__":
-    build_rag_chroma()
+    parser = argparse.ArgumentParser(description="documents 테이블로 Chroma 벡터스토어 생성")
+    parser.add_argument("--incremental", action="store_true",
+                        help="직전 벡터스토어를 복사해 추가/변경/삭제된 문서만 반영")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="임베딩 요청 1회당 청크 수")
+    parser.add_argument("--concurrency", type=int, default=EMBED_CONCURRENCY, help="동시 임베딩 배치 수")
+    parser.add_argument("--page-size", type=int, default=STREAM_PAGE_SIZE, help="documents 테이블을 한 번에 읽는 행 수")
+    parser.add_argument("--keep", type=int, default=SNAPSHOT_RETENTION,
+                        help="남겨 둘 스냅샷 개수 (활성 스냅샷 포함, 0이면 삭제하지 않음)")
+    parser.add_argument("--quantize", choices=QUANTIZATION_MODES, default=VECTOR_QUANTIZATION,
+                        help="NumPy 인덱스 양자화 방식 (numpy_index 벡터 행렬 int8: 1/4, float16: 1/2, "
+                             "float32 vectors.npy는 지우고 재채점은 Chroma 임베딩 사용)")
+    parser.add_argument("--shards", type=int, default=VECTOR_SHARDS,
+                        help="NumPy 인덱스 샤드 수 (0이면 분할하지 않음, SEARCH_BACKEND=sharded로 검색)")
+    parser.add_argument("--shard-by", choices=SHARD_KEYS, default=VECTOR_SHARD_BY,
+                        help="샤드 기준 (id: 문서 id % 샤드 수, doc_type: 파일 형식별로 청크 수가 고르게 배정)")
+    parser.add_argument("--ivf", action="store_true", default=VECTOR_IVF,
+                        help="IVF(k-means 클러스터) 근사 검색 인덱스 생성 (SEARCH_BACKEND=ivf로 검색)")
+    parser.add_argument("--ivf-lists", type=int, default=IVF_LISTS, help="IVF 클러스터 수 (0이면 √청크 수)")
+    args = parser.parse_args()
+
+    build_rag_chroma(incremental=args.incremental, batch_size=max(1, args.batch_size),
+                     concurrency=max(1, args.concurrency), page_size=max(1, args.page_size), keep=args.keep,
+                     quantization=args.quantize, shards=max(0, args.shards), shard_by=args.shard_by,
+                     ivf=args.ivf, ivf_lists=max(0, args.ivf_lists))
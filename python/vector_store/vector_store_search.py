@@ -4,62 +4,147 @@
 # MySQL에서 문서 메타데이터를 불러와
 # LangChain + Ollama Embeddings + Chroma 벡터스토어 기반으로
 # 쿼리 유사도 검색을 수행하는 스크립트
+# 검색 백엔드: chroma(기본) / numpy / sharded / ivf (3번째 인자 또는 SEARCH_BACKEND 환경 변수)
+# 스냅샷에 BM25 색인이 있으면 벡터 결과와 RRF로 결합 (HYBRID_SEARCH=0이면 벡터 검색만)
+# 검색 모드: vector(기본) / fulltext (4번째 인자 또는 SEARCH_MODE 환경 변수)
+#   fulltext: MySQL FULLTEXT(ngram) MATCH ... AGAINST로 후보 문서를 먼저 좁힌 뒤 해당 문서만 벡터 검색
+#             후보는 스냅샷에 들어 있는 문서로 한정, 후보가 없거나 MySQL 오류면 전체 벡터 검색
+#             짧은 키워드 검색어(파일명 일부 등)는 임베딩 없이 FULLTEXT 순위로 바로 응답
+# 검색 필터: --doc-type .pdf --date-from 2025-09-01 --date-to 2025-09-30 (인덱스 단계에서 적용)
 # ================================================================
 
 import os
 import sys
 import json
-import pymysql
 from datetime import datetime
-from langchain_community.vectorstores import Chroma
+import pymysql
+from langchain_core.documents import Document
 
 # 공통 모델 설정 import
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from config.models import EMBEDDINGS
+from config.db import fetch_all
+from config.metadata_cache import DOCUMENT_CACHE
+from config.embedding_cache import query_embedding_cache_stats
+from vector_store.snapshot import EmbeddingModelMismatchError, read_doc_hashes
+from vector_store.numpy_index import numpy_index_path
+from vector_store.lexical_index import lexical_index_path
+from vector_store.retrieval import open_search_backend, search_documents, make_filters
 
 
 # ================================================================
 # 1. 설정
 # ================================================================
 
-# MySQL 설정
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'admin',
-    'password': '1qazZAQ!',
-    'db': 'final',
-    'charset': 'utf8mb4'
-}
-
+# MySQL 접속 정보 및 커넥션 풀은 config/db.py에서 import함
 # 임베딩 모델은 config/models.py에서 import함
 
+SEARCH_MODES = ("vector", "fulltext")
+SEARCH_MODE = os.environ.get("SEARCH_MODE", "vector")
+FULLTEXT_COLUMNS = "title, summary, keywords, file_name"   # DB_Table_documents.sql의 ft_documents 인덱스와 같은 순서
+FULLTEXT_CANDIDATES = 200      # FULLTEXT로 고르는 최대 후보 문서 수
+KEYWORD_QUERY_MAX_WORDS = 2    # 이 단어 수 이하의 검색어는 임베딩 없이 FULLTEXT 순위로 응답
+
 
 # ================================================================
 # 2. MySQL에서 문서 메타데이터 가져오기 함수
 # ================================================================
-def get_document_metadata(doc_id):
-    """MySQL에서 doc_id에 해당하는 문서 메타데이터 반환"""
+def get_documents_metadata(doc_ids, stats=None):
+    """여러 doc_id의 메타데이터 반환 ({id: row}), 캐시에 없는 문서만 한 번의 쿼리로 조회
+
+    stats dict를 넘기면 DB 왕복 횟수(db_round_trips)를 누적 기록
+    """
     try:
-        conn = pymysql.connect(**DB_CONFIG)
-        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-            cursor.execute("""
-                SELECT file_name, file_location, summary, keywords, doc_type
-                FROM documents
-                WHERE id = %s
-            """, (doc_id,))
-            row = cursor.fetchone()
-        conn.close()
-        return row if row else {}
+        return DOCUMENT_CACHE.get_many(doc_ids, stats)
     except Exception as e:
-        print(f"⚠️ MySQL 조회 실패 (ID: {doc_id}): {e}", file=sys.stderr)
+        print(f"⚠️ MySQL 조회 실패 (ID: {doc_ids}): {e}", file=sys.stderr)
         return {}
 
 
+def get_document_metadata(doc_id):
+    """MySQL에서 doc_id에 해당하는 문서 메타데이터 반환"""
+    return get_documents_metadata([doc_id]).get(doc_id, {})
+
+
+def snapshot_document_ids(snapshot_path):
+    """스냅샷에 들어 있는 문서 id 집합 (doc_hashes.json → numpy_index / lexical_index의 documents.json 순서로 확인)
+
+    어느 파일도 없는 이전 스냅샷이면 None
+    """
+    doc_hashes = read_doc_hashes(snapshot_path)
+    if doc_hashes is not None:
+        return set(doc_hashes)
+    for index_dir in (numpy_index_path(snapshot_path), lexical_index_path(snapshot_path)):
+        path = os.path.join(index_dir, "documents.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return {int(doc_id) for doc_id in json.load(f)}
+    return None
+
+
+def sql_datetime(timestamp):
+    """필터의 Unix 초 → 로컬 시각 "YYYY-MM-DD HH:MM:SS" (documents.created_at DATETIME과 직접 비교)
+
+    FROM_UNIXTIME은 MySQL 세션 시간대를 따르므로, 청크 메타데이터와 같은 Python 로컬 시각으로 변환해 전달
+    """
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def fulltext_candidates(query, limit=FULLTEXT_CANDIDATES, stats=None, filters=None, doc_ids=None):
+    """FULLTEXT(ngram) 인덱스로 후보 문서 검색 → [(문서 id, 점수)] 점수 내림차순 (filters 조건도 함께 적용)
+
+    doc_ids(스냅샷 문서 id 집합)를 넘기면 그 안의 문서만 반환 (스냅샷 이후 추가된 문서 제외)
+    MySQL 오류 시 빈 목록 반환 → 호출 쪽은 전체 벡터 검색으로 진행
+    """
+    filters = filters or {}
+    match = f"MATCH({FULLTEXT_COLUMNS}) AGAINST (%s IN NATURAL LANGUAGE MODE)"
+    conditions, params = [match], [query]
+    if filters.get("doc_types"):
+        conditions.append(f"LOWER(doc_type) IN ({', '.join(['%s'] * len(filters['doc_types']))})")
+        params.extend(filters["doc_types"])
+    if "created_from" in filters:
+        conditions.append("created_at >= %s")
+        params.append(sql_datetime(filters["created_from"]))
+    if "created_to" in filters:
+        conditions.append("created_at <= %s")
+        params.append(sql_datetime(filters["created_to"]))
+    try:
+        rows = fetch_all(
+            f"SELECT id, {match} AS score FROM documents WHERE {' AND '.join(conditions)} ORDER BY score DESC LIMIT %s",
+            (query, *params, limit),
+        )
+    except (pymysql.MySQLError, TimeoutError) as e:
+        print(f"⚠️ FULLTEXT 조회 실패, 벡터 검색으로 전환합니다: {e}", file=sys.stderr)
+        return []
+    finally:
+        if stats is not None:
+            stats["db_round_trips"] = stats.get("db_round_trips", 0) + 1
+    return [(row["id"], float(row["score"])) for row in rows if doc_ids is None or row["id"] in doc_ids]
+
+
+def is_keyword_query(query):
+    """임베딩 없이 FULLTEXT 순위로 답할 짧은 키워드 검색어인지"""
+    return 0 < len(query.split()) <= KEYWORD_QUERY_MAX_WORDS
+
+
 # ================================================================
 # 3. 유사도 검색 및 결과 출력 함수
 # ================================================================
-def search_similar_documents(query: str, chroma_path: str, top_k: int = 5):
-    """벡터스토어에서 쿼리와 유사한 문서 검색 + 유사도 계산 + 포맷 출력"""
+def search_similar_documents(query: str, chroma_path: str, top_k: int = 5, stats: dict = None,
+                             backend: str = None, mode: str = None, filters: dict = None):
+    """벡터스토어에서 쿼리와 유사한 문서 검색 + 유사도 계산 + 포맷 출력
+
+    stats dict를 넘기면 검색 중 발생한 DB 왕복 횟수(db_round_trips)를 기록
+    backend: chroma / numpy / sharded / ivf (None이면 SEARCH_BACKEND 환경 변수)
+    mode: vector / fulltext (None이면 SEARCH_MODE 환경 변수)
+    filters: retrieval.make_filters() 결과 (파일 형식 / 생성 기간)
+    """
+    mode = mode or SEARCH_MODE
+    if mode not in SEARCH_MODES:
+        print(f"❌ 지원하지 않는 검색 모드입니다: {mode} (선택: {', '.join(SEARCH_MODES)})", file=sys.stderr)
+        return []
+    if stats is None:
+        stats = {}
+    stats["db_round_trips"] = 0
     sys.stderr.reconfigure(encoding='utf-8')
     print(f"\n🔍 '{query}' 에 대한 유사도 검색 시작...", file=sys.stderr)
 
@@ -69,74 +154,118 @@ def search_similar_documents(query: str, chroma_path: str, top_k: int = 5):
         return []
 
     try:
-        # 1️⃣ ChromaDB 로드
-        vectorstore = Chroma(persist_directory=chroma_path, embedding_function=EMBEDDINGS)
+        # 0️⃣ fulltext 모드: MATCH ... AGAINST로 후보 문서 선별
+        candidates = None
+        if mode == "fulltext":
+            # 스냅샷에 없는 문서(스냅샷 생성 후 업로드 등)는 후보에서 제외
+            candidates = fulltext_candidates(query, stats=stats, filters=filters,
+                                             doc_ids=snapshot_document_ids(chroma_path))
+            print(f"🔎 FULLTEXT 후보 문서 (스냅샷 내): {len(candidates)}개", file=sys.stderr)
+            if candidates and is_keyword_query(query):
+                # 짧은 키워드 검색어: 임베딩 호출 없이 FULLTEXT 점수 순위로 응답 (거리 = 1 - 점수/최고 점수)
+                best = candidates[0][1] or 1.0
+                ranked = candidates[:top_k]
+                metadata_by_id = get_documents_metadata([doc_id for doc_id, _ in ranked], stats)
+                results = []
+                for doc_id, score in ranked:
+                    metadata = metadata_by_id.get(doc_id, {})
+                    content = ". ".join(text for text in (metadata.get("title"), metadata.get("summary")) if text)
+                    results.append((Document(page_content=content, metadata={"id": doc_id}), 1.0 - score / best))
+                print("⚡ 키워드 검색어: 임베딩 없이 FULLTEXT 결과로 응답", file=sys.stderr)
+                return format_results(results, metadata_by_id, stats)
+            if not candidates:
+                print("ℹ️ 스냅샷 안에 FULLTEXT 후보가 없어 전체 벡터 검색을 수행합니다.", file=sys.stderr)
+
+        # 1️⃣ 벡터스토어 로드 (스냅샷을 만든 임베딩 모델과 일치하는지 확인)
+        #    fulltext 모드는 이미 키워드로 좁혔으므로 BM25 결합 없이 벡터 점수만 사용
+        #    검색 1회 후 종료하는 프로세스라 sharded 백엔드도 워커 풀 없이 현재 프로세스에서 샤드를 차례로 검색
+        vectorstore = open_search_backend(chroma_path, backend, hybrid=False if candidates else None, shard_workers=1)
 
         # 2️⃣ 유사도 검색 (score 포함)
-        results = vectorstore.similarity_search_with_score(query, k=top_k)
-
-        if not results:
-            print("❌ 검색 결과 없음.", file=sys.stderr)
-            return []
-
-        # 3️⃣ 유사도 점수 추출 → 정규화 (0~100%)
-        scores = [score for _, score in results]
-        min_score, max_score = min(scores), max(scores)
-        print(f"\n📊 유사도 거리 범위: 최소 {min_score:.4f} ~ 최대 {max_score:.4f}", file=sys.stderr)
-
-        # 4️⃣ 결과 정리
-        search_results = []
-        for i, (doc, score) in enumerate(results, 1):
-            doc_id = doc.metadata.get("id")
-            metadata = get_document_metadata(doc_id) if doc_id else {}
-
-            # 유사도 변환 (거리 기반 → 유사도 %)
-            if max_score != min_score:
-                relevance = 100 * (1 - (score - min_score) / (max_score - min_score + 1e-9))
-            else:
-                relevance = 100.0
-            relevance = max(2, min(relevance, 100))
-
-            # summary 안전 처리
-            summary_text = metadata.get("summary") or "요약 없음"
-            summary_preview = summary_text[:100] + ("..." if len(summary_text) > 100 else "")
-
-            # 결과 항목 구성
-            result_item = {
-                "rank": i,
-                "relevance": round(relevance, 1),
-                "distance": round(score, 4),
-                "file_name": metadata.get("file_name", "unknown"),
-                "file_location": metadata.get("file_location") or "DB에 경로 정보 없음",
-                "summary": summary_preview,
-                "keywords": metadata.get("keywords", "키워드 없음"),
-                "doc_type": metadata.get("doc_type", ""),
-                "content_preview": (
-                    doc.page_content[:200] + "..."
-                    if len(doc.page_content) > 200 else doc.page_content
-                ),
-            }
-            search_results.append(result_item)
-
-        # 5️⃣ 결과 로그 출력 (stderr)
-        print(f"\n✅ 상위 {len(search_results)}개 결과:", file=sys.stderr)
-        print("=" * 80, file=sys.stderr)
-        for res in search_results:
-            print(f"\n--- {res['rank']}순위 ({res['relevance']}%) ---", file=sys.stderr)
-            print(f"📄 파일명: {res['file_name']}", file=sys.stderr)
-            print(f"📁 위치: {res['file_location']}", file=sys.stderr)
-            print(f"📝 요약: {res['summary']}", file=sys.stderr)
-            print(f"🗝️ 키워드: {res['keywords']}", file=sys.stderr)
-            print(f"🧩 내용 일부: {res['content_preview']}", file=sys.stderr)
-            print("-" * 80, file=sys.stderr)
-
-        return search_results
+        if filters:
+            print(f"🧷 검색 필터: {filters}", file=sys.stderr)
+        doc_ids = [doc_id for doc_id, _ in candidates] if candidates else None
+        # 서로 다른 문서 top_k개 (문서별 가장 가까운 청크)
+        results = search_documents(vectorstore, query, top_k, doc_ids=doc_ids, filters=filters)
+
+        # 3️⃣ 메타데이터 일괄 조회 (검색 1회당 DB 왕복 1회)
+        doc_ids = [doc.metadata.get("id") for doc, _ in results if doc.metadata.get("id")]
+        metadata_by_id = get_documents_metadata(doc_ids, stats)
+        return format_results(results, metadata_by_id, stats)
 
+    except EmbeddingModelMismatchError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return []
     except Exception as e:
         print(f"❌ 검색 중 오류 발생: {e}", file=sys.stderr)
         return []
 
 
+def format_results(results, metadata_by_id, stats):
+    """[(Document, 거리)] + 메타데이터 → 결과 항목 목록 (유사도 % 변환, stderr 로그 출력)"""
+    if not results:
+        print("❌ 검색 결과 없음.", file=sys.stderr)
+        return []
+
+    # 4️⃣ 유사도 점수 추출 → 정규화 (0~100%)
+    scores = [score for _, score in results]
+    min_score, max_score = min(scores), max(scores)
+    print(f"\n📊 유사도 거리 범위: 최소 {min_score:.4f} ~ 최대 {max_score:.4f}", file=sys.stderr)
+
+    stats["metadata_cache"] = DOCUMENT_CACHE.snapshot_stats()
+    stats["query_embedding_cache"] = query_embedding_cache_stats()
+    print(f"🧠 쿼리 임베딩 캐시: {stats['query_embedding_cache']}", file=sys.stderr)
+    print(f"🔁 DB 왕복 횟수: {stats['db_round_trips']} (메타데이터 캐시: {stats['metadata_cache']})", file=sys.stderr)
+
+    # 5️⃣ 결과 정리
+    search_results = []
+    for i, (doc, score) in enumerate(results, 1):
+        doc_id = doc.metadata.get("id")
+        metadata = metadata_by_id.get(doc_id, {}) if doc_id else {}
+
+        # 유사도 변환 (거리 기반 → 유사도 %)
+        if max_score != min_score:
+            relevance = 100 * (1 - (score - min_score) / (max_score - min_score + 1e-9))
+        else:
+            relevance = 100.0
+        relevance = max(2, min(relevance, 100))
+
+        # summary 안전 처리
+        summary_text = metadata.get("summary") or "요약 없음"
+        summary_preview = summary_text[:100] + ("..." if len(summary_text) > 100 else "")
+
+        # 결과 항목 구성
+        result_item = {
+            "rank": i,
+            "relevance": round(relevance, 1),
+            "distance": round(score, 4),
+            "file_name": metadata.get("file_name", "unknown"),
+            "file_location": metadata.get("file_location") or "DB에 경로 정보 없음",
+            "summary": summary_preview,
+            "keywords": metadata.get("keywords", "키워드 없음"),
+            "doc_type": metadata.get("doc_type", ""),
+            "content_preview": (
+                doc.page_content[:200] + "..."
+                if len(doc.page_content) > 200 else doc.page_content
+            ),
+        }
+        search_results.append(result_item)
+
+    # 6️⃣ 결과 로그 출력 (stderr)
+    print(f"\n✅ 상위 {len(search_results)}개 결과:", file=sys.stderr)
+    print("=" * 80, file=sys.stderr)
+    for res in search_results:
+        print(f"\n--- {res['rank']}순위 ({res['relevance']}%) ---", file=sys.stderr)
+        print(f"📄 파일명: {res['file_name']}", file=sys.stderr)
+        print(f"📁 위치: {res['file_location']}", file=sys.stderr)
+        print(f"📝 요약: {res['summary']}", file=sys.stderr)
+        print(f"🗝️ 키워드: {res['keywords']}", file=sys.stderr)
+        print(f"🧩 내용 일부: {res['content_preview']}", file=sys.stderr)
+        print("-" * 80, file=sys.stderr)
+
+    return search_results
+
+
 # ================================================================
 # 4. 메인 실행부 (CLI)
 # ================================================================
@@ -144,15 +273,34 @@ if __name__ == "__main__":
     sys.stderr.reconfigure(encoding='utf-8')
 
     if len(sys.argv) < 3:
-        print("❌ 사용법: python vector_store_search.py '<검색질문>' '<벡터스토어경로>'", file=sys.stderr)
+        print("❌ 사용법: python vector_store_search.py '<검색질문>' '<벡터스토어경로>' [chroma|numpy|sharded|ivf] [vector|fulltext] [--doc-type .pdf] [--date-from YYYY-MM-DD] [--date-to YYYY-MM-DD]", file=sys.stderr)
         print(json.dumps([], ensure_ascii=False))
         sys.exit(1)
 
-    query = sys.argv[1]
-    chroma_path = sys.argv[2]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="벡터스토어 유사도 검색 (결과 JSON은 stdout)")
+    parser.add_argument("query")
+    parser.add_argument("chroma_path")
+    parser.add_argument("backend", nargs="?", default="", help="chroma / numpy / sharded / ivf (빈 문자열이면 SEARCH_BACKEND)")
+    parser.add_argument("mode", nargs="?", default="", help="vector / fulltext (빈 문자열이면 SEARCH_MODE)")
+    parser.add_argument("--doc-type", action="append", default=[], help="파일 형식 필터 (예: .pdf, 여러 번 지정 가능)")
+    parser.add_argument("--date-from", help="생성일 시작 (YYYY-MM-DD)")
+    parser.add_argument("--date-to", help="생성일 끝 (YYYY-MM-DD, 그날 포함)")
+    args = parser.parse_args()
+
+    try:
+        filters = make_filters(args.doc_type, args.date_from, args.date_to)
+    except ValueError:
+        print(f"❌ 날짜 필터는 실제 날짜(YYYY-MM-DD)여야 합니다: {args.date_from} ~ {args.date_to}", file=sys.stderr)
+        print(json.dumps([], ensure_ascii=False))
+        sys.exit(1)
 
     # 검색 실행
-    results = search_similar_documents(query, chroma_path, top_k=5)
+    results = search_similar_documents(
+        args.query, args.chroma_path, top_k=5, backend=args.backend or None, mode=args.mode or None,
+        filters=filters,
+    )
 
     # JSON 결과 출력 (stdout)
     print(json.dumps(results, ensure_ascii=False, indent=2))
@@ -48,6 +48,107 @@ async function checkOllamaServer() {
   });
 }
 
+// 상주 검색 서버(3d_file_search.py --serve) 설정
+const SEARCH_SERVER_HOST = process.env.SEARCH_SERVER_HOST || '127.0.0.1';
+const SEARCH_SERVER_PORT = parseInt(process.env.SEARCH_SERVER_PORT || '5600', 10);
+
+// 상주 검색 서버에 JSON 요청 (서버가 꺼져 있으면 null 반환 → 기존 스크립트 실행으로 대체)
+function requestSearchServer(apiPath, payload, timeout = 600000) {
+  return new Promise((resolve) => {
+    const body = JSON.stringify(payload || {});
+    const options = {
+      hostname: SEARCH_SERVER_HOST,
+      port: SEARCH_SERVER_PORT,
+      path: apiPath,
+      method: 'POST',
+      timeout: timeout,
+      headers: {
+        'Content-Type': 'application/json; charset=utf-8',
+        'Content-Length': Buffer.byteLength(body)
+      }
+    };
+
+    const req = http.request(options, (res) => {
+      let data = '';
+      res.setEncoding('utf8');
+      res.on('data', (chunk) => { data += chunk; });
+      res.on('end', () => {
+        try {
+          resolve(JSON.parse(data));
+        } catch (e) {
+          resolve({ success: false, error: '검색 서버 응답 파싱 실패' });
+        }
+      });
+    });
+
+    req.on('error', () => {
+      // 서버 미실행
+      resolve(null);
+    });
+
+    req.on('timeout', () => {
+      req.destroy();
+      resolve({ success: false, error: '검색 서버 응답 시간 초과' });
+    });
+
+    req.write(body);
+    req.end();
+  });
+}
+
+// 검색 필터 (파일 형식 / 생성 기간): 요청 본문의 docTypes, dateFrom, dateTo 검증
+// 셸 명령에 그대로 들어가므로 형식이 맞는 값만 남김
+function parseSearchFilters(body) {
+  const docTypes = (Array.isArray(body.docTypes) ? body.docTypes : (body.docTypes ? [body.docTypes] : []))
+    .map((t) => String(t).trim().toLowerCase())
+    .filter((t) => /^\.?[a-z0-9]{1,10}$/.test(t));
+  // 형식뿐 아니라 실제 날짜인지 확인 (2025-02-30 같은 값은 Python strptime에서 오류)
+  const isDate = (d) => {
+    if (typeof d !== 'string' || !/^\d{4}-\d{2}-\d{2}$/.test(d)) return false;
+    const [y, m, day] = d.split('-').map(Number);
+    const date = new Date(Date.UTC(y, m - 1, day));
+    return date.getUTCFullYear() === y && date.getUTCMonth() === m - 1 && date.getUTCDate() === day;
+  };
+  return {
+    doc_types: docTypes,
+    date_from: isDate(body.dateFrom) ? body.dateFrom : null,
+    date_to: isDate(body.dateTo) ? body.dateTo : null
+  };
+}
+
+// 검색 필터 → Python 스크립트 CLI 인자
+function searchFilterArgs(filters) {
+  let args = filters.doc_types.map((t) => ` --doc-type "${t}"`).join('');
+  if (filters.date_from) args += ` --date-from ${filters.date_from}`;
+  if (filters.date_to) args += ` --date-to ${filters.date_to}`;
+  return args;
+}
+
+// 벡터스토어 경로 (vector_store_create.py가 스냅샷을 게시하는 위치)
+const RAG_CHROMA_PATH = path.join(__dirname, '..', 'python', 'vector_store', 'rag_chroma');
+const ACTIVE_SNAPSHOT_MANIFEST = path.join(RAG_CHROMA_PATH, 'active_snapshot.json');
+
+// 활성 벡터스토어 폴더명 (매니페스트 1회 읽기, 게시된 적이 없으면 최신 폴더명으로 대체)
+function getActiveVectorstoreFolder() {
+  try {
+    const manifest = JSON.parse(fs.readFileSync(ACTIVE_SNAPSHOT_MANIFEST, 'utf8'));
+    if (manifest.folder) {
+      return manifest.folder;
+    }
+  } catch (e) {
+    // 매니페스트 없음 → 이전 방식으로 최신 폴더 찾기
+  }
+
+  const documentsPath = path.join(RAG_CHROMA_PATH, 'documents');
+  if (!fs.existsSync(documentsPath)) {
+    return null;
+  }
+  const folders = fs.readdirSync(documentsPath).filter(item =>
+    !item.startsWith('.') && fs.statSync(path.join(documentsPath, item)).isDirectory()
+  );
+  return folders.length > 0 ? folders.sort().reverse()[0] : null;
+}
+
 // ============================================
 // API 라우트
 // ============================================
@@ -282,8 +383,11 @@ router.post('/create-vectorstore', express.json(), (req, res) => {
   
   const pythonScript = path.join(__dirname, '..', 'python', 'vector_store', 'vector_store_create.py');
   
+  // incremental이면 직전 벡터스토어에서 변경된 문서만 반영
+  const incremental = !!(req.body && req.body.incremental);
+  
   // conda 환경(file_search)에서 Python 스크립트 실행
-  const command = `conda run -n file_search python "${pythonScript}"`;
+  const command = `conda run -n file_search python "${pythonScript}"${incremental ? ' --incremental' : ''}`;
   
   console.log('🚀 벡터스토어 생성 스크립트 실행:', command);
   
@@ -303,6 +407,13 @@ router.post('/create-vectorstore', express.json(), (req, res) => {
       console.error('벡터스토어 생성 에러:', stderr);
     }
     
+    // 상주 검색 서버가 있으면 새 벡터스토어를 사용하도록 갱신 (없으면 무시)
+    requestSearchServer('/reload', {}, 10000).then((reloadResult) => {
+      if (reloadResult && reloadResult.success) {
+        console.log('🔄 상주 검색 서버 벡터스토어 갱신:', reloadResult.chroma_path);
+      }
+    });
+    
     res.json({
       success: true,
       message: '벡터스토어가 성공적으로 생성되었습니다.',
@@ -315,15 +426,24 @@ router.post('/create-vectorstore', express.json(), (req, res) => {
 router.get('/vectorstore-list', async (req, res) => {
   try {
     // MySQL에서 벡터스토어 목록 가져오기 (id 포함)
-    const sql = 'SELECT id, folder, count, created_at FROM vectorStore ORDER BY created_at DESC';
+    const sql = 'SELECT id, folder, count, embedding_model, embedding_dim, build_mode, added_count, updated_count, deleted_count, shard_count, created_at FROM vectorStore ORDER BY created_at DESC';
     const results = await query(sql);
+    const activeFolder = getActiveVectorstoreFolder();
     
     // 날짜 포맷 변환
     const folderList = results.map(row => ({
       id: row.id,
       name: row.folder,
       date: new Date(row.created_at).toLocaleString('ko-KR'),
-      fileCount: row.count
+      fileCount: row.count,
+      embeddingModel: row.embedding_model,
+      embeddingDim: row.embedding_dim,
+      buildMode: row.build_mode,
+      addedCount: row.added_count,
+      updatedCount: row.updated_count,
+      deletedCount: row.deleted_count,
+      shardCount: row.shard_count,
+      isActive: row.folder === activeFolder
     }));
     
     res.json({ success: true, folders: folderList });
@@ -341,7 +461,10 @@ router.post('/search-vectorstore', express.json(), async (req, res) => {
   console.log('📬 벡터스토어 검색 API 호출됨');
   console.log('Request body:', req.body);
   
-  const { query, vectorstoreId } = req.body;
+  const { query, vectorstoreId, mode } = req.body;
+  const filters = parseSearchFilters(req.body);
+  // 검색 모드: fulltext면 MySQL FULLTEXT로 후보를 좁힌 뒤 검색 (기본: 벡터 검색)
+  const searchMode = mode === 'fulltext' ? 'fulltext' : '';
   
   if (!query) {
     console.log('❌ 검색 쿼리 없음');
@@ -366,44 +489,24 @@ router.post('/search-vectorstore', express.json(), async (req, res) => {
   }
   
   try {
-    // documents 폴더에서 최신 폴더 직접 찾기
-    const documentsPath = path.join(__dirname, '..', 'python', 'vector_store', 'rag_chroma', 'documents');
-    
-    let vectorstorePath;
-    let folderName;
-    
-    if (fs.existsSync(documentsPath)) {
-      const items = fs.readdirSync(documentsPath);
-      // 폴더만 필터링 (파일 제외, 숨김 파일 제외)
-      const folders = items.filter(item => {
-        const itemPath = path.join(documentsPath, item);
-        return fs.statSync(itemPath).isDirectory() && !item.startsWith('.');
-      });
-      
-      if (folders.length > 0) {
-        // 폴더명으로 정렬하여 최신 폴더 찾기
-        folders.sort().reverse();
-        folderName = folders[0];
-        vectorstorePath = path.join(documentsPath, folderName);
-        console.log(`✅ documents 폴더에서 최신 벡터스토어 사용: ${folderName}`);
-      } else {
-        return res.status(404).json({ 
-          success: false,
-          message: '벡터스토어 폴더를 찾을 수 없습니다.' 
-        });
-      }
-    } else {
+    // 활성 벡터스토어 (active_snapshot.json)
+    const folderName = getActiveVectorstoreFolder();
+    const vectorstorePath = folderName ? path.join(RAG_CHROMA_PATH, 'documents', folderName) : null;
+    
+    if (!vectorstorePath || !fs.existsSync(vectorstorePath)) {
       return res.status(404).json({ 
         success: false,
-        message: 'documents 폴더가 존재하지 않습니다.' 
+        message: '벡터스토어 폴더를 찾을 수 없습니다.' 
       });
     }
+    console.log(`✅ 활성 벡터스토어 사용: ${folderName}`);
     
     // Python 스크립트 실행
     const pythonScript = path.join(__dirname, '..', 'python', 'vector_store', 'vector_store_search.py');
     
     // conda 환경(file_search)에서 Python 스크립트 실행
-    const command = `conda run -n file_search python "${pythonScript}" "${query}" "${vectorstorePath}"`;
+    const modeArgs = searchMode ? ` "" "${searchMode}"` : '';
+    const command = `conda run -n file_search python "${pythonScript}" "${query}" "${vectorstorePath}"${modeArgs}${searchFilterArgs(filters)}`;
     
     console.log('🚀 벡터스토어 검색 스크립트 실행:', command);
     
@@ -464,8 +567,16 @@ router.delete('/delete-vectorstore/:id', async (req, res) => {
     
     const folderName = selectResults[0].folder;
     
+    // 검색에 사용 중인 벡터스토어는 삭제 불가
+    if (folderName === getActiveVectorstoreFolder()) {
+      return res.status(400).json({ 
+        success: false,
+        message: '현재 운영중인 벡터스토어는 삭제할 수 없습니다.' 
+      });
+    }
+    
     // 실제 ChromaDB 폴더 삭제
-    const chromaPath = path.join(__dirname, '..', 'python', 'vector_store', 'rag_chroma', 'documents', folderName);
+    const chromaPath = path.join(RAG_CHROMA_PATH, 'documents', folderName);
     
     if (fs.existsSync(chromaPath)) {
       console.log(`🗑️ ChromaDB 폴더 삭제 시도: ${chromaPath}`);
@@ -501,7 +612,8 @@ router.post('/ai-search', express.json(), async (req, res) => {
   console.log('📬 AI 검색 API 호출됨');
   console.log('Request body:', req.body);
   
-  const { query } = req.body;
+  const { query, noCache } = req.body;
+  const filters = parseSearchFilters(req.body);
   
   if (!query) {
     console.log('❌ 검색 쿼리 없음');
@@ -528,11 +640,37 @@ router.post('/ai-search', express.json(), async (req, res) => {
   
   console.log('✅ Ollama 서버 정상 확인, AI 검색을 시작합니다.');
   
+  // 상주 검색 서버가 실행 중이면 프로세스 생성 없이 바로 처리
+  const serverResult = await requestSearchServer('/search', { query, no_cache: !!noCache, filters });
+  if (serverResult) {
+    if (!serverResult.success) {
+      console.error('상주 검색 서버 오류:', serverResult.error);
+      return res.status(500).json({ 
+        success: false,
+        message: 'AI 검색 중 오류가 발생했습니다.',
+        error: serverResult.error
+      });
+    }
+    
+    console.log('⚡ 상주 검색 서버에서 AI 검색 완료');
+    return res.json({
+      success: true,
+      message: 'AI 검색이 완료되었습니다.',
+      searchResult: serverResult.result,
+      aiAnswer: serverResult.ai_answer,
+      rankingResult: serverResult.search_results.map((item, idx) => ({ rank: idx + 1, ...item })),
+      htmlFilePath: serverResult.html_file_path,
+      barChartPath: serverResult.bar_chart_path,
+      chromaPath: serverResult.chroma_path,
+      cached: !!serverResult.cached
+    });
+  }
+  
   const pythonScript = path.join(__dirname, '..', 'python', 'rag', '3d_file_search.py');
   
   // conda 환경(file_search)에서 Python 스크립트 실행
-  // 쿼리를 따옴표로 감싸서 전달
-  const command = `conda run -n file_search python "${pythonScript}" "${query}"`;
+  // 쿼리를 따옴표로 감싸서 전달 (noCache면 최근 동일 검색 기록을 재사용하지 않음)
+  const command = `conda run -n file_search python "${pythonScript}" "${query}"${noCache ? ' --no-cache' : ''}${searchFilterArgs(filters)}`;
   
   console.log('🚀 AI 검색 스크립트 실행:', command);
   console.log('🔍 검색 쿼리:', query);